@@ -0,0 +1,79 @@
+"""Benchmark of the NumpyArray storage column type against PickleType.
+
+Writes and reads back response like rows of float vectors in an in-memory
+SQLite database, once with a PickleType column holding Python lists, as the
+storage models used to, and once with a NumpyArray column, and prints the
+payload size and the read and write throughput of each.
+
+    python -m benchmarks.bench_array_type --rows 1000 --size 2000
+"""
+import argparse
+import time
+
+import numpy as np
+import sqlalchemy as sa
+
+from ert_shared.storage.array_type import NumpyArray
+
+
+def _table(metadata, name, column_type):
+    return sa.Table(
+        name,
+        metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("values", column_type),
+    )
+
+
+def _run(engine, table, rows):
+    start = time.perf_counter()
+    engine.execute(table.insert(), [{"id": nr, "values": row} for nr, row in rows])
+    write = time.perf_counter() - start
+
+    start = time.perf_counter()
+    read = engine.execute(sa.select([table.c["values"]])).fetchall()
+    total = sum(len(row[0]) for row in read)
+    read = time.perf_counter() - start
+
+    payload = engine.execute(
+        sa.text('SELECT SUM(LENGTH("values")) FROM {}'.format(table.name))
+    ).scalar()
+    return payload, write, read, total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = sa.create_engine("sqlite://")
+    metadata = sa.MetaData()
+    pickle_table = _table(metadata, "pickle_values", sa.PickleType)
+    array_table = _table(metadata, "array_values", NumpyArray)
+    metadata.create_all(engine)
+
+    data = np.random.rand(args.rows, args.size)
+    n_values = data.size
+
+    print("{} rows of {} values".format(args.rows, args.size))
+    print(
+        "{:>10} {:>14} {:>16} {:>16}".format(
+            "column", "payload (MB)", "write (Mval/s)", "read (Mval/s)"
+        )
+    )
+    for name, table, rows in (
+        ("pickle", pickle_table, [(nr, row.tolist()) for nr, row in enumerate(data)]),
+        ("numpy", array_table, list(enumerate(data))),
+    ):
+        payload, write, read, total = _run(engine, table, rows)
+        assert total == n_values
+        print(
+            "{:>10} {:>14.2f} {:>16.2f} {:>16.2f}".format(
+                name, payload / 1e6, n_values / write / 1e6, n_values / read / 1e6
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark of dumping parameters and responses to the storage database.
+
+Dumps synthetic GEN_KW parameters and responses for an increasing number of
+realizations to an SQLite database, once through the per realization
+RdbApi.add_realization, add_parameter and add_response calls, as
+dump_to_new_storage used to do, and once through the bulk insert path of
+the extraction, and prints the time taken by each.
+
+    python -m benchmarks.bench_extraction --parameters 20 --responses 5
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.orm import sessionmaker
+
+from ert_shared.storage.extraction_api import _dump_parameters, _dump_response
+from ert_shared.storage.models import Entity
+from ert_shared.storage.rdb_api import RdbApi
+
+
+def _data(realizations, n_parameters, n_responses, response_size):
+    parameters = {
+        "GROUP:PARAM_{}".format(nr): pd.DataFrame(
+            {"GROUP:PARAM_{}".format(nr): np.random.rand(realizations)}
+        )
+        for nr in range(n_parameters)
+    }
+    responses = {
+        "RESPONSE_{}".format(nr): pd.DataFrame(
+            np.random.rand(response_size, realizations)
+        )
+        for nr in range(n_responses)
+    }
+    return parameters, responses
+
+
+def _per_row(api, ensemble_name, realizations, parameters, responses):
+    for index in range(realizations):
+        api.add_realization(index, ensemble_name)
+    for key, parameter in parameters.items():
+        group, name = key.split(":")
+        api.add_parameter_definition(name, group, ensemble_name)
+        for realization_index, value in parameter.iterrows():
+            api.add_parameter(
+                name, group, float(value), realization_index, ensemble_name
+            )
+    for key, response in responses.items():
+        api.add_response_definition(key, response.index.to_list(), ensemble_name)
+        for realization_index, values in response.iteritems():
+            api.add_response(key, values.to_list(), realization_index, ensemble_name)
+
+
+def _bulk(api, ensemble_name, realizations, parameters, responses):
+    api.add_realizations(range(realizations), ensemble_name)
+    _dump_parameters(api, parameters, ensemble_name, priors=[])
+    _dump_response(api, responses, ensemble_name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--realizations", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--parameters", type=int, default=20)
+    parser.add_argument("--responses", type=int, default=5)
+    parser.add_argument("--response-size", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        engine = sa.create_engine(
+            "sqlite:///{}".format(os.path.join(workdir, "bench.db"))
+        )
+        Entity.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        print(
+            "{:>12} {:>14} {:>10} {:>9}".format(
+                "realizations", "per row (s)", "bulk (s)", "speed-up"
+            )
+        )
+        for realizations in args.realizations:
+            data = _data(
+                realizations, args.parameters, args.responses, args.response_size
+            )
+            timings = []
+            for nr, dump in enumerate((_per_row, _bulk)):
+                session = Session()
+                api = RdbApi(session)
+                ensemble_name = "ensemble_{}_{}".format(realizations, nr)
+                api.add_ensemble(ensemble_name)
+
+                start = time.perf_counter()
+                dump(api, ensemble_name, realizations, *data)
+                session.commit()
+                timings.append(time.perf_counter() - start)
+                session.close()
+
+            print(
+                "{:>12} {:>14.2f} {:>10.2f} {:>9.1f}".format(
+                    realizations, timings[0], timings[1], timings[0] / timings[1]
+                )
+            )
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Benchmark of the observation loaders in ert_data.loader.
+
+Times load_general_data and load_block_data against a synthetic facade for a
+grid of realization and report step counts, and compares with a reference
+implementation that grows the frame one block at a time, as the loaders
+used to do.
+
+    python -m benchmarks.bench_loader
+"""
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from ert_data import loader
+
+
+class _Node:
+    def __init__(self, indices):
+        self._indices = indices
+        self._values = list(np.random.rand(len(indices)))
+
+    def __len__(self):
+        return len(self._indices)
+
+    def getIndex(self, nr):
+        return self._indices[nr]
+
+    def get_data_points(self):
+        return self._values
+
+    def get_std(self):
+        return self._values
+
+
+class _StepList(list):
+    def asList(self):
+        return list(self)
+
+
+class _ObsVector:
+    def __init__(self, steps, indices):
+        self._steps = _StepList(steps)
+        self._node = _Node(indices)
+
+    def getDataKey(self):
+        return "DATA"
+
+    def getStepList(self):
+        return self._steps
+
+    def getNode(self, _):
+        return self._node
+
+
+class _BlockObservation:
+    def __init__(self, size):
+        self._values = list(np.random.rand(size))
+
+    def __iter__(self):
+        return iter(range(len(self._values)))
+
+    def getValue(self, index):
+        return self._values[index]
+
+    def getStd(self, index):
+        return self._values[index]
+
+
+class _BlockDataLoader:
+    def __init__(self, realizations, size):
+        self._observation = _BlockObservation(size)
+        self._data = [list(np.random.rand(size)) for _ in range(realizations)]
+
+    def getBlockObservation(self, _):
+        return self._observation
+
+    def load(self, *_):
+        return self._data
+
+
+class _Facade:
+    def __init__(self, realizations, steps, data_size=100):
+        indices = list(range(0, data_size, 5))
+        self._obs_vector = _ObsVector(range(1, steps + 1), indices)
+        self._gen_data = pd.DataFrame(np.random.rand(data_size, realizations))
+        self._block_loader = _BlockDataLoader(realizations, 20)
+        self._realizations = realizations
+
+    def get_observations(self):
+        return {"OBS": self._obs_vector}
+
+    def load_gen_data(self, *_):
+        return self._gen_data
+
+    def create_plot_block_data_loader(self, _):
+        return self._block_loader
+
+    def get_current_fs(self):
+        return None
+
+    def get_ensemble_size(self):
+        return self._realizations
+
+
+def _reference_load_general_data(facade, observation_key, case_name):
+    obs_vector = facade.get_observations()[observation_key]
+    data = pd.DataFrame()
+    for time_step in obs_vector.getStepList().asList():
+        node = obs_vector.getNode(time_step)
+        index_list = [node.getIndex(nr) for nr in range(len(node))]
+        obs = pd.DataFrame(
+            [node.get_data_points(), node.get_std()],
+            columns=index_list,
+            index=["OBS", "STD"],
+        )
+        gen_data = facade.load_gen_data(case_name, "DATA", time_step).T
+        data = pd.concat([data, obs, gen_data])
+    return data
+
+
+def _time(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    print(
+        "{:>12} {:>6} {:>14} {:>14} {:>14}".format(
+            "realizations", "steps", "general (s)", "reference (s)", "block (s)"
+        )
+    )
+    for realizations, steps in itertools.product((100, 500, 1000), (10, 100, 300)):
+        facade = _Facade(realizations, steps)
+        general = _time(loader.load_general_data, facade, "OBS", "case")
+        reference = _time(_reference_load_general_data, facade, "OBS", "case")
+        block = _time(loader.load_block_data, facade, "OBS", "case")
+        print(
+            "{:>12} {:>6} {:>14.3f} {:>14.3f} {:>14.3f}".format(
+                realizations, steps, general, reference, block
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
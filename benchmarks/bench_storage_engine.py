@@ -0,0 +1,136 @@
+"""Benchmark of reading from the storage database while it is written to.
+
+For each storage engine profile, a writer thread commits batches of
+responses to a fresh SQLite database, as the extraction does, while reader
+threads keep querying it, as the storage server does. Prints the writer
+throughput and the latency of the readers, and how many reads failed
+because the database was locked.
+
+    python -m benchmarks.bench_storage_engine --seconds 10 --readers 4
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.orm import sessionmaker
+
+from ert_shared.storage.engine import create_storage_engine
+from ert_shared.storage.models import Entity
+from ert_shared.storage.rdb_api import RdbApi
+
+
+def _writer(Session, stop, batch_size, response_size, commits):
+    session = Session()
+    api = RdbApi(session)
+    ensemble = api.add_ensemble("bench")
+    api.add_realizations(range(batch_size), ensemble.name)
+    session.commit()
+
+    nr = 0
+    while not stop.is_set():
+        name = "RESPONSE_{}".format(nr)
+        api.add_response_definition(name, list(range(response_size)), ensemble.name)
+        api.add_responses(
+            name,
+            {index: np.random.rand(response_size) for index in range(batch_size)},
+            ensemble.name,
+        )
+        session.commit()
+        commits.append(time.perf_counter())
+        nr += 1
+    session.close()
+
+
+def _reader(engine, stop, latencies, errors):
+    query = sa.text(
+        "SELECT response_definition.name, COUNT(response.id) FROM response "
+        "JOIN response_definition "
+        "ON response.response_definition_id = response_definition.id "
+        "GROUP BY response_definition.name"
+    )
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                connection.execute(query).fetchall()
+        except sa.exc.OperationalError:
+            errors.append(start)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def _run(url, profile, args):
+    engine = create_storage_engine(url, profile=profile)
+    Entity.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    stop = threading.Event()
+    commits, latencies, errors = [], [], []
+    threads = [
+        threading.Thread(
+            target=_writer,
+            args=(Session, stop, args.batch_size, args.response_size, commits),
+        )
+    ] + [
+        threading.Thread(target=_reader, args=(engine, stop, latencies, errors))
+        for _ in range(args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    latencies = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return (
+        len(commits) / args.seconds,
+        len(latencies) / args.seconds,
+        np.percentile(latencies, 50),
+        np.percentile(latencies, 99),
+        latencies.max(),
+        len(errors),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--response-size", type=int, default=2000)
+    parser.add_argument("--profiles", nargs="+", default=["default", "wal"])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        print(
+            "{:>8} {:>10} {:>10} {:>9} {:>9} {:>9} {:>7}".format(
+                "profile",
+                "commits/s",
+                "reads/s",
+                "p50 (ms)",
+                "p99 (ms)",
+                "max (ms)",
+                "locked",
+            )
+        )
+        for profile in args.profiles:
+            url = "sqlite:///{}".format(os.path.join(workdir, profile + ".db"))
+            print(
+                "{:>8} {:>10.1f} {:>10.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>7}".format(
+                    profile, *_run(url, profile, args)
+                )
+            )
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
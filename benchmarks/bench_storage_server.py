@@ -0,0 +1,171 @@
+"""Load test of the storage server with different worker models.
+
+Writes an ensemble to a fresh database, and for each server configuration
+starts the server and has a number of concurrent clients fetch its
+responses, their data and the healthcheck for a while. Prints the
+throughput and latency percentiles of each configuration. Configurations
+are given as WORKERSxTHREADS, optionally followed by :WORKER_CLASS.
+
+    python -m benchmarks.bench_storage_server --clients 8 --configs 1x1 4x1 1x8
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+from ert_shared.storage import ERT_STORAGE
+from ert_shared.storage.rdb_api import RdbApi
+from ert_shared.storage.server_monitor import ServerMonitor
+
+
+def _populate(url, realizations, responses, size):
+    ERT_STORAGE.initialize(url=url)
+    session = ERT_STORAGE.Session()
+    api = RdbApi(session)
+    ensemble = api.add_ensemble("bench")
+    api.add_realizations(range(realizations), ensemble.name)
+    for nr in range(responses):
+        name = "RESPONSE_{}".format(nr)
+        api.add_response_definition(name, list(range(size)), ensemble.name)
+        api.add_responses(
+            name,
+            {index: np.random.rand(size) for index in range(realizations)},
+            ensemble.name,
+        )
+    session.commit()
+    ensemble_id = ensemble.id
+    session.close()
+    ERT_STORAGE.dispose()
+    return ensemble_id
+
+
+def _client(base_url, auth, paths, stop, latencies, errors):
+    session = requests.Session()
+    session.auth = auth
+    nr = 0
+    while not stop.is_set():
+        path = paths[nr % len(paths)]
+        nr += 1
+        start = time.perf_counter()
+        try:
+            response = session.get(base_url + path)
+            response.content
+        except requests.RequestException:
+            errors.append(path)
+            continue
+        if response.status_code != 200:
+            errors.append(path)
+            continue
+        latencies.append(time.perf_counter() - start)
+    session.close()
+
+
+def _parse_config(config):
+    config, _, worker_class = config.partition(":")
+    workers, _, threads = config.partition("x")
+    return int(workers), int(threads or 1), worker_class or "sync"
+
+
+def _run(rdb_url, config, paths, args):
+    workers, threads, worker_class = _parse_config(config)
+    server = ServerMonitor(
+        rdb_url=rdb_url,
+        lockfile=False,
+        server_args=(
+            "--workers",
+            str(workers),
+            "--threads",
+            str(threads),
+            "--worker-class",
+            worker_class,
+        ),
+    )
+    server.start()
+    try:
+        base_url, auth = server.fetch_url(), server.fetch_auth()
+        stop = threading.Event()
+        latencies, errors = [], []
+        clients = [
+            threading.Thread(
+                target=_client,
+                # Each client starts at a different path
+                args=(
+                    base_url,
+                    auth,
+                    paths[nr:] + paths[:nr],
+                    stop,
+                    latencies,
+                    errors,
+                ),
+            )
+            for nr in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for client in clients:
+            client.join()
+    finally:
+        server.shutdown()
+
+    latencies = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return (
+        len(latencies) / args.seconds,
+        np.percentile(latencies, 50),
+        np.percentile(latencies, 95),
+        np.percentile(latencies, 99),
+        latencies.max(),
+        len(errors),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--realizations", type=int, default=100)
+    parser.add_argument("--responses", type=int, default=20)
+    parser.add_argument("--response-size", type=int, default=2000)
+    parser.add_argument("--configs", nargs="+", default=["1x1", "4x1", "1x4", "4x4"])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        rdb_url = "sqlite:///{}".format(os.path.join(workdir, "storage.db"))
+        ensemble_id = _populate(
+            rdb_url, args.realizations, args.responses, args.response_size
+        )
+        paths = ["/healthcheck"]
+        for nr in range(args.responses):
+            response = "/ensembles/{}/responses/RESPONSE_{}".format(ensemble_id, nr)
+            paths.extend([response, response + "/data"])
+
+        print(
+            "{:>14} {:>9} {:>9} {:>9} {:>9} {:>9} {:>7}".format(
+                "config",
+                "req/s",
+                "p50 (ms)",
+                "p95 (ms)",
+                "p99 (ms)",
+                "max (ms)",
+                "errors",
+            )
+        )
+        for config in args.configs:
+            print(
+                "{:>14} {:>9.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f} {:>7}".format(
+                    config, *_run(rdb_url, config, paths, args)
+                )
+            )
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
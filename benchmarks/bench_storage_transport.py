@@ -0,0 +1,98 @@
+"""Benchmark of fetching response data from the storage server.
+
+Writes one response with the given number of realizations and values to a
+fresh database, and fetches it from the /data route as CSV and as .npy,
+decoding it into a DataFrame as StorageClient does. Prints the size of the
+body and the time spent by the server and by the client.
+
+    python -m benchmarks.bench_storage_transport --realizations 1000 --size 5000
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from ert_shared.storage import ERT_STORAGE
+from ert_shared.storage.http_server import NPY_MIMETYPE, FlaskWrapper
+from ert_shared.storage.rdb_api import RdbApi
+
+
+def _populate(realizations, size):
+    session = ERT_STORAGE.Session()
+    api = RdbApi(session)
+    ensemble = api.add_ensemble("bench")
+    api.add_realizations(range(realizations), ensemble.name)
+    api.add_response_definition("RESPONSE", list(range(size)), ensemble.name)
+    api.add_responses(
+        "RESPONSE",
+        {index: np.random.rand(size) for index in range(realizations)},
+        ensemble.name,
+    )
+    session.commit()
+    ensemble_id = ensemble.id
+    session.close()
+    return ensemble_id
+
+
+def _read_csv(data):
+    return pd.read_csv(io.StringIO(data.decode()), header=None)
+
+
+def _read_npy(data):
+    return pd.DataFrame(np.load(io.BytesIO(data), allow_pickle=False))
+
+
+FORMATS = {"csv": ("text/csv", _read_csv), "npy": (NPY_MIMETYPE, _read_npy)}
+
+
+def _run(client, url, mimetype, read, repeat):
+    server, parse = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, headers={"Accept": mimetype})
+        data = response.data
+        server.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        read(data)
+        parse.append(time.perf_counter() - start)
+    return len(data) / 1e6, min(server) * 1000, min(parse) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--realizations", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        url = "sqlite:///{}".format(os.path.join(workdir, "storage.db"))
+        wrapper = FlaskWrapper(secure=False, url=url)
+        ensemble_id = _populate(args.realizations, args.size)
+        data_url = "/ensembles/{}/responses/RESPONSE/data".format(ensemble_id)
+
+        print(
+            "{:>6} {:>10} {:>12} {:>12}".format(
+                "format", "size (MB)", "server (ms)", "client (ms)"
+            )
+        )
+        with wrapper.app.test_client() as client:
+            for name, (mimetype, read) in FORMATS.items():
+                print(
+                    "{:>6} {:>10.1f} {:>12.1f} {:>12.1f}".format(
+                        name, *_run(client, data_url, mimetype, read, args.repeat)
+                    )
+                )
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+
+class MeasuredDataCache(object):
+    """
+    Least recently used cache of the per observation key blocks loaded by
+    MeasuredData, bounded by the total size of the cached blocks in bytes.
+
+    Entries are grouped per case. Before a case is read from, the cache
+    compares the realization states of the case, and the latest time its
+    files in the storage were written, with the ones seen when the entries
+    were stored, and drops the entries of the case if they differ, e.g.
+    because realizations have been loaded or the case has been rerun. A
+    rerun may leave every realization state as it was, but it rewrites the
+    files of the case.
+    """
+
+    DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._fingerprints = {}
+        self._nbytes = 0
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def validate(self, facade):
+        """
+        Drops the entries of the current case of the facade if its
+        realization states or files have changed since they were cached.
+        """
+        case_name = facade.get_current_case_name()
+        fingerprint = (
+            tuple(facade.get_realization_states()),
+            facade.get_case_write_time(case_name),
+        )
+        if self._fingerprints.get(case_name) != fingerprint:
+            self.invalidate(case_name)
+            self._fingerprints[case_name] = fingerprint
+
+    def invalidate(self, case_name):
+        for key in [key for key in self._entries if key[0] == case_name]:
+            self._remove(key)
+        self._fingerprints.pop(case_name, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._fingerprints.clear()
+        self._nbytes = 0
+
+    def get(self, key):
+        """
+        Returns the cached block for key, a tuple where the first item is the
+        case name, or None if there is no such block.
+        """
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, data):
+        if key in self._entries:
+            self._remove(key)
+
+        nbytes = int(data.memory_usage(index=True).sum())
+        if nbytes > self._max_bytes:
+            return
+
+        self._entries[key] = (data, nbytes)
+        self._nbytes += nbytes
+        while self._nbytes > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, nbytes = self._entries.pop(key)
+        self._nbytes -= nbytes
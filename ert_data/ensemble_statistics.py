@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 100
+
+
+class EnsembleStatistics(object):
+    """
+    Accumulates the per column mean and variance of a sequence of chunks of
+    rows in one pass, ignoring NaN values. Each chunk is reduced on its own
+    and then merged into the running totals with the pairwise form of
+    Welford's update, so only one chunk needs to be in memory at a time.
+    """
+
+    def __init__(self, n_columns):
+        self._count = np.zeros(n_columns)
+        self._mean = np.zeros(n_columns)
+        self._m2 = np.zeros(n_columns)
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        valid = ~np.isnan(chunk)
+        count = valid.sum(axis=0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(
+                count > 0, np.where(valid, chunk, 0.0).sum(axis=0) / count, 0.0
+            )
+            m2 = (np.where(valid, chunk - mean, 0.0) ** 2).sum(axis=0)
+
+            total = self._count + count
+            weight = np.where(total > 0, count / total, 0.0)
+
+        delta = mean - self._mean
+        self._mean += delta * weight
+        self._m2 += m2 + delta ** 2 * self._count * weight
+        self._count = total
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def mean(self):
+        return np.where(self._count > 0, self._mean, np.nan)
+
+    @property
+    def std(self):
+        """Sample standard deviation, NaN for columns with less than two values."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(
+                self._count > 1, np.sqrt(self._m2 / (self._count - 1)), np.nan
+            )
+
+
+def ensemble_mean_std(data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Returns the per column mean and standard deviation of the simulated rows
+    of data, i.e. all rows except OBS and STD, reading chunk_size rows at a
+    time.
+    """
+    statistics = EnsembleStatistics(data.shape[1])
+    for rows in _row_chunks(data, chunk_size):
+        statistics.update(data.iloc[rows].to_numpy(dtype=np.float64))
+    return (
+        pd.Series(statistics.mean, index=data.columns),
+        pd.Series(statistics.std, index=data.columns),
+    )
+
+
+def failed_realizations(data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Returns the index labels of the simulated rows of data with no values,
+    reading chunk_size rows at a time.
+    """
+    failed = []
+    for rows in _row_chunks(data, chunk_size):
+        chunk = data.iloc[rows].to_numpy(dtype=np.float64)
+        failed.extend(data.index[rows[np.isnan(chunk).all(axis=1)]])
+    return failed
+
+
+def _row_chunks(data, chunk_size):
+    """Yields the positions of the simulated rows, chunk_size rows at a time."""
+    rows = np.flatnonzero(~data.index.isin(["OBS", "STD"]))
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start : start + chunk_size]
@@ -1,5 +1,10 @@
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
+from ert_data.sparse_data import SparseData
+
 
 def data_loader_factory(observation_type):
     """
@@ -21,17 +26,15 @@ def load_general_data(facade, observation_key, case_name, include_data=True):
     obs_vector = facade.get_observations()[observation_key]
     data_key = obs_vector.getDataKey()
 
-    data = pd.DataFrame()
-
+    blocks = []
     for time_step in obs_vector.getStepList().asList():
         # Fetch, then transpose the simulation data in order to make it
         # conform with the GenObservation data structure.
 
         # Observations and its standard deviation are a subset of the simulation data.
         # The index_list refers to indices in the simulation data. In order to
-        # join these data in a DataFrame, pandas inserts the obs/std
-        # data into the columns representing said indices, before appending
-        # the simulation data.
+        # join these data in a DataFrame, the obs/std data is inserted into
+        # the columns representing said indices, above the simulation data.
         # You then get something like:
         #      0   1   2
         # OBS  NaN NaN 42
@@ -40,13 +43,59 @@ def load_general_data(facade, observation_key, case_name, include_data=True):
         node = obs_vector.getNode(time_step)
         index_list = [node.getIndex(nr) for nr in range(len(node))]
 
-        data = data.append(
-            pd.DataFrame([node.get_data_points()], columns=index_list, index=["OBS"])
-        ).append(pd.DataFrame([node.get_std()], columns=index_list, index=["STD"]))
+        blocks.append(
+            (
+                ["OBS", "STD"],
+                index_list,
+                [node.get_data_points(), node.get_std()],
+            )
+        )
         if include_data:
             gen_data = facade.load_gen_data(case_name, data_key, time_step).T
-            data = data.append(gen_data)
-    return data
+            blocks.append((gen_data.index.to_list(), gen_data.columns, gen_data.values))
+    return _stack_blocks(blocks)
+
+
+def load_general_data_sparse(facade, observation_key, case_name, include_data=True):
+    """
+    Loads the same data as load_general_data, but only keeps the simulated
+    values at the observed data indices, returned as a SparseData instead of
+    a frame spanning every index of the simulated data.
+    """
+    catalog = facade.get_observation_catalog()
+    obs_vector = facade.get_observations()[observation_key]
+    data_key = catalog.data_key(observation_key)
+
+    data_index, observations, simulated = [], [], []
+    realizations = []
+    width = 0
+    for time_step in catalog.step_list(observation_key):
+        index_list = catalog.data_indices(observation_key, time_step)
+        node = obs_vector.getNode(time_step)
+
+        data_index.append(index_list)
+        observations.append([node.get_data_points(), node.get_std()])
+        if len(index_list) > 0:
+            width = max(width, int(np.max(index_list)) + 1)
+
+        if include_data:
+            gen_data = facade.load_gen_data(case_name, data_key, time_step)
+            if not realizations:
+                realizations = gen_data.columns.to_list()
+            width = max(width, len(gen_data.index))
+            simulated.append(
+                gen_data.reindex(index=index_list, columns=realizations).values.T
+            )
+
+    if not data_index:
+        return SparseData([], np.empty((2, 0)), None, [], 0)
+    return SparseData(
+        np.concatenate(data_index),
+        np.hstack(observations),
+        np.hstack(simulated) if include_data else None,
+        realizations,
+        width,
+    )
 
 
 def load_block_data(facade, observation_key, case_name, include_data=True):
@@ -57,31 +106,85 @@ def load_block_data(facade, observation_key, case_name, include_data=True):
     """
     obs_vector = facade.get_observations()[observation_key]
     loader = facade.create_plot_block_data_loader(obs_vector)
+    if include_data:
+        fs = facade.get_current_fs()
+        ensemble_size = facade.get_ensemble_size()
 
-    data = pd.DataFrame()
+    blocks = []
     for report_step in obs_vector.getStepList().asList():
         obs_block = loader.getBlockObservation(report_step)
-
-        data = data.append(
-            pd.DataFrame([[obs_block.getValue(i) for i in obs_block]], index=["OBS"])
-        ).append(
-            pd.DataFrame([[obs_block.getStd(i) for i in obs_block]], index=["STD"])
-        )
+        observations = _get_block_observations(obs_block)
+        blocks.append((["OBS", "STD"], range(observations.shape[1]), observations))
 
         if include_data:
-            block_data = loader.load(facade.get_current_fs(), report_step)
-            data = data.append(
-                _get_block_measured(facade.get_ensemble_size(), block_data)
-            )
+            block_data = loader.load(fs, report_step)
+            measured = _get_block_measured(ensemble_size, block_data)
+            blocks.append((measured.index.to_list(), measured.columns, measured.values))
 
-    return data
+    return _stack_blocks(blocks)
+
+
+def _get_block_observations(obs_block):
+    """
+    Returns the values and standard deviations of a block observation as the
+    two rows of an array, reading both in a single pass over the block.
+    libres only has per element getters here, so this still makes a getValue
+    and a getStd call for every element of the block.
+    """
+    indices = list(obs_block)
+    get_value, get_std = obs_block.getValue, obs_block.getStd
+    observations = np.empty((2, len(indices)))
+    for column, i in enumerate(indices):
+        observations[0, column] = get_value(i)
+        observations[1, column] = get_std(i)
+    return observations
 
 
 def _get_block_measured(ensamble_size, block_data):
-    data = pd.DataFrame()
-    for ensamble_nr in range(ensamble_size):
-        data = data.append(pd.DataFrame([block_data[ensamble_nr]], index=[ensamble_nr]))
-    return data
+    """
+    Returns the block data of all realizations as a DataFrame with one row
+    per realization, padded with NaN where a realization has fewer values.
+    """
+    vectors = [block_data[ensamble_nr] for ensamble_nr in range(ensamble_size)]
+    lengths = [len(vector) for vector in vectors]
+
+    data = np.full((ensamble_size, max(lengths, default=0)), np.nan)
+    for ensamble_nr, (vector, length) in enumerate(zip(vectors, lengths)):
+        data[ensamble_nr, :length] = np.fromiter(vector, dtype=float, count=length)
+    return pd.DataFrame(data, index=range(ensamble_size))
+
+
+def _stack_blocks(blocks):
+    """
+    Stacks (row labels, column labels, values) blocks on top of each other
+    in a single DataFrame, aligning them on the union of their column labels
+    and padding with NaN where a block lacks a column. All blocks are copied
+    into one preallocated array, so the cost is linear in the number of
+    blocks instead of quadratic, as it is when growing a DataFrame
+    row-block by row-block.
+    """
+    if not blocks:
+        return pd.DataFrame()
+
+    columns = pd.Index(blocks[0][1])
+    for _, block_columns, _ in blocks[1:]:
+        block_columns = pd.Index(block_columns)
+        if not columns.equals(block_columns):
+            columns = columns.union(block_columns)
+
+    index = []
+    for row_labels, _, _ in blocks:
+        index.extend(row_labels)
+
+    data = np.full((len(index), len(columns)), np.nan)
+    row = 0
+    for row_labels, block_columns, values in blocks:
+        n_rows = len(row_labels)
+        positions = columns.get_indexer(pd.Index(block_columns))
+        data[row : row + n_rows, positions] = np.asarray(values, dtype=float)
+        row += n_rows
+
+    return pd.DataFrame(data, index=index, columns=columns)
 
 
 def load_summary_data(facade, observation_key, case_name, include_data=True):
@@ -96,14 +199,54 @@ def load_summary_data(facade, observation_key, case_name, include_data=True):
     return pd.concat(data)
 
 
+def load_summary_data_batch(facade, observation_keys, case_name, include_data=True):
+    """
+    Loads the data of several SUMMARY_OBS observation keys with a single
+    summary collector pass and a single observation collector pass, and
+    slices out each key afterwards. Returns a dict from observation key to
+    the same DataFrame as load_summary_data returns for that key.
+    """
+    data_keys = {key: facade.get_data_key_for_obs_key(key) for key in observation_keys}
+    unique_data_keys = list(OrderedDict.fromkeys(data_keys.values()))
+
+    if include_data:
+        summary_data = facade.load_all_summary_data(case_name, unique_data_keys)
+    observation_data = facade.load_observation_data(case_name, unique_data_keys)
+
+    result = {}
+    for observation_key, data_key in data_keys.items():
+        args = (facade, observation_key, data_key, case_name)
+        data = []
+        if include_data:
+            data.append(_slice_summary_data(summary_data, data_key))
+        data.append(
+            _slice_summary_observations(observation_data, data_key).pipe(
+                _remove_inactive_report_steps, *args
+            )
+        )
+        result[observation_key] = pd.concat(data)
+    return result
+
+
 def _get_summary_data(facade, _, data_key, case_name):
     data = facade.load_all_summary_data(case_name, [data_key])
+    return _slice_summary_data(data, data_key)
+
+
+def _slice_summary_data(data, data_key):
     data = data[data_key].unstack(level=-1)
     return data.set_index(data.index.values)
 
 
 def _get_summary_observations(facade, _, data_key, case_name):
-    data = facade.load_observation_data(case_name, [data_key]).transpose()
+    data = facade.load_observation_data(case_name, [data_key])
+    return _slice_summary_observations(data, data_key)
+
+
+def _slice_summary_observations(data, data_key):
+    columns = [data_key, "STD_" + data_key]
+    data = data[[column for column in data.columns if column in columns]]
+    data = data.transpose()
     # The index from SummaryObservationCollector is {data_key} and STD_{data_key}"
     # to match the other data types this needs to be changed to OBS and STD, hence
     # the regex.
@@ -119,8 +262,7 @@ def _remove_inactive_report_steps(data, facade, observation_key, *args):
     if data.empty:
         return data
 
-    obs_vector = facade.get_observations()[observation_key]
-    active_indices = []
-    for step in obs_vector.getStepList():
-        active_indices.append(step - 1)
+    active_indices = [
+        step - 1 for step in facade.get_step_list_for_obs_key(observation_key)
+    ]
     return data.iloc[:, active_indices]
@@ -1,17 +1,94 @@
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
 from ert_data import loader
+from ert_data.ensemble_statistics import ensemble_mean_std, failed_realizations
+from ert_data.sparse_data import SparseData
 
 
 class MeasuredData(object):
-    def __init__(self, facade, keys, index_lists=None, load_data=True):
+    def __init__(
+        self,
+        facade,
+        keys,
+        index_lists=None,
+        load_data=True,
+        dtype=float,
+        cache=None,
+        lazy=False,
+        dense=False,
+    ):
+        """
+        The data is stored as 64 bit floats by default. Passing
+        dtype=numpy.float32 halves the memory used by large ensembles, at the
+        cost of precision.
+
+        If a MeasuredDataCache is given as cache, the data of each key is
+        looked up in, and added to, the cache instead of always being loaded
+        from the current case.
+
+        With lazy=True no data is loaded up front. The keys are instead
+        loaded the first time they are needed, either by passing them to
+        get_simulated_data or one of the filters, or by accessing data, which
+        loads all remaining keys. Keys appear in data in the order they were
+        loaded.
+
+        GEN_OBS keys only get a column for each observed data index, holding
+        the simulated values at that index. With dense=True they instead get
+        a column for every index of the simulated data, with NaN observations
+        where there is no observation.
+        """
         self._facade = facade
-        self._set_data(self._get_data(keys, index_lists, load_data))
+        self._cache = cache
+        self._dense = dense
+        self._dtype = np.dtype(dtype)
+        if self._dtype.kind != "f":
+            raise TypeError(
+                "Invalid dtype: {}, should be a floating point type".format(dtype)
+            )
+        if index_lists is None:
+            index_lists = [None] * len(keys)
+        if len(index_lists) != len(keys):
+            raise ValueError("index list must be same length as observations keys")
+
+        self._load_data = load_data
+        self._data = None
+        if lazy and keys:
+            self._pending = OrderedDict(zip(keys, index_lists))
+        else:
+            self._pending = OrderedDict()
+            self._set_data(self._get_data(keys, index_lists, load_data))
 
     @property
     def data(self):
+        self._load_pending()
         return self._data
 
+    def _load_pending(self, keys=None):
+        """Loads the given keys, or all keys, that have not yet been loaded."""
+        if keys is None:
+            keys = list(self._pending)
+        keys = [key for key in keys if key in self._pending]
+        if not keys:
+            return
+
+        index_lists = [self._pending.pop(key) for key in keys]
+        data = self._get_data(keys, index_lists, self._load_data)
+        if self._data is not None:
+            data = pd.concat([self._data, data], axis=1)
+        self._set_data(data)
+
+    def _select(self, keys=None):
+        """Returns the data of the given keys, or all data if keys is None."""
+        if keys is None:
+            return self.data
+        self._load_pending(keys)
+        if self._data is None:
+            raise KeyError(keys)
+        return self._data[list(keys)]
+
     def _set_data(self, data):
         expected_keys = ["OBS", "STD"]
         if not isinstance(data, pd.DataFrame):
@@ -30,19 +107,17 @@ class MeasuredData(object):
     def remove_failed_realizations(self):
         self._set_data(self._remove_failed_realizations())
 
-    def get_simulated_data(self):
-        return self._get_simulated_data()
+    def get_simulated_data(self, keys=None):
+        return self._get_simulated_data(keys)
 
-    def _get_simulated_data(self):
-        return self.data[~self.data.index.isin(["OBS", "STD"])]
+    def _get_simulated_data(self, keys=None):
+        data = self._select(keys)
+        return data[~data.index.isin(["OBS", "STD"])]
 
     def _remove_failed_realizations(self):
         """Removes rows with no simulated data, leaving observations and
         standard deviations as-is."""
-        pre_index = self.data.index
-        post_index = list(self.data.dropna(axis=0, how="all").index)
-        drop_index = set(pre_index) - set(post_index + ["STD", "OBS"])
-        return self.data.drop(index=drop_index)
+        return self.data.drop(index=failed_realizations(self.data))
 
     def remove_inactive_observations(self):
         self._set_data(self._remove_inactive_observations())
@@ -64,8 +139,11 @@ class MeasuredData(object):
         Adds simulated and observed data and returns a dataframe where ensamble
         members will have a data key, observed data will be named OBS and
         observed standard deviation will be named STD.
+
+        The per key blocks are converted to self._dtype as they are loaded, and
+        joined in a single concatenation at the end, so the full dataset is
+        only copied once.
         """
-        measured_data = pd.DataFrame()
         case_name = self._facade.get_current_case_name()
 
         if index_lists is None:
@@ -74,53 +152,127 @@ class MeasuredData(object):
         if len(index_lists) != len(observation_keys):
             raise ValueError("index list must be same length as observations keys")
 
-        for key, index_list in zip(observation_keys, index_lists):
-            observation_type = self._facade.get_impl_type_name_for_obs_key(key)
-            data_loader = loader.data_loader_factory(observation_type)
+        if self._cache is not None:
+            self._cache.validate(self._facade)
+
+        blocks = [None] * len(observation_keys)
+        cache_keys = [None] * len(observation_keys)
+        missing = []
+        for nr, (key, index_list) in enumerate(zip(observation_keys, index_lists)):
+            if self._cache is not None:
+                cache_keys[nr] = (
+                    case_name,
+                    key,
+                    None if index_list is None else tuple(index_list),
+                    load_data,
+                    self._dtype.str,
+                    self._dense,
+                )
+                blocks[nr] = self._cache.get(cache_keys[nr])
+            if blocks[nr] is None:
+                missing.append(nr)
+
+        loaded = self._load_blocks(
+            [(observation_keys[nr], index_lists[nr]) for nr in missing],
+            case_name,
+            load_data,
+        )
+        for nr, data in zip(missing, loaded):
+            blocks[nr] = data
+            if self._cache is not None:
+                self._cache.put(cache_keys[nr], data)
+
+        if not blocks:
+            return pd.DataFrame()
+        return pd.concat(blocks, axis=1)
+
+    def _load_blocks(self, keys_and_index_lists, case_name, load_data):
+        """
+        Loads the block of each (key, index list) pair, returning them in the
+        order they were given. The data of all SUMMARY_OBS keys is loaded
+        up front in one batch.
+        """
+        observation_types = [
+            self._facade.get_impl_type_name_for_obs_key(key)
+            for key, _ in keys_and_index_lists
+        ]
+        summary_keys = list(
+            OrderedDict.fromkeys(
+                key
+                for (key, _), observation_type in zip(
+                    keys_and_index_lists, observation_types
+                )
+                if observation_type == "SUMMARY_OBS"
+            )
+        )
+        preloaded = {}
+        if len(summary_keys) > 1:
+            preloaded = loader.load_summary_data_batch(
+                self._facade, summary_keys, case_name, load_data
+            )
 
-            data = data_loader(self._facade, key, case_name, load_data)
+        def load(item):
+            (key, index_list), observation_type = item
+            # A key that is requested more than once is only taken from the
+            # batch the first time, as the block is modified when loaded.
+            data = preloaded.pop(key, None)
+            if data is None:
+                if observation_type == "GEN_OBS" and not self._dense:
+                    data_loader = loader.load_general_data_sparse
+                else:
+                    data_loader = loader.data_loader_factory(observation_type)
+                data = data_loader(self._facade, key, case_name, load_data)
+            return self._prepare_block(data, key, index_list)
 
+        return [load(item) for item in zip(keys_and_index_lists, observation_types)]
+
+    def _prepare_block(self, data, key, index_list):
+        if isinstance(data, SparseData):
+            if isinstance(index_list, (list, tuple)):
+                data = data.select(index_list)
+            data = data.to_frame()
+        else:
             # Simulated data and observations both refer to the data
             # index at some levels, so having that information available is
             # helpful
             _add_index_range(data)
-
             data = MeasuredData._filter_on_column_index(data, index_list)
-            data = pd.concat({key: data}, axis=1)
-
-            measured_data = pd.concat([measured_data, data], axis=1)
 
-        return measured_data.astype(float)
+        data = data.astype(self._dtype, copy=False)
+        data.columns = _add_key_level(key, data.columns)
+        return data
 
-    def filter_ensemble_std(self, std_cutoff):
-        self._set_data(self._filter_ensemble_std(std_cutoff))
+    def filter_ensemble_std(self, std_cutoff, keys=None):
+        self._set_data(self._filter_ensemble_std(std_cutoff, keys))
 
-    def filter_ensemble_mean_obs(self, alpha):
-        self._set_data(self._filter_ensemble_mean_obs(alpha))
+    def filter_ensemble_mean_obs(self, alpha, keys=None):
+        self._set_data(self._filter_ensemble_mean_obs(alpha, keys))
 
-    def _filter_ensemble_std(self, std_cutoff):
+    def _filter_ensemble_std(self, std_cutoff, keys=None):
         """
         Filters on ensamble variation versus a user defined standard
         deviation cutoff. If there is not enough variation in the measurements
-        the data point is removed.
+        the data point is removed. If keys is given, only the data points of
+        those keys are considered.
         """
-        ens_std = self.get_simulated_data().std()
+        _, ens_std = ensemble_mean_std(self._select(keys))
         std_filter = ens_std <= std_cutoff
-        return self.data.drop(columns=std_filter[std_filter].index)
+        return self._data.drop(columns=std_filter[std_filter].index)
 
-    def _filter_ensemble_mean_obs(self, alpha):
+    def _filter_ensemble_mean_obs(self, alpha, keys=None):
         """
         Filters on distance between the observed data and the ensamble mean
-        based on variation and a user defined alpha.
+        based on variation and a user defined alpha. If keys is given, only
+        the data points of those keys are considered.
         """
-        ens_mean = self.get_simulated_data().mean()
-        ens_std = self.get_simulated_data().std()
-        obs_values = self.data.loc["OBS"]
-        obs_std = self.data.loc["STD"]
+        data = self._select(keys)
+        ens_mean, ens_std = ensemble_mean_std(data)
+        obs_values = data.loc["OBS"]
+        obs_std = data.loc["STD"]
 
         mean_filter = abs(obs_values - ens_mean) > alpha * (ens_std + obs_std)
 
-        return self.data.drop(columns=mean_filter[mean_filter].index)
+        return self._data.drop(columns=mean_filter[mean_filter].index)
 
     @staticmethod
     def _filter_on_column_index(dataframe, index_list):
@@ -152,3 +304,15 @@ def _add_index_range(data):
     tuples = list(zip(*arrays))
     index = pd.MultiIndex.from_tuples(tuples, names=["key_index", "data_index"])
     data.columns = index
+
+
+def _add_key_level(key, columns):
+    """
+    Prepends the observation key as the outermost level of the
+    (key_index, data_index) column index.
+    """
+    return pd.MultiIndex.from_arrays(
+        [[key] * len(columns)]
+        + [columns.get_level_values(level) for level in range(columns.nlevels)],
+        names=[None] + list(columns.names),
+    )
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+
+class SparseData(object):
+    """
+    Observations of one observation key together with the simulated values
+    at the observed data indices only, as opposed to the NaN padded frames
+    returned by load_general_data, which span every index of the simulated
+    data.
+
+    data_index holds the observed data indices, observations the OBS and STD
+    rows and simulated, if loaded, one row per realization of the simulated
+    values at data_index. width is the number of data points in the
+    simulated data the indices refer to.
+    """
+
+    def __init__(self, data_index, observations, simulated, realizations, width):
+        self.data_index = np.asarray(data_index, dtype=int)
+        self.observations = np.asarray(observations, dtype=float).reshape(
+            2, len(self.data_index)
+        )
+        self.simulated = None
+        if simulated is not None:
+            self.simulated = np.asarray(simulated, dtype=float).reshape(
+                len(realizations), len(self.data_index)
+            )
+        self.realizations = list(realizations)
+        self.width = width
+
+    def __len__(self):
+        return len(self.data_index)
+
+    def select(self, index_list):
+        """
+        Returns the data of the data indices in index_list, in that order.
+        Indices that are not observed are left out.
+        """
+        if len(index_list) > 0 and max(index_list) >= self.width:
+            raise IndexError(
+                "Index list is larger than observation data, please check input, "
+                "max index list:{} number of data points: {}".format(
+                    max(index_list), self.width
+                )
+            )
+        positions = {}
+        for position, index in enumerate(self.data_index):
+            positions.setdefault(index, []).append(position)
+        selected = [
+            position for index in index_list for position in positions.get(index, [])
+        ]
+        return SparseData(
+            self.data_index[selected],
+            self.observations[:, selected],
+            None if self.simulated is None else self.simulated[:, selected],
+            self.realizations,
+            self.width,
+        )
+
+    def to_frame(self):
+        """
+        Returns the data as a DataFrame with the rows OBS, STD and one row
+        per realization, and a (key_index, data_index) column for each
+        observed data index.
+        """
+        values = self.observations
+        if self.simulated is not None:
+            values = np.vstack([values, self.simulated])
+        return pd.DataFrame(
+            values,
+            index=["OBS", "STD"] + self.realizations,
+            columns=pd.MultiIndex.from_arrays(
+                [self.data_index, self.data_index], names=["key_index", "data_index"]
+            ),
+        )
@@ -67,6 +67,11 @@ class PlotApi(object):
         except ValueError:
             return data
 
+    def data_for_keys(self, case, keys):
+        """ Returns a dict from each of the given keys to its pandas DataFrame for a given case, as returned by
+            data_for_key"""
+        return {key: self.data_for_key(case, key) for key in keys}
+
     def observations_for_obs_keys(self, case, obs_keys):
         """ Returns a pandas DataFrame with the datapoints for a given observation key for a given case. The row index
             is the realization number, and the column index is a multi-index with (obs_key, index/date, obs_index),
@@ -18,6 +18,10 @@ class ErtAdapter():
     def adapt(self, implementation):
         self._implementation = implementation
         self._enkf_facade = LibresFacade(implementation.ert)
+        if implementation.ertChanged is not None:
+            implementation.ertChanged.connect(
+                self._enkf_facade.invalidate_observation_catalog
+            )
 
     @property
     def enkf_facade(self):
@@ -14,6 +14,10 @@ class FeatureToggling:
             default_enabled=False,
             msg="The new storage solution is experimental! Thank you for testing our new features."
         ),
+        "new-storage-streaming": _Feature(
+            default_enabled=False,
+            msg="Writing realizations to the new storage one by one is experimental! Thank you for testing our new features."
+        ),
     }
 
     @staticmethod
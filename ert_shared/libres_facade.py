@@ -1,3 +1,5 @@
+import os
+
 from pandas import DataFrame
 from res.analysis.analysis_module import AnalysisModule
 from res.analysis.enums.analysis_module_options_enum import \
@@ -6,12 +8,15 @@ from res.enkf.export import (GenDataCollector, SummaryCollector,
                              SummaryObservationCollector, GenDataObservationCollector, GenKwCollector)
 from res.enkf.plot_data import PlotBlockDataLoader
 
+from ert_shared.observation_catalog import ObservationCatalog
+
 
 class LibresFacade(object):
     """Facade for libres inside ERT."""
 
     def __init__(self, enkf_main):
         self._enkf_main = enkf_main
+        self._observation_catalog = None
 
     def get_analysis_module_names(self, iterable=False):
         modules = self.get_analysis_modules(iterable)
@@ -45,20 +50,56 @@ class LibresFacade(object):
     def get_observations(self):
         return self._enkf_main.getObservations()
 
+    def get_observation_catalog(self):
+        """ :rtype: ObservationCatalog """
+        if self._observation_catalog is None:
+            self._observation_catalog = ObservationCatalog(self.get_observations())
+        return self._observation_catalog
+
+    def invalidate_observation_catalog(self):
+        self._observation_catalog = None
+
+    def get_observation_keys(self):
+        """ :rtype: list of str """
+        return self.get_observation_catalog().keys
+
     def get_impl_type_name_for_obs_key(self, key):
-        return self._enkf_main.getObservations()[key].getImplementationType().name
+        return self.get_observation_catalog().impl_type_name(key)
+
+    def get_step_list_for_obs_key(self, key):
+        """ :rtype: list of int """
+        return self.get_observation_catalog().step_list(key)
 
     def get_current_fs(self):
         return self._enkf_main.getEnkfFsManager().getCurrentFileSystem()
 
+    def get_realization_states(self):
+        """ :rtype: list of int """
+        return [int(state) for state in self.get_current_fs().getStateMap()]
+
+    def get_case_write_time(self, case_name):
+        """ Returns the latest modification time, in nanoseconds, of the files of a case in the storage, which
+            changes whenever realizations of the case are written, or None if the case has no files """
+        case_path = os.path.join(self._enkf_main.getModelConfig().getEnspath(), case_name)
+        latest = None
+        for root, _, files in os.walk(case_path):
+            for name in files:
+                try:
+                    mtime = os.stat(os.path.join(root, name)).st_mtime_ns
+                except OSError:
+                    continue
+                if latest is None or mtime > latest:
+                    latest = mtime
+        return latest
+
     def get_data_key_for_obs_key(self, observation_key):
-        return self._enkf_main.getObservations()[observation_key].getDataKey()
+        return self.get_observation_catalog().data_key(observation_key)
 
     def get_matching_wildcards(self):
         return self._enkf_main.getObservations().getMatchingKeys
 
     def get_observation_key(self, index):
-        return self._enkf_main.getObservations()[index].getKey()
+        return self.get_observation_catalog().key_at(index)
 
     def load_gen_data(self, case_name, key, report_step):
         return GenDataCollector.loadGenData(
@@ -117,17 +158,21 @@ class LibresFacade(object):
         else:
             return []
 
-    def gather_gen_kw_data(self, case, key):
+    def gather_gen_kw_data(self, case, key, realization_index=None):
         """ :rtype: pandas.DataFrame """
-        data = GenKwCollector.loadAllGenKwData(self._enkf_main, case, [key])
+        data = GenKwCollector.loadAllGenKwData(
+            self._enkf_main, case, [key], realization_index=realization_index
+        )
         if key in data:
             return data[key].to_frame().dropna()
         else:
             return DataFrame()
 
-    def gather_summary_data(self, case, key):
+    def gather_summary_data(self, case, key, realization_index=None):
         """ :rtype: pandas.DataFrame """
-        data = SummaryCollector.loadAllSummaryData(self._enkf_main, case, [key])
+        data = SummaryCollector.loadAllSummaryData(
+            self._enkf_main, case, [key], realization_index=realization_index
+        )
         if not data.empty:
             data = data.reset_index()
 
@@ -176,7 +221,7 @@ class LibresFacade(object):
 
         return data
 
-    def gather_gen_data_data(self, case, key):
+    def gather_gen_data_data(self, case, key, realization_index=None):
         """ :rtype: pandas.DataFrame """
         key_parts = key.split("@")
         key = key_parts[0]
@@ -186,7 +231,10 @@ class LibresFacade(object):
             report_step = 0
 
         try:
-            data = GenDataCollector.loadGenData(self._enkf_main, case, key, report_step)
+            data = GenDataCollector.loadGenData(
+                self._enkf_main, case, key, report_step,
+                realization_index=realization_index
+            )
         except (ValueError, KeyError):
             data = DataFrame()
 
@@ -1,10 +1,13 @@
 import time
 import logging
+from res.enkf.enums import RealizationStateEnum
 from res.job_queue import JobStatusType
 from res.job_queue import ForwardModelStatus
 from res.util import ResLog
 from ecl.util.util import BoolVector
 from ert_shared import ERT
+from ert_shared.feature_toggling import FeatureToggling
+from ert_shared.storage.extraction_api import ExtractionWorker
 
 # A method decorated with the @job_queue decorator implements the following logic:
 #
@@ -31,7 +34,6 @@ class ErtRunError(Exception):
     pass
 
 class BaseRunModel(object):
-
     def __init__(self, queue_config, phase_count=1):
         super(BaseRunModel, self).__init__()
         self._phase = 0
@@ -51,6 +53,7 @@ class BaseRunModel(object):
         self.support_restart = True
         self._run_context = None
         self._last_run_iteration = -1
+        self._storage_worker = ExtractionWorker()
         self.reset( )
 
     def ert(self):
@@ -68,7 +71,14 @@ class BaseRunModel(object):
     def startSimulations(self, arguments):
         try:
             self.initial_realizations_mask = arguments["active_realizations"]
-            run_context = self.runSimulations(arguments)
+            try:
+                run_context = self.runSimulations(arguments)
+            except BaseException:
+                # The failure of the run is the one to report, so a storage
+                # failure is only logged
+                self._waitForStorage(raise_error=False)
+                raise
+            self._waitForStorage()
             self.updateDetailedProgress()
             self.completed_realizations_mask = run_context.get_mask()
         except ErtRunError as e:
@@ -82,6 +92,49 @@ class BaseRunModel(object):
 
         self._run_context = None #delete last active run_context to notify fs_manager that storage is not being written to
 
+    def _waitForStorage(self, raise_error=True):
+        """ Waits for the ensembles submitted to storage during the run to be written. A failure to write them
+        is raised as an ErtRunError, or only logged if raise_error is False. """
+        try:
+            self._storage_worker.join()
+        except Exception as e:
+            if not raise_error:
+                logging.exception("Storage extraction failed")
+                return
+            raise ErtRunError("Storage extraction failed: {}".format(e)) from e
+
+    def _runAndStream(self, run, job_queue, run_context):
+        """ Returns run(job_queue, run_context), which runs the realizations of run_context on job_queue. With
+        streaming to storage enabled, the realizations that succeeded are then submitted to storage one by one.
+        That is done on this thread once run has returned, as libres is not thread safe and run holds it while
+        the realizations are running. """
+        num_successful_realizations = run(job_queue, run_context)
+        if FeatureToggling.is_enabled("new-storage-streaming"):
+            self._submitFinishedRealizations(job_queue, run_context)
+        return num_successful_realizations
+
+    def _submitFinishedRealizations(self, job_queue, run_context):
+        """ Submits the realizations of run_context whose job has succeeded to storage, if they have data. The
+        storage worker ignores realizations that were already submitted. """
+        sim_fs = run_context.get_sim_fs()
+        for idx, run_arg in enumerate(run_context):
+            if not run_context.is_active(idx):
+                continue
+            try:
+                # will throw if not yet submitted (is in a limbo state)
+                queue_index = run_arg.getQueueIndex()
+            except ValueError:
+                continue
+            if job_queue.getJobStatus(queue_index) != JobStatusType.JOB_QUEUE_SUCCESS:
+                continue
+            if sim_fs.getStateMap()[run_arg.iens] != RealizationStateEnum.STATE_HAS_DATA:
+                continue
+            try:
+                self._storage_worker.submit_realization(sim_fs.getCaseName(), run_arg.iens)
+            except Exception:
+                # The realization is read again when the ensemble is submitted
+                logging.exception("Failed to read realization {} for storage".format(run_arg.iens))
+
     def runSimulations(self, job_queue, run_context):
         raise NotImplementedError("Method must be implemented by inheritors!")
 
@@ -3,7 +3,6 @@ from res.enkf import ErtRunContext, EnkfSimulationRunner
 
 from ert_shared.models import BaseRunModel
 from ert_shared import ERT
-from ert_shared.storage.extraction_api import dump_to_new_storage
 
 
 class EnsembleExperiment(BaseRunModel):
@@ -24,7 +23,7 @@ class EnsembleExperiment(BaseRunModel):
 
         self.setPhaseName( run_msg, indeterminate=False)
 
-        num_successful_realizations = self.ert().getEnkfSimulationRunner().runEnsembleExperiment(self._job_queue, run_context)
+        num_successful_realizations = self._runAndStream(self.ert().getEnkfSimulationRunner().runEnsembleExperiment, self._job_queue, run_context)
 
         num_successful_realizations += arguments.get('prev_successful_realizations', 0)
         self.checkHaveSufficientRealizations(num_successful_realizations)
@@ -33,7 +32,7 @@ class EnsembleExperiment(BaseRunModel):
         EnkfSimulationRunner.runWorkflows(HookRuntime.POST_SIMULATION, ERT.ert)
         self.setPhase(1, "Simulations completed.") # done...
 
-        dump_to_new_storage()
+        self._storage_worker.submit()
 
         return run_context
 
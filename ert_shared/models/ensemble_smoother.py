@@ -4,7 +4,6 @@ from res.enkf import ErtRunContext, EnkfSimulationRunner
 from ert_shared.models import BaseRunModel, ErtRunError
 from ert_shared import ERT
 
-from ert_shared.storage.extraction_api import dump_to_new_storage
 class EnsembleSmoother(BaseRunModel):
 
     def __init__(self):
@@ -32,7 +31,7 @@ class EnsembleSmoother(BaseRunModel):
 
         self.setPhaseName("Running forecast...", indeterminate=False)
         self._job_queue = self._queue_config.create_job_queue( )
-        num_successful_realizations = self.ert().getEnkfSimulationRunner().runSimpleStep(self._job_queue, prior_context)
+        num_successful_realizations = self._runAndStream(self.ert().getEnkfSimulationRunner().runSimpleStep, self._job_queue, prior_context)
 
         self.checkHaveSufficientRealizations(num_successful_realizations)
 
@@ -48,7 +47,7 @@ class EnsembleSmoother(BaseRunModel):
             raise ErtRunError("Analysis of simulation failed!")
         EnkfSimulationRunner.runWorkflows(HookRuntime.POST_UPDATE, ert=ERT.ert )
 
-        previous_ensemble_name = dump_to_new_storage(reference=None)
+        previous_ensemble_name = self._storage_worker.submit(reference=None)
 
         self.setPhase(1, "Running simulations...")
         self.ert().getEnkfFsManager().switchFileSystem( prior_context.get_target_fs( ) )
@@ -63,7 +62,7 @@ class EnsembleSmoother(BaseRunModel):
         self.setPhaseName("Running forecast...", indeterminate=False)
 
         self._job_queue = self._queue_config.create_job_queue( )
-        num_successful_realizations = self.ert().getEnkfSimulationRunner().runSimpleStep(self._job_queue, rerun_context)
+        num_successful_realizations = self._runAndStream(self.ert().getEnkfSimulationRunner().runSimpleStep, self._job_queue, rerun_context)
 
         self.checkHaveSufficientRealizations(num_successful_realizations)
 
@@ -73,7 +72,7 @@ class EnsembleSmoother(BaseRunModel):
         self.setPhase(2, "Simulations completed.")
 
         analysis_module_name = self.ert().analysisConfig().activeModuleName()
-        dump_to_new_storage(reference=(previous_ensemble_name, analysis_module_name))
+        self._storage_worker.submit(reference=(previous_ensemble_name, analysis_module_name))
 
         return prior_context
 
@@ -3,7 +3,6 @@ from res.enkf import ErtRunContext, EnkfSimulationRunner
 from ert_shared.models import BaseRunModel, ErtRunError
 from ert_shared import ERT
 
-from ert_shared.storage.extraction_api import dump_to_new_storage
 class IteratedEnsembleSmoother(BaseRunModel):
 
     def __init__(self):
@@ -29,7 +28,7 @@ class IteratedEnsembleSmoother(BaseRunModel):
         EnkfSimulationRunner.runWorkflows(HookRuntime.PRE_SIMULATION, ert=ERT.ert)
 
         self.setPhaseName("Running forecast...", indeterminate=False)
-        num_successful_realizations = self.ert().getEnkfSimulationRunner().runSimpleStep(self._job_queue, run_context)
+        num_successful_realizations = self._runAndStream(self.ert().getEnkfSimulationRunner().runSimpleStep, self._job_queue, run_context)
 
         self.checkHaveSufficientRealizations(num_successful_realizations)
 
@@ -89,7 +88,7 @@ class IteratedEnsembleSmoother(BaseRunModel):
             analysis_success = current_iter > pre_analysis_iter_num
             if analysis_success:
                 analysis_module_name = self.ert().analysisConfig().activeModuleName()
-                previous_ensemble_name = dump_to_new_storage(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
+                previous_ensemble_name = self._storage_worker.submit(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
                 run_context = self.create_context( arguments, current_iter, prior_context = run_context )
                 self.ert().getEnkfFsManager().switchFileSystem(run_context.get_target_fs())
                 self._runAndPostProcess(run_context)
@@ -100,7 +99,7 @@ class IteratedEnsembleSmoother(BaseRunModel):
                 num_retries += 1
 
         analysis_module_name = self.ert().analysisConfig().activeModuleName()
-        previous_ensemble_name = dump_to_new_storage(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
+        previous_ensemble_name = self._storage_worker.submit(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
         if current_iter == (phase_count - 1):
             self.setPhase(phase_count, "Simulations completed.")
         else:
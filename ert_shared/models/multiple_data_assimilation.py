@@ -19,7 +19,6 @@ from res.enkf import ErtRunContext, EnkfSimulationRunner
 
 from ert_shared.models import BaseRunModel, ErtRunError
 from ert_shared import ERT
-from ert_shared.storage.extraction_api import dump_to_new_storage
 import logging
 logger = logging.getLogger(__file__)
 class MultipleDataAssimilation(BaseRunModel):
@@ -71,7 +70,7 @@ class MultipleDataAssimilation(BaseRunModel):
             self.update(run_context , weight)
             EnkfSimulationRunner.runWorkflows(HookRuntime.POST_UPDATE, ert=ERT.ert)
             analysis_module_name = self.ert().analysisConfig().activeModuleName()
-            previous_ensemble_name = dump_to_new_storage(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
+            previous_ensemble_name = self._storage_worker.submit(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
 
         self.setPhaseName("Post processing...", indeterminate=True)
         run_context = self.create_context( arguments , len(weights),  initialize_mask_from_arguments=False, update = False)
@@ -80,7 +79,7 @@ class MultipleDataAssimilation(BaseRunModel):
         self.setPhase(iteration_count + 2, "Simulations completed.")
 
         analysis_module_name = self.ert().analysisConfig().activeModuleName()
-        previous_ensemble_name = dump_to_new_storage(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
+        previous_ensemble_name = self._storage_worker.submit(reference=None if previous_ensemble_name is None else (previous_ensemble_name, analysis_module_name))
 
         return run_context
 
@@ -117,7 +116,7 @@ class MultipleDataAssimilation(BaseRunModel):
 
         phase_string = "Running forecast for iteration: %d" % iteration
         self.setPhaseName(phase_string, indeterminate=False)
-        num_successful_realizations = self.ert().getEnkfSimulationRunner().runSimpleStep(self._job_queue, run_context)
+        num_successful_realizations = self._runAndStream(self.ert().getEnkfSimulationRunner().runSimpleStep, self._job_queue, run_context)
 
         num_successful_realizations += arguments.get('prev_successful_realizations', 0)
         self.checkHaveSufficientRealizations(num_successful_realizations)
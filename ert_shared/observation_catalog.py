@@ -0,0 +1,70 @@
+from collections import namedtuple
+
+import numpy as np
+
+ObservationEntry = namedtuple(
+    "ObservationEntry", ["impl_type_name", "data_key", "step_list", "data_indices"]
+)
+
+
+class ObservationCatalog(object):
+    """
+    Snapshot of the observation configuration of an EnKFMain instance as
+    plain Python and NumPy structures, so that per observation key lookups do
+    not go through the C layer.
+
+    For each observation key the catalog holds the name of the implementation
+    type, the data key, the list of active report steps and, for GEN_OBS, a
+    mapping from report step to the indices of the observed data points.
+    """
+
+    def __init__(self, observations):
+        self._keys = []
+        self._entries = {}
+        for obs_vector in observations:
+            key = obs_vector.getObservationKey()
+            impl_type_name = obs_vector.getImplementationType().name
+            step_list = list(obs_vector.getStepList())
+
+            data_indices = {}
+            if impl_type_name == "GEN_OBS":
+                for step in step_list:
+                    node = obs_vector.getNode(step)
+                    data_indices[step] = np.array(
+                        [node.getIndex(nr) for nr in range(len(node))], dtype=int
+                    )
+
+            self._keys.append(key)
+            self._entries[key] = ObservationEntry(
+                impl_type_name, obs_vector.getDataKey(), step_list, data_indices
+            )
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        """Returns the ObservationEntry of key, raising KeyError if unknown."""
+        return self._entries[key]
+
+    @property
+    def keys(self):
+        """The observation keys, in the order of the observation configuration."""
+        return list(self._keys)
+
+    def key_at(self, index):
+        return self._keys[index]
+
+    def impl_type_name(self, key):
+        return self._entries[key].impl_type_name
+
+    def data_key(self, key):
+        return self._entries[key].data_key
+
+    def step_list(self, key):
+        return self._entries[key].step_list
+
+    def data_indices(self, key, step):
+        return self._entries[key].data_indices[step]
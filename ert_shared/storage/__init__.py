@@ -1,25 +1,48 @@
 from pathlib import Path
-from sqlalchemy.engine import create_engine
 from sqlalchemy.orm import sessionmaker
 
 import alembic
 from alembic import config
 
+from ert_shared.storage.engine import create_storage_engine
+
 
 class ErtStorage:
     SQLALCHEMY_URL = "sqlite:///ert_storage.db"
+    ENGINE_PROFILE = None
+    engine = None
 
-    def initialize(self, url=None):
+    def initialize(self, url=None, profile=None):
         if url is not None:
             self.SQLALCHEMY_URL = url
+        if profile is not None:
+            self.ENGINE_PROFILE = profile
 
-        engine = create_engine(self.SQLALCHEMY_URL)
-        self.Session = sessionmaker(bind=engine)
+        engine = self.connect()
 
         cfg = config.Config(Path(__file__).parent / "alembic.ini")
-        cfg.set_section_option("alembic", "sqlalchemy.url", self.SQLALCHEMY_URL)
-        cfg.attributes["connection"] = engine.connect()
-        alembic.command.upgrade(config=cfg, revision="head")
+        cfg.set_section_option("alembic", "sqlalchemy.url", str(engine.url))
+        with engine.connect() as connection:
+            cfg.attributes["connection"] = connection
+            alembic.command.upgrade(config=cfg, revision="head")
+
+    def connect(self):
+        """
+        Creates a new engine, and the sessions to go with it, for the
+        database at SQLALCHEMY_URL. A process forked after initialize must
+        call this before using the database, as it must not share the
+        connections of its parent.
+        """
+        self.engine = create_storage_engine(
+            self.SQLALCHEMY_URL, profile=self.ENGINE_PROFILE
+        )
+        self.Session = sessionmaker(bind=self.engine)
+        return self.engine
+
+    def dispose(self):
+        """Closes the connections of the current engine, if any."""
+        if self.engine is not None:
+            self.engine.dispose()
 
 
 ERT_STORAGE = ErtStorage()
@@ -0,0 +1,110 @@
+import datetime
+import pickle
+import struct
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.types import TypeDecorator
+
+_MAGIC = b"\x93ARR"
+_HEADER = struct.Struct("<4sBB")
+_OBJECT_DTYPE = np.dtype(object)
+
+# The bytes that hold the header of any one dimensional array, see
+# decode_header
+HEADER_PREFIX_SIZE = 64
+
+
+def encode_array(value):
+    """
+    Encodes value as a binary array: a header with the dtype and shape of
+    the array followed by its contiguous data. Arrays of strings, and of
+    Python objects that are not dates, are pickled after the header instead,
+    as NumPy would pad each string to the length of the longest one.
+    """
+    array = _as_array(value)
+    dtype = array.dtype.str.encode("ascii")
+    header = _HEADER.pack(_MAGIC, len(dtype), array.ndim) + dtype
+    header += struct.pack("<{}Q".format(array.ndim), *array.shape)
+    if array.dtype == _OBJECT_DTYPE:
+        return header + pickle.dumps(array.tolist(), protocol=pickle.HIGHEST_PROTOCOL)
+    return header + np.ascontiguousarray(array).tobytes()
+
+
+def decode_array(value):
+    """
+    Decodes a value encoded by encode_array. The returned array is a
+    read-only view of value, so no data is copied. Values that do not start
+    with the array header are assumed to be pickled, as stored by PickleType.
+    """
+    value = bytes(value)
+    header = decode_header(value)
+    if header is None:
+        return _as_array(pickle.loads(value))
+
+    dtype, shape, offset = header
+    if dtype == _OBJECT_DTYPE:
+        array = np.array(pickle.loads(value[offset:]), dtype=object)
+        return array.reshape(shape)
+    return np.frombuffer(value, dtype=dtype, offset=offset).reshape(shape)
+
+
+def decode_header(value):
+    """
+    Returns the dtype, the shape and the size in bytes of the header of a
+    value encoded by encode_array, from value or just its first bytes, or
+    None if it does not start with a complete array header.
+    """
+    value = bytes(value)
+    if not value.startswith(_MAGIC) or len(value) < _HEADER.size:
+        return None
+    _, dtype_size, ndim = _HEADER.unpack_from(value)
+    offset = _HEADER.size
+    size = offset + dtype_size + 8 * ndim
+    if len(value) < size:
+        return None
+    dtype = np.dtype(value[offset : offset + dtype_size].decode("ascii"))
+    shape = struct.unpack_from("<{}Q".format(ndim), value, offset + dtype_size)
+    return dtype, shape, size
+
+
+def to_list(value):
+    """
+    Returns the items of a NumPy array as Python objects, with dates as
+    datetime.datetime instead of the nanosecond integers that tolist gives.
+    Anything else is returned as is.
+    """
+    if not isinstance(value, np.ndarray):
+        return value
+    if value.dtype.kind == "M":
+        value = value.astype("datetime64[us]")
+    return value.tolist()
+
+
+def _as_array(value):
+    array = np.asarray(value)
+    if array.dtype.kind in "US":
+        return array.astype(object)
+    if array.dtype == _OBJECT_DTYPE and array.size > 0:
+        if all(isinstance(item, datetime.datetime) for item in array.flat):
+            return array.astype("datetime64[ns]")
+    return array
+
+
+class NumpyArray(TypeDecorator):
+    """
+    Column type storing NumPy arrays, or anything np.asarray accepts, with
+    encode_array. Values are read back as read-only NumPy arrays.
+    """
+
+    impl = sa.LargeBinary
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_array(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decode_array(value)
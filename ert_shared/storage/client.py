@@ -1,19 +1,33 @@
+import bisect
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import requests
-from io import StringIO
+from io import BytesIO, StringIO
 from datetime import datetime
 from ert_shared.feature_toggling import feature_enabled
 from ert_shared.storage.server_monitor import ServerMonitor
 
 
+# The binary format of the /data routes, see http_server.DATA_MIMETYPES
+NPY_MIMETYPE = "application/x-npy"
+# The binary format of the batch routes, see http_server.BATCH_MIMETYPES
+NPZ_MIMETYPE = "application/x-npz"
+
+
 def convertdate(dstring):
     return datetime.strptime(dstring, "%Y-%m-%d %H:%M:%S")
 
 
 class StorageClient:
+    # Total size of the bodies of the responses kept for revalidation, see _get
+    _CACHE_SIZE = 256 * 1024 * 1024  # bytes
+
     def __init__(self, base_url, auth):
         self._BASE_URI = base_url
         self._auth = auth
+        self._cache = OrderedDict()
+        self._cache_size = 0
 
     def all_data_type_keys(self):
         """Returns a list of all the keys except observation keys. For each key a dict is returned with info about
@@ -45,14 +59,10 @@ class StorageClient:
         ensembles = self._ref_request("{base}/ensembles".format(base=self._BASE_URI))
         if not ensembles["ensembles"]:
             return []
-        ens_schema = self._ref_request(ensembles["ensembles"][0]["ref_url"])
-
-        def obs_for_response(ref_url):
-            response = self._ref_request(ref_url)
-
-            if "observations" not in response:
-                return []
+        # The keys of the ensemble, with the observations of each response
+        ens_keys = self._ref_request(ensembles["ensembles"][0]["ref_url"] + "/keys")
 
+        def obs_for_response(response):
             for observation in response["observations"]:
                 observation["name"] = response["name"]
 
@@ -62,13 +72,13 @@ class StorageClient:
             {
                 "key": resp["name"],
                 "index_type": None,
-                "observations": obs_for_response(resp["ref_url"]),
+                "observations": obs_for_response(resp),
                 "has_refcase": False,
                 "dimensionality": 2,
                 "metadata": {"data_origin": "Reponse"},
                 "log_scale": False,
             }
-            for resp in ens_schema["responses"]
+            for resp in ens_keys["responses"]
         ]
 
         result.extend(
@@ -82,7 +92,7 @@ class StorageClient:
                     "metadata": {"data_origin": "Parameter"},
                     "log_scale": param["group"].startswith("LOG10_"),
                 }
-                for param in ens_schema["parameters"]
+                for param in ens_keys["parameters"]
             ]
         )
 
@@ -102,9 +112,7 @@ class StorageClient:
         ]
         """
 
-        r = requests.get(
-            "{base}/ensembles".format(base=self._BASE_URI), auth=self._auth
-        )
+        r = self._get("{base}/ensembles".format(base=self._BASE_URI))
 
         print(r.content)
         ensembles = r.json()["ensembles"]
@@ -114,9 +122,15 @@ class StorageClient:
             for ens in ensembles
         ]
 
-    def data_for_key(self, case, key):
+    def data_for_key(
+        self, case, key, realizations=None, start=None, stop=None, step=None
+    ):
         """Returns a pandas DataFrame with the datapoints for a given key for a given case. The row index is
-        the realization number, and the column index is a multi-index with (key, index/date)"""
+        the realization number, and the column index is a multi-index with (key, index/date)
+
+        Only the given realizations are fetched if realizations is not None. For responses, start, stop and step
+        select the index/dates as a slice does, where start and stop are either positions or dates. A range of
+        dates includes start and excludes stop."""
 
         if key.startswith("LOG10_"):
             key = key[6:]
@@ -135,9 +149,18 @@ class StorageClient:
 
             response = self._ref_request(resp["ref_url"])
 
-            df = self._read_csv(response["alldata_url"], header=None)
             indexes = self._axis_request(response["axis"]["data"])
-            df.columns = indexes
+            if isinstance(start, datetime):
+                start = bisect.bisect_left(indexes, start)
+            if isinstance(stop, datetime):
+                stop = bisect.bisect_left(indexes, stop)
+
+            df = self._read_data(
+                response["alldata_url"],
+                params=self._data_params(realizations, start, stop, step),
+            )
+            if not df.empty:
+                df.columns = indexes[start:stop:step]
             break
 
         # Parameter key - we only check if necessary
@@ -148,10 +171,52 @@ class StorageClient:
 
                 parameter = self._ref_request(param["ref_url"])
 
-                df = self._read_csv(parameter["alldata_url"], header=None)
+                df = self._read_data(
+                    parameter["alldata_url"], params=self._data_params(realizations)
+                )
 
         return df
 
+    def data_for_keys(self, case, keys, realizations=None):
+        """Returns a dict from each of the given keys to its pandas DataFrame for a given case, as returned by
+        data_for_key. The data of all the responses is fetched in one request, and that of all the parameters
+        in another.
+
+        Only the given realizations are fetched if realizations is not None."""
+
+        names = {key: key[6:] if key.startswith("LOG10_") else key for key in keys}
+
+        ensembles = self._ref_request("{base}/ensembles".format(base=self._BASE_URI))
+        ens = [ens for ens in ensembles["ensembles"] if ens["name"] == case][0]
+
+        # The batch routes leave out the names they do not know, so all of
+        # them are asked for both as responses and as parameters
+        wanted = sorted(set(names.values()))
+        data = {}
+        if wanted:
+            batch = self._batch_request(
+                ens["ref_url"] + "/responses:batch",
+                wanted,
+                params=self._data_params(realizations),
+            )
+            for name, axis, indices, values in batch:
+                df = pd.DataFrame(values, index=indices)
+                if not df.empty:
+                    df.columns = self._axis_request(axis)
+                data[name] = df
+
+            batch = self._batch_request(
+                ens["ref_url"] + "/parameters:batch",
+                wanted,
+                params=self._data_params(realizations),
+            )
+            for name, _, indices, values in batch:
+                # As in data_for_key, a response takes precedence
+                if data.get(name, pd.DataFrame()).empty:
+                    data[name] = pd.DataFrame(values, index=indices)
+
+        return {key: data.get(name, pd.DataFrame()) for key, name in names.items()}
+
     def observations_for_obs_keys(self, case, obs_keys):
         """Returns a pandas DataFrame with the datapoints for a given observation key for a given case. The row index
         is the realization number, and the column index is a multi-index with (obs_key, index/date, obs_index),
@@ -198,10 +263,32 @@ class StorageClient:
         """A noop---the lifecycle of the server is managed by the user."""
         pass
 
-    def _read_csv(self, data_url, **kwargs):
-        resp = requests.get(data_url, auth=self._auth)
-        sio = StringIO(resp.text)
-        return pd.read_csv(sio, **kwargs)
+    def _read_data(self, data_url, params=None):
+        """Returns the data at data_url with one row per realization. It is
+        fetched as .npy, or as CSV from servers that only send that."""
+        resp = self._get(
+            data_url,
+            params=params,
+            headers={"Accept": "{}, text/csv;q=0.5".format(NPY_MIMETYPE)},
+        )
+        if resp.headers.get("Content-Type") == NPY_MIMETYPE:
+            df = pd.DataFrame(np.load(BytesIO(resp.content), allow_pickle=False))
+        elif resp.text:
+            df = pd.read_csv(StringIO(resp.text), header=None)
+        else:
+            return pd.DataFrame()
+
+        realizations = resp.headers.get("X-Realizations")
+        if realizations and not df.empty:
+            df.index = [int(index) for index in realizations.split(",")]
+        return df
+
+    @staticmethod
+    def _data_params(realizations=None, start=None, stop=None, step=None):
+        params = {"start": start, "stop": stop, "step": step}
+        if realizations is not None:
+            params["realizations"] = ",".join(str(index) for index in realizations)
+        return {name: value for name, value in params.items() if value is not None}
 
     def _axis_request(self, data):
         try:
@@ -212,14 +299,93 @@ class StorageClient:
             raise ValueError("Could not parse indexes as either int or dates", e)
 
     def _data_request(self, data_url):
-        resp = requests.get(data_url, auth=self._auth)
+        resp = self._get(data_url)
         data = resp.content.decode(resp.encoding)
         return list(map(float, data.split(",")))
 
     def _ref_request(self, data_url):
-        resp = requests.get(data_url, auth=self._auth)
+        resp = self._get(data_url)
         return resp.json()
 
+    def _batch_request(self, batch_url, names, params=None):
+        """Posts names to the batch route at batch_url and returns the name,
+        axis, realizations and data of each item of the batch, with None as
+        the axis of parameters. It is fetched as .npz, or as JSON from
+        servers that only send that."""
+        resp = requests.post(
+            batch_url,
+            json={"names": names},
+            params=params,
+            headers={"Accept": "{}, application/json;q=0.5".format(NPZ_MIMETYPE)},
+            auth=self._auth,
+        )
+        resp.raise_for_status()
+
+        if resp.headers.get("Content-Type") == NPZ_MIMETYPE:
+            with np.load(BytesIO(resp.content), allow_pickle=False) as npz:
+                entries = []
+                for position, name in enumerate(npz["names"].tolist()):
+                    axis = None
+                    if "axis_{}".format(position) in npz:
+                        axis = npz["axis_{}".format(position)]
+                        if axis.dtype.kind == "M":
+                            axis = axis.astype("datetime64[us]")
+                        axis = axis.tolist()
+                    entries.append(
+                        (
+                            name,
+                            axis,
+                            npz["realizations_{}".format(position)].tolist(),
+                            npz["data_{}".format(position)],
+                        )
+                    )
+                return entries
+
+        batch = resp.json()
+        entries = [
+            (
+                response["name"],
+                response["axis"]["data"],
+                response["realizations"],
+                response["data"],
+            )
+            for response in batch.get("responses", [])
+        ]
+        entries.extend(
+            (
+                param["group"] + ":" + param["key"],
+                None,
+                param["realizations"],
+                param["data"],
+            )
+            for param in batch.get("parameters", [])
+        )
+        return entries
+
+    def _get(self, url, params=None, headers=None):
+        """GETs url. A response with an ETag is kept, and returned again for
+        the same request as long as the server answers 304 Not Modified to
+        revalidating it."""
+        headers = dict(headers or {})
+        key = (url, frozenset((params or {}).items()), frozenset(headers.items()))
+        cached = self._cache.pop(key, None)
+        if cached is not None:
+            self._cache_size -= len(cached.content)
+            headers["If-None-Match"] = cached.headers["ETag"]
+
+        resp = requests.get(url, params=params, headers=headers, auth=self._auth)
+        if resp.status_code == 304 and cached is not None:
+            resp = cached
+        elif resp.status_code != 200 or "ETag" not in resp.headers:
+            return resp
+
+        self._cache[key] = resp
+        self._cache_size += len(resp.content)
+        while self._cache_size > self._CACHE_SIZE:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_size -= len(evicted.content)
+        return resp
+
 
 @feature_enabled("new-storage")
 def create_client():
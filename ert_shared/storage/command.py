@@ -18,6 +18,43 @@ def add_parser_options(ap):
         help="Don't create storage_server.json",
     )
     ap.add_argument(
-        "--rdb-url", type=str, default=f"sqlite:///{os.getcwd()}/ert_storage.db"
+        "--rdb-url",
+        type=str,
+        default=f"sqlite:///{os.getcwd()}/ert_storage.db",
+        help="URL of the storage database. The engine profile of an SQLite "
+        "database can be selected with a profile parameter, as in "
+        "sqlite:///ert_storage.db?profile=wal. Defaults to the 'default' "
+        "profile. The 'wal' profile lets the server read while ERT writes, "
+        "but only works on local disks, not on network filesystems such as "
+        "NFS, and leaves the database file in WAL mode.",
+    )
+    ap.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="Size in megabytes of the cache of ensemble, response and "
+        "parameter resources kept by the server.",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of server processes. Each has its own database "
+        "connections and cache.",
+    )
+    ap.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="Number of threads handling requests in each server process. "
+        "More than one uses gunicorn's gthread worker class, unless another "
+        "is given with --worker-class.",
+    )
+    ap.add_argument(
+        "--worker-class",
+        type=str,
+        default="sync",
+        help="The gunicorn worker class of the server processes, such as "
+        "sync, gthread or gevent.",
     )
     ap.add_argument("--debug", action="store_true", default=False)
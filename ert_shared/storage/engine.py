@@ -0,0 +1,95 @@
+import copy
+
+import sqlalchemy as sa
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+# Engine profiles for file backed SQLite databases. The "wal" profile puts
+# the database in write-ahead logging mode, in which readers never wait for
+# a writer, not even while it commits, so the storage server keeps serving
+# requests while ERT writes an ensemble. It must only be selected for
+# databases on a local disk: WAL keeps its index in shared memory, which
+# does not work on network filesystems such as NFS. The journal mode is
+# stored in the database file, so a database once opened with "wal" stays
+# in WAL mode when it is later opened with "default". It is turned off
+# again with PRAGMA journal_mode=DELETE.
+ENGINE_PROFILES = {
+    "default": {},
+    "wal": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            # In WAL mode NORMAL is safe against corruption, it only syncs
+            # at checkpoints instead of at every commit
+            "synchronous": "NORMAL",
+            "cache_size": -64000,  # 64 MB
+            "mmap_size": 256 * 1024 * 1024,
+            "temp_store": "MEMORY",
+            "busy_timeout": 30000,  # ms
+        },
+        "pool_size": 5,
+        "max_overflow": 10,
+        "timeout": 30,  # s
+    },
+}
+
+DEFAULT_PROFILE = "default"
+
+
+def _replace_query(url, query):
+    """
+    Returns a copy of url with the given query parameters. The URL is
+    immutable from SQLAlchemy 1.4 on, where it has the set method, earlier
+    versions only allow assigning to the attributes of a copy.
+    """
+    if hasattr(url, "set"):
+        return url.set(query=query)
+    url = copy.copy(url)
+    url.query = query
+    return url
+
+
+def create_storage_engine(url, profile=None):
+    """
+    Creates the engine of the storage database at url. A profile query
+    parameter in url, as in sqlite:///ert_storage.db?profile=wal, takes
+    precedence over the profile argument, and neither is passed on to the
+    database. The profiles only apply to file backed SQLite databases, any
+    other database gets a plain engine.
+
+    :rtype: sqlalchemy.engine.Engine
+    """
+    url = make_url(url)
+    query = dict(url.query)
+    profile_name = query.pop("profile", profile or DEFAULT_PROFILE)
+    url = _replace_query(url, query)
+    if profile_name not in ENGINE_PROFILES:
+        raise ValueError(
+            "Unknown storage engine profile '{}', expected one of {}".format(
+                profile_name, ", ".join(sorted(ENGINE_PROFILES))
+            )
+        )
+
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return sa.create_engine(url)
+
+    profile = ENGINE_PROFILES[profile_name]
+    if not profile:
+        return sa.create_engine(url)
+
+    engine = sa.create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=profile["pool_size"],
+        max_overflow=profile["max_overflow"],
+        connect_args={"timeout": profile["timeout"], "check_same_thread": False},
+    )
+    pragmas = profile["pragmas"]
+
+    @sa.event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute("PRAGMA {}={}".format(name, value))
+        cursor.close()
+
+    return engine
@@ -1,45 +1,209 @@
+from collections import namedtuple
+from functools import partial
 from logging import exception
+import queue
+import threading
 import time
 
+import numpy as np
+
 from ert_data.measured import MeasuredData
 from ert_shared import ERT
 from ert_shared.storage import ERT_STORAGE
-from ert_shared.feature_toggling import feature_enabled
+from ert_shared.feature_toggling import FeatureToggling, feature_enabled
 from ert_shared.storage.models import ParameterPrior
 from ert_shared.storage.rdb_api import RdbApi
 
+from res.enkf.enums import RealizationStateEnum
 from res.enkf.export import MisfitCollector
 import logging
 
 logger = logging.getLogger(__file__)
 
 
-def _create_ensemble(rdb_api, reference, priors):
+ExtractedEnsemble = namedtuple(
+    "ExtractedEnsemble",
+    [
+        "name",
+        "reference",
+        "size",
+        "priors",
+        "observations",
+        "parameters",
+        "responses",
+        "update_data",
+    ],
+)
+
+UpdateData = namedtuple("UpdateData", ["data_keys", "active_observations", "misfits"])
+
+ExtractedRealization = namedtuple(
+    "ExtractedRealization", ["ensemble_name", "index", "parameters", "responses"]
+)
+
+
+def _extract_ensemble(reference):
+    """
+    Reads everything that is written to storage for the current case from
+    libres, without touching the database.
+    """
     facade = ERT.enkf_facade
     ensemble_name = facade.get_current_case_name()
-    ensemble = rdb_api.add_ensemble(ensemble_name, reference=reference, priors=priors)
+    observations = _extract_observations(facade)
+    responses = _extract_responses(facade, ensemble_name)
+    return ExtractedEnsemble(
+        name=ensemble_name,
+        reference=reference,
+        size=facade.get_ensemble_size(),
+        priors=facade.gen_kw_priors() if reference is None else {},
+        observations=observations,
+        parameters=_extract_parameters(facade, ensemble_name),
+        responses=responses,
+        update_data=_extract_update_data(facade, observations, responses),
+    )
+
+
+def _dump_ensemble(rdb_session, extracted):
+    """
+    Writes an ensemble read by _extract_ensemble to the database, and returns
+    its name.
+    """
+    start_time = time.time()
+    rdb_api = RdbApi(session=rdb_session)
+
+    try:
+        priors = _dump_priors(groups=extracted.priors, rdb_api=rdb_api)
+
+        ensemble = rdb_api.add_ensemble(
+            extracted.name, reference=extracted.reference, priors=priors
+        )
+        rdb_api.add_realizations(
+            indices=range(extracted.size), ensemble_name=ensemble.name
+        )
+        if extracted.observations is not None:
+            _dump_observations(rdb_api=rdb_api, observations=extracted.observations)
+
+        _dump_parameters(
+            rdb_api=rdb_api,
+            parameters=extracted.parameters,
+            ensemble_name=ensemble.name,
+            priors=priors,
+        )
+        _dump_response(
+            rdb_api=rdb_api,
+            responses=extracted.responses,
+            ensemble_name=ensemble.name,
+        )
+        if extracted.update_data is not None:
+            _dump_update_data(rdb_api, ensemble, extracted.update_data)
 
-    for i in range(facade.get_ensemble_size()):
-        rdb_api.add_realization(index=i, ensemble_name=ensemble.name)
+        rdb_session.commit()
+        ensemble_name = ensemble.name
 
-    return ensemble
+        end_time = time.time()
+        logger.debug(
+            "Extraction done... (Took {:.2f} seconds)".format(end_time - start_time)
+        )
+        logger.debug(
+            "All ensembles in database: {}".format(
+                ", ".join([ensemble.name for ensemble in rdb_api.get_all_ensembles()])
+            )
+        )
+
+    except:
+        rdb_session.rollback()
+        raise
+    finally:
+        rdb_session.close()
+
+    return ensemble_name
 
 
-def _extract_and_dump_observations(rdb_api):
+def _extract_realization(ensemble_name, index):
+    """
+    Reads the parameters and responses of a single realization from libres.
+    """
     facade = ERT.enkf_facade
+    return ExtractedRealization(
+        ensemble_name=ensemble_name,
+        index=index,
+        parameters=_extract_parameters(facade, ensemble_name, realization_index=index),
+        responses=_extract_responses(facade, ensemble_name, realization_index=index),
+    )
 
-    observation_keys = [
-        facade.get_observation_key(nr) for nr, _ in enumerate(facade.get_observations())
-    ]
+
+def _dump_realization(rdb_session, extracted):
+    """
+    Writes a realization read by _extract_realization to its ensemble, which
+    must already be in the database.
+    """
+    rdb_api = RdbApi(session=rdb_session)
+
+    try:
+        _dump_parameters(
+            rdb_api=rdb_api,
+            parameters=extracted.parameters,
+            ensemble_name=extracted.ensemble_name,
+            priors=[],
+        )
+        _dump_response(
+            rdb_api=rdb_api,
+            responses=extracted.responses,
+            ensemble_name=extracted.ensemble_name,
+        )
+        rdb_session.commit()
+        logger.debug(
+            "Extracted realization {} of '{}'".format(
+                extracted.index, extracted.ensemble_name
+            )
+        )
+    except:
+        rdb_session.rollback()
+        raise
+    finally:
+        rdb_session.close()
+
+
+def _dump_streamed_ensemble(rdb_session, extracted):
+    """
+    Completes an ensemble whose realizations were written one by one with
+    _dump_realization, by linking it to its reference or priors and writing
+    its update data.
+    """
+    rdb_api = RdbApi(session=rdb_session)
+
+    try:
+        if extracted.reference is not None:
+            rdb_api.add_update(extracted.name, reference=extracted.reference)
+        else:
+            priors = _dump_priors(groups=extracted.priors, rdb_api=rdb_api)
+            rdb_api.set_priors(extracted.name, priors=priors)
+
+        if extracted.update_data is not None:
+            ensemble = rdb_api.get_ensemble(name=extracted.name)
+            _dump_update_data(rdb_api, ensemble, extracted.update_data)
+
+        rdb_session.commit()
+    except:
+        rdb_session.rollback()
+        raise
+    finally:
+        rdb_session.close()
+
+    return extracted.name
+
+
+def _extract_observations(facade):
+    observation_keys = facade.get_observation_keys()
 
     if len(observation_keys) == 0:
-        return
-    measured_data = MeasuredData(facade, observation_keys, load_data=False)
+        return None
+    # GEN_OBS keys are loaded dense, so the stored data indices keep the
+    # positional meaning of the observations already in the database
+    measured_data = MeasuredData(facade, observation_keys, load_data=False, dense=True)
 
     measured_data.remove_inactive_observations()
-    observations = measured_data.data.loc[["OBS", "STD"]]
-
-    _dump_observations(rdb_api=rdb_api, observations=observations)
+    return measured_data.data.loc[["OBS", "STD"]]
 
 
 def _dump_observations(rdb_api, observations):
@@ -61,46 +225,44 @@ def _dump_observations(rdb_api, observations):
         )
 
 
-def _extract_and_dump_parameters(rdb_api, ensemble_name, priors):
-    facade = ERT.enkf_facade
-
+def _extract_parameters(facade, ensemble_name, realization_index=None):
     parameter_keys = [
         key for key in facade.all_data_type_keys() if facade.is_gen_kw_key(key)
     ]
-    all_parameters = {
-        key: facade.gather_gen_kw_data(ensemble_name, key) for key in parameter_keys
+    return {
+        key: facade.gather_gen_kw_data(
+            ensemble_name, key, realization_index=realization_index
+        )
+        for key in parameter_keys
     }
 
-    _dump_parameters(
-        rdb_api=rdb_api,
-        parameters=all_parameters,
-        ensemble_name=ensemble_name,
-        priors=priors,
-    )
-
 
 def _dump_parameters(rdb_api, parameters, ensemble_name, priors):
+    ensemble = rdb_api.get_ensemble(name=ensemble_name)
+    parameter_definitions = {
+        (definition.group, definition.name): definition
+        for definition in ensemble.parameter_definitions
+    }
     for key, parameter in parameters.items():
         group, name = key.split(":")
-        prior = next((x for x in priors if x.key == name and x.group == group), None)
-        parameter_definition = rdb_api.add_parameter_definition(
-            name=name, group=group, ensemble_name=ensemble_name, prior=prior
-        )
-        for realization_index, value in parameter.iterrows():
-            value_df = float(value)
-
-            rdb_api.add_parameter(
-                name=parameter_definition.name,
-                group=parameter_definition.group,
-                value=value_df,
-                realization_index=realization_index,
-                ensemble_name=ensemble_name,
+        parameter_definition = parameter_definitions.get((group, name))
+        if parameter_definition is None:
+            prior = next(
+                (x for x in priors if x.key == name and x.group == group), None
             )
+            parameter_definition = rdb_api.add_parameter_definition(
+                name=name, group=group, ensemble_name=ensemble_name, prior=prior
+            )
+        values = parameter.iloc[:, 0].astype(float)
+        rdb_api.add_parameters(
+            name=parameter_definition.name,
+            group=parameter_definition.group,
+            values=dict(zip(values.index, values.to_list())),
+            ensemble_name=ensemble_name,
+        )
 
 
-def _extract_and_dump_responses(rdb_api, ensemble_name):
-    facade = ERT.enkf_facade
-
+def _extract_responses(facade, ensemble_name, realization_index=None):
     gen_data_keys = [
         key for key in facade.all_data_type_keys() if facade.is_gen_data_key(key)
     ]
@@ -108,43 +270,45 @@ def _extract_and_dump_responses(rdb_api, ensemble_name):
         key for key in facade.all_data_type_keys() if facade.is_summary_key(key)
     ]
 
-    gen_data_data = {
-        key.split("@")[0]: facade.gather_gen_data_data(case=ensemble_name, key=key)
+    responses = {
+        key.split("@")[0]: facade.gather_gen_data_data(
+            case=ensemble_name, key=key, realization_index=realization_index
+        )
         for key in gen_data_keys
     }
-    summary_data = {
-        key: facade.gather_summary_data(case=ensemble_name, key=key)
-        for key in summary_data_keys
-    }
-
-    _dump_response(
-        rdb_api=rdb_api,
-        responses=gen_data_data,
-        ensemble_name=ensemble_name,
-    )
-    _dump_response(
-        rdb_api=rdb_api,
-        responses=summary_data,
-        ensemble_name=ensemble_name,
+    responses.update(
+        {
+            key: facade.gather_summary_data(
+                case=ensemble_name, key=key, realization_index=realization_index
+            )
+            for key in summary_data_keys
+        }
     )
+    return responses
 
 
 def _dump_response(rdb_api, responses, ensemble_name):
+    ensemble = rdb_api.get_ensemble(name=ensemble_name)
+    response_definitions = {
+        definition.name: definition for definition in ensemble.response_definitions
+    }
     for key, response in responses.items():
-        indices_df = response.index.to_list()
-        response_definition = rdb_api.add_response_definition(
-            name=key,
-            indices=indices_df,
-            ensemble_name=ensemble_name,
-        )
-        for realization_index, values in response.iteritems():
-            values_df = values.to_list()
-            rdb_api.add_response(
-                name=response_definition.name,
-                values=values_df,
-                realization_index=realization_index,
+        response_definition = response_definitions.get(key)
+        if response_definition is None:
+            indices_df = response.index.to_list()
+            response_definition = rdb_api.add_response_definition(
+                name=key,
+                indices=indices_df,
                 ensemble_name=ensemble_name,
             )
+        rdb_api.add_responses(
+            name=response_definition.name,
+            values={
+                realization_index: values.to_numpy()
+                for realization_index, values in response.iteritems()
+            },
+            ensemble_name=ensemble_name,
+        )
 
 
 def _extract_active_observations(facade):
@@ -159,26 +323,101 @@ def _extract_active_observations(facade):
     for block_num in range(obs_data.get_num_blocks()):
         block = obs_data.get_block(block_num)
         obs_key = block.get_obs_key()
-        active_list = [block.is_active(i) for i in range(len(block))]
-        active_observations[obs_key] = active_list
+        size = len(block)
+        is_active = block.is_active
+        active_observations[obs_key] = np.fromiter(
+            (is_active(i) for i in range(size)), dtype=bool, count=size
+        )
     return active_observations
 
 
-def _extract_and_dump_update_data(ensemble_id, ensemble_name, rdb_api):
-    facade = ERT.enkf_facade
+def _calculate_misfits(
+    fs, obs_vectors, realizations, observations=None, responses=None
+):
+    """
+    Returns the total chi-square misfit of each of the given realizations for
+    each observation vector, by observation key and realization. The misfit
+    is the sum of ((simulated - observed) / std) ** 2 over the data points of
+    the key, computed for all realizations at once from the extracted
+    observations and responses. Where those do not cover a key or a
+    realization, as for BLOCK_OBS keys, libres calculates the misfit.
+    """
+    misfits = {}
+    for obs_vector in obs_vectors:
+        key = obs_vector.getObservationKey()
+        chi2 = _total_chi2(
+            observations, responses, key, obs_vector.getDataKey(), realizations
+        )
+        misfits[key] = {
+            realization: chi2[realization]
+            if realization in chi2
+            else obs_vector.getTotalChi2(fs, realization)
+            for realization in realizations
+        }
+    return misfits
+
+
+def _total_chi2(observations, responses, key, data_key, realizations):
+    """
+    Returns the total chi-square misfit of key by realization, for the
+    realizations whose response holds a value at every observed index of the
+    key. The observations are indexed into the response on their key index,
+    which is the data index of GEN_OBS keys and the date of SUMMARY_OBS keys.
+    """
+    if observations is None or responses is None or data_key not in responses:
+        return {}
+    if key not in observations.columns.get_level_values(0):
+        return {}
+
+    observation = observations[key]
+    response = responses[data_key]
+    key_index = observation.columns.get_level_values(0)
+    if key_index.has_duplicates or not key_index.isin(response.index).all():
+        return {}
+
+    columns = [realization for realization in realizations if realization in response]
+    simulated = response.loc[key_index, columns].to_numpy(dtype=float)
+    values = observation.loc["OBS"].to_numpy(dtype=float)[:, np.newaxis]
+    std = observation.loc["STD"].to_numpy(dtype=float)[:, np.newaxis]
+    chi2 = np.sum(((simulated - values) / std) ** 2, axis=0)
+    return {
+        realization: float(value)
+        for realization, value in zip(columns, chi2)
+        if not np.isnan(value)
+    }
+
+
+def _extract_update_data(facade, observations=None, responses=None):
+    observation_keys = facade.get_observation_keys()
+    if len(observation_keys) == 0:
+        return None
 
     fs = facade.get_current_fs()
-    realizations = MisfitCollector.createActiveList(ERT.ert, fs)
+    realizations = list(MisfitCollector.createActiveList(ERT.ert, fs))
+    obs_vectors = list(facade.get_observations())
+
+    return UpdateData(
+        data_keys={
+            obs_vector.getObservationKey(): obs_vector.getDataKey()
+            for obs_vector in obs_vectors
+        },
+        active_observations=_extract_active_observations(facade),
+        misfits=_calculate_misfits(
+            fs, obs_vectors, realizations, observations, responses
+        ),
+    )
 
-    active_observations = _extract_active_observations(facade)
-    ensemble = rdb_api.get_ensemble_by_id(ensemble_id=ensemble_id)
+
+def _dump_update_data(rdb_api, ensemble, update_data):
     update_id = ensemble.parent.id if ensemble.parent is not None else None
+    active_observations = update_data.active_observations
+    misfits = update_data.misfits
+    response_ids = rdb_api._get_response_ids(ensemble_id=ensemble.id)
 
-    for obs_vector in facade.get_observations():
-        observation_key = obs_vector.getObservationKey()
-        response_key = obs_vector.getDataKey()
+    misfit_rows = []
+    for observation_key, response_key in update_data.data_keys.items():
         response_definition = rdb_api._get_response_definition(
-            response_key, ensemble_id
+            response_key, ensemble.id
         )
 
         if active_observations is not None:
@@ -191,69 +430,210 @@ def _extract_and_dump_update_data(ensemble_id, ensemble_name, rdb_api):
             active=active_blob if active_observations is not None else None,
             update_id=update_id,
         )
-        for realization_number in realizations:
-            response = rdb_api.get_response(
-                name=response_key,
-                realization_index=realization_number,
-                ensemble_name=ensemble_name,
-            )
-            misfit_value = obs_vector.getTotalChi2(fs, realization_number)
-            rdb_api._add_misfit(
-                value=misfit_value, link_id=link.id, response_id=response.id
+        if observation_key not in misfits:
+            continue
+        for realization_number, misfit_value in misfits[observation_key].items():
+            misfit_rows.append(
+                (
+                    misfit_value,
+                    link.id,
+                    response_ids[(response_key, realization_number)],
+                )
             )
+    rdb_api._add_misfits(misfit_rows)
 
 
 @feature_enabled("new-storage")
 def dump_to_new_storage(reference=None, rdb_session=None):
-
-    start_time = time.time()
     logger.debug("Starting extraction...")
+    extracted = _extract_ensemble(reference)
 
     if rdb_session is None:
         rdb_session = ERT_STORAGE.Session()
 
-    rdb_api = RdbApi(session=rdb_session)
-
-    try:
-        priors = _extract_and_dump_priors(rdb_api=rdb_api) if reference is None else []
-
-        ensemble = _create_ensemble(rdb_api, reference=reference, priors=priors)
-        _extract_and_dump_observations(rdb_api=rdb_api)
-
-        _extract_and_dump_parameters(
-            rdb_api=rdb_api,
-            ensemble_name=ensemble.name,
-            priors=priors,
+    return _dump_ensemble(rdb_session, extracted)
+
+
+class ExtractionWorker(object):
+    """
+    Writes ensembles to storage from a single background thread, so that a
+    run does not wait for the database between iterations.
+
+    submit reads the data of the current case from libres in the calling
+    thread, as libres is not thread safe, and queues it. The worker writes
+    the queued ensembles in the order they were submitted, so an ensemble is
+    always written after the ensemble it was updated from. If writing an
+    ensemble fails, the ensembles queued after it are dropped, and the error
+    is raised by join.
+
+    With the new-storage-streaming feature enabled, the realizations of a
+    running ensemble can also be submitted one by one with
+    submit_realization, as they get their data. The ensemble is then
+    completed by submit, which only reads the realizations that were not
+    submitted yet.
+    """
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._streamed_ensemble = None
+        self._streamed_realizations = set()
+        self._failed_realizations = set()
+        self._failed_ensembles = set()
+        self._submitted_ensembles = set()
+
+    @feature_enabled("new-storage")
+    def submit(self, reference=None):
+        """
+        Queues the current case for writing, and returns the name of the
+        ensemble it will be written as.
+        """
+        logger.debug("Starting extraction...")
+        with self._lock:
+            if (
+                self._streamed_ensemble is not None
+                and self._streamed_ensemble == ERT.enkf_facade.get_current_case_name()
+            ):
+                ensemble_name = self._submit_streamed_ensemble(reference)
+            else:
+                extracted = _extract_ensemble(reference)
+                ensemble_name = extracted.name
+                self._put(ensemble_name, partial(_dump_ensemble, extracted=extracted))
+            self._submitted_ensembles.add(ensemble_name)
+            return ensemble_name
+
+    @feature_enabled("new-storage")
+    @feature_enabled("new-storage-streaming")
+    def submit_realization(self, ensemble_name, index):
+        """
+        Queues a realization of a running ensemble, which must have got its
+        data, for writing. Realizations that were already submitted, and
+        realizations of ensembles that were already submitted, are ignored.
+
+        A realization, or an ensemble, that fails to be read is only tried
+        once. It is read again by submit, with the rest of the ensemble.
+        """
+        with self._lock:
+            if ensemble_name in self._submitted_ensembles:
+                return
+            if ensemble_name != self._streamed_ensemble:
+                if ensemble_name in self._failed_ensembles:
+                    return
+                try:
+                    self._start_streamed_ensemble(ensemble_name)
+                except Exception:
+                    self._failed_ensembles.add(ensemble_name)
+                    raise
+            elif (
+                index in self._streamed_realizations
+                or index in self._failed_realizations
+            ):
+                return
+            try:
+                extracted = _extract_realization(ensemble_name, index)
+            except Exception:
+                self._failed_realizations.add(index)
+                raise
+            self._put(ensemble_name, partial(_dump_realization, extracted=extracted))
+            self._streamed_realizations.add(index)
+
+    def join(self):
+        """
+        Waits until all submitted ensembles are written, and raises the error
+        of the first one that failed, if any.
+        """
+        with self._lock:
+            if self._thread is not None:
+                self._jobs.put(None)
+                self._thread.join()
+                self._thread = None
+
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _start_streamed_ensemble(self, ensemble_name):
+        facade = ERT.enkf_facade
+        extracted = ExtractedEnsemble(
+            name=ensemble_name,
+            reference=None,
+            size=facade.get_ensemble_size(),
+            priors={},
+            observations=_extract_observations(facade),
+            parameters={},
+            responses={},
+            update_data=None,
         )
-        _extract_and_dump_responses(rdb_api=rdb_api, ensemble_name=ensemble.name)
-        _extract_and_dump_update_data(ensemble.id, ensemble.name, rdb_api)
-
-        rdb_session.commit()
-        ensemble_name = ensemble.name
+        self._put(ensemble_name, partial(_dump_ensemble, extracted=extracted))
+        self._streamed_ensemble = ensemble_name
+        self._streamed_realizations = set()
+        self._failed_realizations = set()
+
+    def _submit_streamed_ensemble(self, reference):
+        facade = ERT.enkf_facade
+        ensemble_name = self._streamed_ensemble
+        has_data = int(RealizationStateEnum.STATE_HAS_DATA)
+        for index, state in enumerate(facade.get_realization_states()):
+            if state == has_data and index not in self._streamed_realizations:
+                extracted = _extract_realization(ensemble_name, index)
+                self._put(
+                    ensemble_name, partial(_dump_realization, extracted=extracted)
+                )
 
-        end_time = time.time()
-        logger.debug(
-            "Extraction done... (Took {:.2f} seconds)".format(end_time - start_time)
+        extracted = ExtractedEnsemble(
+            name=ensemble_name,
+            reference=reference,
+            size=facade.get_ensemble_size(),
+            priors=facade.gen_kw_priors() if reference is None else {},
+            observations=None,
+            parameters={},
+            responses={},
+            update_data=_extract_update_data(facade),
         )
-        logger.debug(
-            "All ensembles in database: {}".format(
-                ", ".join([ensemble.name for ensemble in rdb_api.get_all_ensembles()])
+        self._put(ensemble_name, partial(_dump_streamed_ensemble, extracted=extracted))
+        self._streamed_ensemble = None
+        self._streamed_realizations = set()
+        self._failed_realizations = set()
+        return ensemble_name
+
+    def _put(self, ensemble_name, job):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="storage-extraction", daemon=True
             )
-        )
-
-    except:
-        rdb_session.rollback()
-        raise
-    finally:
-        rdb_session.close()
-
-    return ensemble_name
+            self._thread.start()
+        self._jobs.put((ensemble_name, job))
+
+    def _run(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+            ensemble_name, job = item
+            if self._error is not None:
+                logger.warning(
+                    "Skipping extraction of {} after an earlier failure".format(
+                        _describe_job(ensemble_name, job)
+                    )
+                )
+                continue
+            try:
+                job(ERT_STORAGE.Session())
+            except Exception as e:
+                logger.exception(
+                    "Extraction of {} failed".format(_describe_job(ensemble_name, job))
+                )
+                self._error = e
 
 
-def _extract_and_dump_priors(rdb_api):
-    facade = ERT.enkf_facade
-    gen_kw_priors = facade.gen_kw_priors()
-    return _dump_priors(groups=gen_kw_priors, rdb_api=rdb_api)
+def _describe_job(ensemble_name, job):
+    """Returns what a job of ExtractionWorker writes, for logging."""
+    extracted = job.keywords.get("extracted")
+    if isinstance(extracted, ExtractedRealization):
+        return "realization {} of '{}'".format(extracted.index, ensemble_name)
+    return "'{}'".format(ensemble_name)
 
 
 def _dump_priors(groups, rdb_api):
@@ -1,4 +1,8 @@
+import functools
+import hashlib
+import io
 import os
+import zlib
 import flask
 import yaml
 import random
@@ -7,6 +11,9 @@ import json
 import sys
 import socket
 import datetime
+import numpy as np
+from ert_shared.storage.array_type import to_list
+from ert_shared.storage.resource_cache import ResourceCache
 from ert_shared.storage.storage_api import StorageApi
 from pathlib import Path
 from flask import Response, request, abort, jsonify
@@ -14,6 +21,25 @@ from gunicorn.app.base import BaseApplication
 from ert_shared.storage import ERT_STORAGE, connection
 from contextlib import contextmanager
 
+# The /data routes send CSV unless the client accepts NumPy's .npy format,
+# which StorageClient reads without any parsing
+NPY_MIMETYPE = "application/x-npy"
+DATA_MIMETYPES = ["text/csv", NPY_MIMETYPE]
+# The batch routes send JSON unless the client accepts a NumPy .npz file of
+# the arrays of the batch, see FlaskWrapper._batch_npz
+NPZ_MIMETYPE = "application/x-npz"
+BATCH_MIMETYPES = ["application/json", NPZ_MIMETYPE]
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024  # bytes
+
+# Responses are compressed with the first of these the client accepts
+ENCODINGS = ["gzip", "deflate"]
+COMPRESSED_MIMETYPES = {"application/json", "text/csv", NPY_MIMETYPE, NPZ_MIMETYPE}
+MIN_COMPRESSED_SIZE = 1024  # bytes
+# The fastest level, as the payloads are large and most of what there is to
+# gain from compressing them is had at the lowest levels
+COMPRESSION_LEVEL = 1
+
 
 def generate_authtoken():
     chars = string.ascii_letters + string.digits
@@ -55,10 +81,113 @@ def resolve_ref_uri(struct, ensemble_id=None):
                 resolve_ref_uri(val, ensemble_id)
 
 
+def parse_realizations():
+    """
+    Returns the realization indices in the comma separated realizations
+    query parameter, as in ?realizations=0,4,5, or None if it is not given.
+    """
+    realizations = request.args.get("realizations")
+    if realizations is None:
+        return None
+    try:
+        indices = [int(index) for index in realizations.split(",") if index]
+    except ValueError:
+        abort(400)
+    # Larger indices do not fit the integer columns of the database
+    if not all(0 <= index < 2 ** 63 for index in indices):
+        abort(400)
+    return indices
+
+
+def parse_index_slice():
+    """
+    Returns the slice given by the start, stop and step query parameters, as
+    in ?start=10&stop=20, which select positions in the index axis the same
+    way as a Python slice, or None if none of them are given.
+    """
+    args = [request.args.get(name) for name in ("start", "stop", "step")]
+    if all(arg is None for arg in args):
+        return None
+    try:
+        index = slice(*[None if arg in (None, "") else int(arg) for arg in args])
+    except ValueError:
+        abort(400)
+    if index.step == 0:
+        abort(400)
+    return index
+
+
+def parse_names():
+    """
+    Returns the names posted to a batch route, which are expected as a JSON
+    object like {"names": ["FOPR", "WOPR:OP1"]}.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400)
+    names = body.get("names")
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        abort(400)
+    return names
+
+
+def compress(response):
+    """
+    Compresses the body of response with the encoding the client prefers of
+    ENCODINGS, if any, as it is sent when the body is streamed.
+    """
+    if (
+        response.status_code != 200
+        or response.mimetype not in COMPRESSED_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+    if response.content_length is not None:
+        if response.content_length < MIN_COMPRESSED_SIZE:
+            return response
+
+    wbits = zlib.MAX_WBITS + 16 if encoding == "gzip" else zlib.MAX_WBITS
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, wbits)
+    if response.is_streamed:
+        chunks = response.iter_encoded()
+
+        def generator():
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+
+        response.response = generator()
+    else:
+        response.set_data(compressor.compress(response.get_data()) + compressor.flush())
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+class JSONEncoder(flask.json.JSONEncoder):
+    """Encodes the NumPy arrays and scalars read from the database."""
+
+    def default(self, o):
+        if isinstance(o, np.ndarray):
+            return to_list(o)
+        if isinstance(o, np.generic):
+            return o.item()
+        return super().default(o)
+
+
 class FlaskWrapper:
-    def __init__(self, secure=True, url=None):
+    def __init__(self, secure=True, url=None, cache_size=DEFAULT_CACHE_SIZE):
         ERT_STORAGE.initialize(url=url)
+        self.cache = ResourceCache(max_bytes=cache_size)
         app = flask.Flask("ert http api")
+        app.json_encoder = JSONEncoder
+        app.after_request(compress)
         self.app = app
 
         if secure:
@@ -73,46 +202,67 @@ class FlaskWrapper:
                 if un != "__token__" or pw != self.authtoken:
                     abort(401)
 
-        self.app.add_url_rule("/ensembles", "ensembles", self.ensembles)
         self.app.add_url_rule(
-            "/ensembles/<ensemble_id>", "ensemble", self.ensemble_by_id
+            "/ensembles", "ensembles", self._conditional(self.ensembles)
+        )
+        self.app.add_url_rule(
+            "/ensembles/<ensemble_id>",
+            "ensemble",
+            self._conditional(self._cached(self.ensemble_by_id)),
+        )
+        self.app.add_url_rule(
+            "/ensembles/<ensemble_id>/keys",
+            "ensemble_keys",
+            self._conditional(self._cached(self.ensemble_keys)),
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/realizations/<realization_idx>",
             "realization",
-            self.realization_by_id,
+            self._conditional(self.realization_by_id),
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/responses/<response_name>",
             "response",
-            self.response_by_name,
+            self._conditional(self._cached(self.response_by_name)),
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/responses/<response_name>/data",
             "response_data",
-            self.response_data_by_name,
+            self._conditional(self.response_data_by_name),
+        )
+        self.app.add_url_rule(
+            "/ensembles/<ensemble_id>/responses:batch",
+            "response_batch",
+            self.response_batch,
+            methods=["POST"],
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/parameters/<parameter_def_id>",
             "parameter",
-            self.parameter_by_id,
+            self._conditional(self._cached(self.parameter_by_id)),
         )
         self.app.add_url_rule(
             "/ensembles/<ensemble_id>/parameters/<parameter_def_id>/data",
             "parameter_data",
-            self.parameter_data_by_id,
+            self._conditional(self.parameter_data_by_id),
+        )
+        self.app.add_url_rule(
+            "/ensembles/<ensemble_id>/parameters:batch",
+            "parameter_batch",
+            self.parameter_batch,
+            methods=["POST"],
         )
 
         self.app.add_url_rule(
             "/observation/<name>",
             "get_observation",
-            self.get_observation,
+            self._conditional(self.get_observation),
             methods=["GET"],
         )
         self.app.add_url_rule(
             "/observation/<name>/attributes",
             "get_observation_attributes",
-            self.get_observation_attributes,
+            self._conditional(self.get_observation_attributes),
             methods=["GET"],
         )
         self.app.add_url_rule(
@@ -122,6 +272,9 @@ class FlaskWrapper:
             methods=["POST"],
         )
         self.app.add_url_rule("/shutdown", "shutdown", self.shutdown, methods=["POST"])
+        self.app.add_url_rule(
+            "/diagnostics/cache", "cache_diagnostics", self.cache_diagnostics
+        )
         self.app.add_url_rule(
             "/schema.json",
             "schema",
@@ -153,6 +306,14 @@ class FlaskWrapper:
             resolve_ref_uri(ensemble, ensemble_id)
             return ensemble
 
+    def ensemble_keys(self, ensemble_id):
+        with self.session() as api:
+            keys = api.get_ensemble_keys(ensemble_id)
+            if keys is None:
+                abort(404)
+            resolve_ref_uri(keys, ensemble_id)
+            return keys
+
     def realization_by_id(self, ensemble_id, realization_idx):
         with self.session() as api:
             realization = api.get_realization(ensemble_id, realization_idx, None)
@@ -172,10 +333,44 @@ class FlaskWrapper:
 
     def response_data_by_name(self, ensemble_id, response_name):
         with self.session() as api:
-            ids = api.get_response_data(ensemble_id, response_name)
-            if ids is None:
+            rows = api.get_response_data(
+                ensemble_id,
+                response_name,
+                realizations=parse_realizations(),
+                index=parse_index_slice(),
+            )
+            if rows is None:
                 abort(404)
-            return self._datas(ids)
+            return self._datas(rows)
+
+    def response_batch(self, ensemble_id):
+        """Return the axis and data of each of the posted responses.
+
+        The posted JSON will be expected to be
+        {
+            "names": ["FOPR", "WOPR:OP1"]
+        }
+        """
+        names = parse_names()
+        with self.session() as api:
+            batch = api.get_response_batch(
+                ensemble_id,
+                names,
+                realizations=parse_realizations(),
+                index=parse_index_slice(),
+            )
+            return self._batch(
+                batch,
+                [
+                    (
+                        resp["name"],
+                        resp["axis"]["data"],
+                        resp["realizations"],
+                        resp["data"],
+                    )
+                    for resp in batch["responses"]
+                ],
+            )
 
     def parameter_by_id(self, ensemble_id, parameter_def_id):
         with self.session() as api:
@@ -188,19 +383,114 @@ class FlaskWrapper:
 
     def parameter_data_by_id(self, ensemble_id, parameter_def_id):
         with self.session() as api:
-            ids = api.get_parameter_data(ensemble_id, parameter_def_id)
-            if ids is None:
+            rows = api.get_parameter_data(
+                ensemble_id, parameter_def_id, realizations=parse_realizations()
+            )
+            if rows is None:
                 abort(404)
-            return self._datas(ids)
+            return self._datas(rows)
+
+    def parameter_batch(self, ensemble_id):
+        """Return the data of each of the posted parameters.
+
+        The posted JSON will be expected to be
+        {
+            "names": ["GROUP:KEY1", "GROUP:KEY2"]
+        }
+        """
+        names = parse_names()
+        with self.session() as api:
+            parameters = api.get_parameter_batch(
+                ensemble_id, names, realizations=parse_realizations()
+            )
+            resolve_ref_uri(parameters, ensemble_id)
+            return self._batch(
+                parameters,
+                [
+                    (
+                        "{}:{}".format(param["group"], param["key"]),
+                        None,
+                        param["realizations"],
+                        param["data"],
+                    )
+                    for param in parameters["parameters"]
+                ],
+            )
+
+    def _batch(self, batch, entries):
+        """
+        Returns batch as JSON, or entries, the name, axis, realizations and
+        data of each item of batch, as an .npz file if the client accepts it.
+        """
+        response = None
+        if request.accept_mimetypes.best_match(BATCH_MIMETYPES) == NPZ_MIMETYPE:
+            response = self._batch_npz(entries)
+        if response is None:
+            response = jsonify(batch)
+        response.vary.add("Accept")
+        return response
+
+    def _batch_npz(self, entries):
+        """
+        Returns the entries as an .npz file with the array names, of the name
+        of each entry, and realizations_<i>, data_<i>, a matrix with one row
+        per realization, and axis_<i>, unless it is None, of the i-th entry.
+        Returns None if the data of an entry do not make up a numeric matrix,
+        or its axis is neither numbers, dates nor strings, in which case the
+        batch is sent as JSON.
+        """
+        arrays = {"names": np.array([name for name, _, _, _ in entries], dtype=str)}
+        for position, (_, axis, realizations, data) in enumerate(entries):
+            try:
+                matrix = np.array(data)
+            except ValueError:
+                return None
+            if matrix.dtype.kind not in "biufM":
+                return None
+            arrays["realizations_{}".format(position)] = np.array(
+                realizations, dtype=np.int64
+            )
+            arrays["data_{}".format(position)] = matrix
+            if axis is not None:
+                axis = np.asarray(axis)
+                # Strings are read as objects, which .npy only pickles
+                if axis.dtype.kind == "O" and all(
+                    isinstance(item, str) for item in axis.flat
+                ):
+                    axis = axis.astype(str)
+                if axis.dtype.kind not in "biufMU":
+                    return None
+                arrays["axis_{}".format(position)] = axis
+
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        response = Response(buffer.getvalue(), mimetype=NPZ_MIMETYPE)
+        response.headers["Content-Disposition"] = "attachment; filename=batch.npz"
+        return response
+
+    def _datas(self, rows):
+        response = None
+        if request.accept_mimetypes.best_match(DATA_MIMETYPES) == NPY_MIMETYPE:
+            response = self._datas_npy(rows)
+        if response is None:
+            response = self._datas_csv(rows)
+        response.vary.add("Accept")
+        # The realization of each line, as they need not be all of them
+        response.headers["X-Realizations"] = ",".join(
+            str(realization) for realization, _ in rows
+        )
+        return response
 
-    def _datas(self, datas):
+    def _datas_csv(self, rows):
         def generator():
             first = True
-            for data in datas:
+            for _, data in rows:
                 if first:
                     first = False
                 else:
                     yield "\n"
+                if isinstance(data, np.ndarray):
+                    data = to_list(data)
                 if isinstance(data, list):
                     yield ",".join([str(x) for x in data])
                 else:
@@ -210,6 +500,27 @@ class FlaskWrapper:
         response.headers["Content-Disposition"] = "attachment; filename=data.csv"
         return response
 
+    def _datas_npy(self, rows):
+        """
+        Returns the data as a .npy file of a matrix with one row per
+        realization, or None if the data of the realizations do not make up a
+        numeric matrix, in which case it is sent as CSV.
+        """
+        try:
+            matrix = np.array([data for _, data in rows])
+        except ValueError:
+            return None
+        if matrix.dtype.kind not in "biufM":
+            return None
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(-1, 1)
+
+        buffer = io.BytesIO()
+        np.lib.format.write_array(buffer, matrix, allow_pickle=False)
+        response = Response(buffer.getvalue(), mimetype=NPY_MIMETYPE)
+        response.headers["Content-Disposition"] = "attachment; filename=data.npy"
+        return response
+
     def get_observation(self, name):
         """Return an observation."""
         with self.session() as api:
@@ -253,16 +564,92 @@ class FlaskWrapper:
                     abort(404)
             return api.get_observation(name), 201
 
+    def cache_diagnostics(self):
+        """Return the counters and size of the resource cache.
+
+        {
+            "hits": 10,
+            "misses": 2,
+            "evictions": 0,
+            "invalidations": 1,
+            "entries": 2,
+            "size_bytes": 4096,
+            "max_bytes": 268435456
+        }
+        """
+        return self.cache.stats()
+
     def shutdown(self):
         request.environ.get("werkzeug.server.shutdown")()
         return "Server shutting down."
 
+    def _conditional(self, view):
+        """
+        Wraps view so that its responses get a strong ETag, and requests with
+        the ETag in If-None-Match get 304 Not Modified without calling view.
+        The ETag is a hash of the URL, the negotiated representation and the
+        revision of the storage, which changes with anything a response is
+        built from. As the ETag depends on the Accept and Accept-Encoding
+        headers, both the 200 and the 304 responses vary on them, so that
+        shared caches keep the representations apart.
+        """
+
+        @functools.wraps(view)
+        def conditional_view(**kwargs):
+            variant = (
+                request.url,
+                request.accept_mimetypes.best_match(DATA_MIMETYPES),
+                request.accept_encodings.best_match(ENCODINGS),
+                self._revision(),
+            )
+            etag = hashlib.sha1(repr(variant).encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = flask.make_response(view(**kwargs))
+            response.set_etag(etag)
+            response.vary.add("Accept")
+            response.vary.add("Accept-Encoding")
+            return response
+
+        return conditional_view
+
+    def _cached(self, view):
+        """
+        Wraps view, which returns JSON, so that its responses are kept in the
+        resource cache, by route, host and view arguments such as the
+        ensemble id and name, until the storage is changed.
+        """
+
+        @functools.wraps(view)
+        def cached_view(**kwargs):
+            key = (request.endpoint, request.host_url) + tuple(sorted(kwargs.items()))
+            revision = self._revision()
+            body = self.cache.get(key, revision)
+            if body is not None:
+                return Response(body, mimetype="application/json")
+
+            response = flask.make_response(view(**kwargs))
+            if response.status_code == 200:
+                self.cache.put(key, revision, response.get_data())
+            return response
+
+        return cached_view
+
+    def _revision(self):
+        """Return the revision of the storage, read once per request."""
+        if "ert.storage_revision" not in request.environ:
+            with self.session() as api:
+                request.environ["ert.storage_revision"] = api.get_revision()
+        return request.environ["ert.storage_revision"]
+
     @contextmanager
     def session(self):
         """Provide a transactional scope around a series of operations."""
         session = ERT_STORAGE.Session()
         try:
-            yield StorageApi(session)
+            yield StorageApi(session, cache=self.cache)
             session.commit()
         except:
             session.rollback()
@@ -272,14 +659,22 @@ class FlaskWrapper:
 
 
 class Application(BaseApplication):
-    def __init__(self, wrapper, lockfile):
+    def __init__(self, wrapper, lockfile, workers=1, threads=1, worker_class="sync"):
         self.wrapper = wrapper
         self.lockfile = lockfile
+        self.workers = workers
+        self.threads = threads
+        self.worker_class = worker_class
         super().__init__()
 
     def load_config(self):
         self.cfg.set("bind", ["0.0.0.0:0"])
+        self.cfg.set("workers", self.workers)
+        self.cfg.set("threads", self.threads)
+        self.cfg.set("worker_class", self.worker_class)
         self.cfg.set("when_ready", self.when_ready)
+        self.cfg.set("pre_fork", self.pre_fork)
+        self.cfg.set("post_fork", self.post_fork)
         self.cfg.set("on_exit", self.on_exit)
 
     def load(self):
@@ -320,6 +715,14 @@ class Application(BaseApplication):
             with os.fdopen(int(fd), "w") as fo:
                 fo.write(connection_info)
 
+    def pre_fork(self, server, worker):
+        # The database was opened by the master, when it was migrated, and
+        # its connections must not be inherited by the workers
+        ERT_STORAGE.dispose()
+
+    def post_fork(self, server, worker):
+        ERT_STORAGE.connect()
+
     def on_exit(self, server):
         if self.lockfile:
             self.lockfile.unlink()
@@ -365,7 +768,7 @@ def run_server(args=None):
     if args is None:
         args = parse_args()
 
-    wrapper = FlaskWrapper(url=args.rdb_url)
+    wrapper = FlaskWrapper(url=args.rdb_url, cache_size=args.cache_size * 1024 ** 2)
 
     runpath = Path(args.runpath)
     assert runpath.is_dir()
@@ -377,7 +780,13 @@ def run_server(args=None):
             raise RuntimeError("storage_server.json already exists")
 
     terminate_on_parent_death()
-    Application(wrapper, lock).run()
+    Application(
+        wrapper,
+        lock,
+        workers=args.workers,
+        threads=args.threads,
+        worker_class=args.worker_class,
+    ).run()
 
 
 if __name__ == "__main__":
@@ -11,8 +11,9 @@ from ert_shared.storage.models import Entity
 config = context.config
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-fileConfig(config.config_file_name)
+# This line sets up loggers basically. The migrations run in the processes
+# of ERT, whose loggers must be left enabled.
+fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
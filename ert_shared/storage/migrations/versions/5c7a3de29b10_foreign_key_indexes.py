@@ -0,0 +1,60 @@
+"""Foreign key indexes
+
+Revision ID: 5c7a3de29b10
+Revises: 69727b07f264
+Create Date: 2026-10-18 14:03:52.118406
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "5c7a3de29b10"
+down_revision = "69727b07f264"
+branch_labels = None
+depends_on = None
+
+
+# Foreign keys that are not already the leading column of a unique
+# constraint, and so had no index. The lookups by ensemble, and the joins
+# from definitions to their responses and parameters, scanned the whole
+# table without them.
+INDEXES = {
+    "ix_realization_ensemble_id_index": ("realization", ["ensemble_id", "index"]),
+    "ix_response_definition_ensemble_id_name": (
+        "response_definition",
+        ["ensemble_id", "name"],
+    ),
+    "ix_response_response_definition_id_realization_id": (
+        "response",
+        ["response_definition_id", "realization_id"],
+    ),
+    "ix_parameter_definition_ensemble_id": ("parameter_definition", ["ensemble_id"]),
+    "ix_parameter_parameter_definition_id_realization_id": (
+        "parameter",
+        ["parameter_definition_id", "realization_id"],
+    ),
+    "ix_update_ensemble_reference_id": ("update", ["ensemble_reference_id"]),
+    "ix_prior_ensemble_association_table_ensemble_id": (
+        "prior_ensemble_association_table",
+        ["ensemble_id"],
+    ),
+    "ix_observation_response_definition_link_observation_id": (
+        "observation_response_definition_link",
+        ["observation_id"],
+    ),
+    "ix_misfit_observation_response_definition_link_id": (
+        "misfit",
+        ["observation_response_definition_link_id"],
+    ),
+}
+
+
+def upgrade():
+    for name, (table_name, columns) in INDEXES.items():
+        op.create_index(name, table_name, columns)
+
+
+def downgrade():
+    for name, (table_name, _) in INDEXES.items():
+        op.drop_index(name, table_name=table_name)
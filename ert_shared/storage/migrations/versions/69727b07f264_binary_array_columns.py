@@ -0,0 +1,84 @@
+"""Binary array columns
+
+Revision ID: 69727b07f264
+Revises: 22d6bbf0a926
+Create Date: 2026-10-18 09:12:41.503218
+
+"""
+import pickle
+
+from alembic import op
+import sqlalchemy as sa
+
+from ert_shared.storage.array_type import decode_array, encode_array, to_list
+
+
+# revision identifiers, used by Alembic.
+revision = "69727b07f264"
+down_revision = "22d6bbf0a926"
+branch_labels = None
+depends_on = None
+
+
+# The columns are BLOBs both before and after this revision, only the
+# encoding of the values changes from pickle to encode_array.
+ARRAY_COLUMNS = {
+    "response_definition": ["indices"],
+    "response": ["values"],
+    "parameter_prior": ["parameter_values"],
+    "observation": ["key_indices", "data_indices", "values", "errors"],
+    "observation_response_definition_link": ["active"],
+}
+
+
+# The rows of a table are converted this many at a time, so that tables
+# larger than memory can be converted
+BATCH_SIZE = 1000
+
+
+def _convert(convert_value):
+    connection = op.get_bind()
+    for table_name, column_names in ARRAY_COLUMNS.items():
+        table = sa.table(
+            table_name,
+            sa.column("id", sa.Integer),
+            *[sa.column(name, sa.LargeBinary) for name in column_names]
+        )
+        update = (
+            table.update()
+            .where(table.c.id == sa.bindparam("row_id"))
+            .values({name: sa.bindparam("new_" + name) for name in column_names})
+        )
+        last_id = None
+        while True:
+            query = sa.select([table]).order_by(table.c.id).limit(BATCH_SIZE)
+            if last_id is not None:
+                query = query.where(table.c.id > last_id)
+            rows = connection.execute(query).fetchall()
+            if not rows:
+                break
+            connection.execute(
+                update,
+                [
+                    dict(
+                        row_id=row["id"],
+                        **{
+                            "new_" + name: None
+                            if row[name] is None
+                            else convert_value(row[name])
+                            for name in column_names
+                        }
+                    )
+                    for row in rows
+                ],
+            )
+            last_id = rows[-1]["id"]
+
+
+def upgrade():
+    # decode_array reads both pickled and already converted values
+    _convert(lambda value: encode_array(decode_array(value)))
+
+
+def downgrade():
+    _convert(lambda value: pickle.dumps(to_list(decode_array(value))))
@@ -1,11 +1,13 @@
 import sqlalchemy as sa
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import backref, relationship
+from sqlalchemy.orm import backref, configure_mappers, relationship
 from sqlalchemy.orm.collections import attribute_mapped_collection
 from sqlalchemy.schema import UniqueConstraint, MetaData
 from sqlalchemy.sql import func
 
+from ert_shared.storage.array_type import NumpyArray
+
 
 Entity = declarative_base(name="Entity")
 
@@ -55,6 +57,7 @@ class Update(Entity):
     __tablename__ = "update"
     __table_args__ = (
         UniqueConstraint("ensemble_result_id", name="uq_update_result_id"),
+        sa.Index("ix_update_ensemble_reference_id", "ensemble_reference_id"),
     )
 
     id = sa.Column(sa.Integer, primary_key=True)
@@ -85,6 +88,7 @@ class Realization(Entity):
         UniqueConstraint(
             "index", "ensemble_id", name="uq_realization_index_ensemble_id"
         ),
+        sa.Index("ix_realization_ensemble_id_index", "ensemble_id", "index"),
     )
 
     id = sa.Column(sa.Integer, primary_key=True)
@@ -102,11 +106,12 @@ class ResponseDefinition(Entity):
         UniqueConstraint(
             "name", "ensemble_id", name="uq_response_definiton_name_ensemble_id"
         ),
+        sa.Index("ix_response_definition_ensemble_id_name", "ensemble_id", "name"),
     )
 
     id = sa.Column(sa.Integer, primary_key=True)
     name = sa.Column(sa.String, nullable=False)
-    indices = sa.Column(sa.PickleType)
+    indices = sa.Column(NumpyArray)
     ensemble_id = sa.Column(sa.Integer, sa.ForeignKey("ensemble.id"), nullable=False)
 
     ensemble = relationship("Ensemble", back_populates="response_definitions")
@@ -125,10 +130,15 @@ class Response(Entity):
             "response_definition_id",
             name="uq_response_realization_id_reponse_defition_id",
         ),
+        sa.Index(
+            "ix_response_response_definition_id_realization_id",
+            "response_definition_id",
+            "realization_id",
+        ),
     )
 
     id = sa.Column(sa.Integer, primary_key=True)
-    values = sa.Column(sa.PickleType)
+    values = sa.Column(NumpyArray)
     realization_id = sa.Column(
         sa.Integer, sa.ForeignKey("realization.id"), nullable=False
     )
@@ -146,6 +156,7 @@ prior_ensemble_association_table = sa.Table(
     Entity.metadata,
     sa.Column("prior_id", sa.String, sa.ForeignKey("parameter_prior.id")),
     sa.Column("ensemble_id", sa.Integer, sa.ForeignKey("ensemble.id")),
+    sa.Index("ix_prior_ensemble_association_table_ensemble_id", "ensemble_id"),
 )
 
 
@@ -157,7 +168,7 @@ class ParameterPrior(Entity):
     key = sa.Column("key", sa.String, nullable=False)
     function = sa.Column("function", sa.String)
     parameter_names = sa.Column("parameter_names", sa.PickleType)
-    parameter_values = sa.Column("parameter_values", sa.PickleType)
+    parameter_values = sa.Column("parameter_values", NumpyArray)
 
     ensemble = relationship(
         "Ensemble", secondary=lambda: prior_ensemble_association_table, backref="priors"
@@ -173,6 +184,7 @@ class ParameterDefinition(Entity):
             "ensemble_id",
             name="uq_parameter_definition_name_group_ensemble_id",
         ),
+        sa.Index("ix_parameter_definition_ensemble_id", "ensemble_id"),
     )
 
     id = sa.Column(sa.Integer, primary_key=True)
@@ -194,6 +206,11 @@ class Parameter(Entity):
             "parameter_definition_id",
             name="uq_parameter_realization_id_parameter_definition_id",
         ),
+        sa.Index(
+            "ix_parameter_parameter_definition_id_realization_id",
+            "parameter_definition_id",
+            "realization_id",
+        ),
     )
 
     id = sa.Column(sa.Integer, primary_key=True)
@@ -227,10 +244,10 @@ class Observation(Entity):
 
     id = sa.Column(sa.Integer, primary_key=True)
     name = sa.Column(sa.String, nullable=False)
-    key_indices = sa.Column(sa.PickleType)
-    data_indices = sa.Column(sa.PickleType)
-    values = sa.Column(sa.PickleType)
-    errors = sa.Column(sa.PickleType)
+    key_indices = sa.Column(NumpyArray)
+    data_indices = sa.Column(NumpyArray)
+    values = sa.Column(NumpyArray)
+    errors = sa.Column(NumpyArray)
 
     attributes = association_proxy(
         "observation_attributes",
@@ -284,13 +301,16 @@ class ObservationResponseDefinitionLink(Entity):
             "update_id",
             name="uq_observation_response_definition_link_response_definition_id_observation_id_update_id",
         ),
+        sa.Index(
+            "ix_observation_response_definition_link_observation_id", "observation_id"
+        ),
     )
 
     id = sa.Column(sa.Integer, primary_key=True)
     response_definition_id = sa.Column(
         sa.Integer, sa.ForeignKey("response_definition.id"), nullable=False
     )
-    active = sa.Column(sa.PickleType)
+    active = sa.Column(NumpyArray)
     observation_id = sa.Column(sa.Integer, sa.ForeignKey("observation.id"))
     update_id = sa.Column(sa.Integer, sa.ForeignKey("update.id"))
 
@@ -313,6 +333,10 @@ class Misfit(Entity):
             "observation_response_definition_link_id",
             name="uq_misfit_response_id_observation_response_definition_link_id",
         ),
+        sa.Index(
+            "ix_misfit_observation_response_definition_link_id",
+            "observation_response_definition_link_id",
+        ),
     )
 
     id = sa.Column(sa.Integer, primary_key=True)
@@ -326,3 +350,9 @@ class Misfit(Entity):
     observation_response_definition_link = relationship(
         "ObservationResponseDefinitionLink", back_populates="misfits"
     )
+
+
+# Creates the backrefs, such as Observation.observation_attributes, which
+# otherwise only exist once something has been queried, so that they can be
+# used in the loader options of the first query
+configure_mappers()
@@ -1,7 +1,12 @@
 import logging
+from collections import defaultdict
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
+from ert_shared.storage.array_type import HEADER_PREFIX_SIZE, decode_header
 from ert_shared.storage.models import (
+    AttributeValue,
     Ensemble,
     Observation,
     Parameter,
@@ -11,18 +16,78 @@ from ert_shared.storage.models import (
     ResponseDefinition,
     Update,
     ObservationResponseDefinitionLink,
+    ObservationAttribute,
     Misfit,
     ParameterPrior,
+    prior_ensemble_association_table,
 )
-from sqlalchemy import desc
-from sqlalchemy.orm import Bundle
+from sqlalchemy import LargeBinary, desc, func
+from sqlalchemy.orm import Bundle, defer, joinedload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 
 
+# The tables that are only ever added to. Between them they get a new row
+# for every change to the storage, as even setting an observation attribute
+# adds an AttributeValue.
+_REVISION_MODELS = (
+    Ensemble,
+    Update,
+    Realization,
+    ResponseDefinition,
+    Response,
+    ParameterPrior,
+    ParameterDefinition,
+    Parameter,
+    Observation,
+    AttributeValue,
+    ObservationResponseDefinitionLink,
+    Misfit,
+)
+
+# The most values given in one IN clause. SQLite before 3.32 allows no more
+# than 999 variables in a statement.
+_MAX_IN_VALUES = 500
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), _MAX_IN_VALUES):
+        yield values[start : start + _MAX_IN_VALUES]
+
+
+def _realization_chunks(realizations):
+    """
+    Yields the given realization indices, sorted, in chunks for IN clauses,
+    or None once if realizations is None, for all realizations.
+    """
+    if realizations is None:
+        yield None
+    else:
+        yield from _chunks(sorted(set(realizations)))
+
+
 class RdbApi:
     def __init__(self, session):
         self._session = session
 
+    def get_revision(self):
+        """
+        Returns a tuple that changes whenever anything is committed to the
+        storage: the largest id of each table that is only added to, which
+        SQLite looks up without a scan, and the number of priors of
+        ensembles, which have no id.
+        """
+        columns = [
+            self._session.query(func.max(model.id)).as_scalar()
+            for model in _REVISION_MODELS
+        ]
+        columns.append(
+            self._session.query(func.count())
+            .select_from(prior_ensemble_association_table)
+            .as_scalar()
+        )
+        return tuple(self._session.query(*columns).one())
+
     def get_ensemble(self, name):
         return (
             self._session.query(Ensemble)
@@ -46,6 +111,19 @@ class RdbApi:
             .one()
         )
 
+    def _get_response_ids(self, ensemble_id):
+        """
+        Returns a mapping from (response name, realization index) to response
+        id for all responses of an ensemble.
+        """
+        query = (
+            self._session.query(ResponseDefinition.name, Realization.index, Response.id)
+            .join(Response, Response.response_definition_id == ResponseDefinition.id)
+            .join(Realization, Response.realization_id == Realization.id)
+            .filter(ResponseDefinition.ensemble_id == ensemble_id)
+        )
+        return {(name, index): response_id for name, index, response_id in query}
+
     def _get_parameter_definition(self, name, group, ensemble_id):
         return (
             self._session.query(ParameterDefinition)
@@ -120,17 +198,48 @@ class RdbApi:
         ensemble = Ensemble(name=name, priors=priors)
         self._session.add(ensemble)
         if reference is not None:
-            msg = "Adding ensemble '{}' as reference. '{}' is used on this update step."
-            logger.info(msg.format(reference[0], reference[1]))
-
-            reference_ensemble = self.get_ensemble(reference[0])
-            update = Update(algorithm=reference[1])
-            update.ensemble_reference = reference_ensemble
-            update.ensemble_result = ensemble
-            self._session.add(update)
+            self._add_update(ensemble, reference)
         self._session.flush()
         return ensemble
 
+    def add_update(self, ensemble_name, reference):
+        """
+        Links an existing ensemble to the ensemble it was updated from, given
+        as reference, a tuple of the name of that ensemble and the algorithm
+        used in the update.
+        """
+        update = self._add_update(self.get_ensemble(name=ensemble_name), reference)
+        self._session.flush()
+        return update
+
+    def _add_update(self, ensemble, reference):
+        msg = "Adding ensemble '{}' as reference. '{}' is used on this update step."
+        logger.info(msg.format(reference[0], reference[1]))
+
+        reference_ensemble = self.get_ensemble(reference[0])
+        update = Update(algorithm=reference[1])
+        update.ensemble_reference = reference_ensemble
+        update.ensemble_result = ensemble
+        self._session.add(update)
+        return update
+
+    def set_priors(self, ensemble_name, priors):
+        """
+        Sets the priors of an existing ensemble, and of its parameter
+        definitions with the same group and key as one of the priors.
+        """
+        msg = "Adding {} priors on ensemble '{}'"
+        logger.info(msg.format(len(priors), ensemble_name))
+
+        ensemble = self.get_ensemble(name=ensemble_name)
+        ensemble.priors = priors
+        priors_by_key = {(prior.group, prior.key): prior for prior in priors}
+        for parameter_definition in ensemble.parameter_definitions:
+            parameter_definition.prior = priors_by_key.get(
+                (parameter_definition.group, parameter_definition.name)
+            )
+        self._session.flush()
+
     def add_realization(self, index, ensemble_name):
         msg = "Adding realization with index '{}' on ensemble '{}'"
         logger.info(msg.format(index, ensemble_name))
@@ -144,6 +253,25 @@ class RdbApi:
         self._session.flush()
         return realization
 
+    def add_realizations(self, indices, ensemble_name):
+        """Adds realizations with the given indices with a single insert."""
+        msg = "Adding {} realizations on ensemble '{}'"
+        logger.info(msg.format(len(indices), ensemble_name))
+
+        ensemble = self.get_ensemble(name=ensemble_name)
+        self._session.bulk_insert_mappings(
+            Realization,
+            [{"index": index, "ensemble_id": ensemble.id} for index in indices],
+        )
+
+    def _get_realization_ids(self, ensemble_id):
+        """Returns a mapping from realization index to realization id."""
+        return dict(
+            self._session.query(Realization.index, Realization.id).filter_by(
+                ensemble_id=ensemble_id
+            )
+        )
+
     def add_response_definition(
         self,
         name,
@@ -189,6 +317,31 @@ class RdbApi:
         self._session.flush()
         return response
 
+    def add_responses(self, name, values, ensemble_name):
+        """
+        Adds the responses of many realizations, given as a mapping from
+        realization index to response values, with a single insert.
+        """
+        msg = "Adding {} responses with name '{}' on ensemble '{}'"
+        logger.info(msg.format(len(values), name, ensemble_name))
+
+        ensemble = self.get_ensemble(name=ensemble_name)
+        realization_ids = self._get_realization_ids(ensemble_id=ensemble.id)
+        response_definition = self._get_response_definition(
+            name=name, ensemble_id=ensemble.id
+        )
+        self._session.bulk_insert_mappings(
+            Response,
+            [
+                {
+                    "values": realization_values,
+                    "realization_id": realization_ids[realization_index],
+                    "response_definition_id": response_definition.id,
+                }
+                for realization_index, realization_values in values.items()
+            ],
+        )
+
     def add_parameter_definition(self, name, group, ensemble_name, prior=None):
         msg = (
             "Adding parameter definition with name '{}' in group '{}' on ensemble '{}'"
@@ -236,6 +389,31 @@ class RdbApi:
         self._session.flush()
         return parameter
 
+    def add_parameters(self, name, group, values, ensemble_name):
+        """
+        Adds the parameter values of many realizations, given as a mapping
+        from realization index to value, with a single insert.
+        """
+        msg = "Adding {} parameters with name '{}', group '{}', ensemble '{}'"
+        logger.info(msg.format(len(values), name, group, ensemble_name))
+
+        ensemble = self.get_ensemble(name=ensemble_name)
+        realization_ids = self._get_realization_ids(ensemble_id=ensemble.id)
+        parameter_definition = self._get_parameter_definition(
+            name=name, group=group, ensemble_id=ensemble.id
+        )
+        self._session.bulk_insert_mappings(
+            Parameter,
+            [
+                {
+                    "value": value,
+                    "realization_id": realization_ids[realization_index],
+                    "parameter_definition_id": parameter_definition.id,
+                }
+                for realization_index, value in values.items()
+            ],
+        )
+
     def add_observation(self, name, key_indices, data_indices, values, errors):
         msg = "Adding observation with name '{}', key_indices '{}', data_indices '{}', values '{}', stds '{}'"
         logger.info(msg.format(name, key_indices, data_indices, values, errors))
@@ -280,6 +458,26 @@ class RdbApi:
         self._session.flush()
         return misfit
 
+    def _add_misfits(self, misfits):
+        """
+        Adds misfits, given as (value, link_id, response_id) tuples, with a
+        single insert.
+        """
+        msg = "Adding {} misfits"
+        logger.info(msg.format(len(misfits)))
+
+        self._session.bulk_insert_mappings(
+            Misfit,
+            [
+                {
+                    "value": value,
+                    "observation_response_definition_link_id": link_id,
+                    "response_id": response_id,
+                }
+                for value, link_id, response_id in misfits
+            ],
+        )
+
     def add_observation_attribute(self, name, attribute, value):
         """Add an attribute-value pair to an observation.
 
@@ -318,8 +516,15 @@ class RdbApi:
     def get_all_observation_keys(self):
         return [obs.name for obs in self._session.query(Observation.name).all()]
 
+    def _query_ensembles(self):
+        """Queries ensembles, loading their parents and children up front."""
+        return self._session.query(Ensemble).options(
+            selectinload(Ensemble.parent).joinedload(Update.ensemble_reference),
+            selectinload(Ensemble.children).joinedload(Update.ensemble_result),
+        )
+
     def get_all_ensembles(self):
-        return [ensemble for ensemble in self._session.query(Ensemble).all()]
+        return [ensemble for ensemble in self._query_ensembles().all()]
 
     def get_realizations_by_ensemble_id(self, ensemble_id):
         return self._session.query(Realization).filter_by(ensemble_id=ensemble_id)
@@ -336,7 +541,7 @@ class RdbApi:
 
     def get_ensemble_by_id(self, ensemble_id):
         try:
-            return self._session.query(Ensemble).filter_by(id=ensemble_id).one()
+            return self._query_ensembles().filter_by(id=ensemble_id).one()
         except NoResultFound:
             return None
 
@@ -355,11 +560,71 @@ class RdbApi:
             .one()
         )
 
+    def get_responses_by_realization_id(self, realization_id):
+        """
+        Returns the name and values of each response of a realization, in the
+        order of their response definitions.
+        """
+        return (
+            self._session.query(ResponseDefinition.name, Response.values)
+            .join(Response, Response.response_definition_id == ResponseDefinition.id)
+            .filter(Response.realization_id == realization_id)
+            .order_by(ResponseDefinition.id)
+            .all()
+        )
+
     def get_parameter_definitions_by_ensemble_id(self, ensemble_id):
-        return self._session.query(ParameterDefinition).filter_by(
-            ensemble_id=ensemble_id
+        return (
+            self._session.query(ParameterDefinition)
+            .options(joinedload(ParameterDefinition.prior))
+            .filter_by(ensemble_id=ensemble_id)
+        )
+
+    def get_parameters_by_realization_id(self, realization_id):
+        """
+        Returns the name and value of each parameter of a realization, in the
+        order of their parameter definitions.
+        """
+        return (
+            self._session.query(ParameterDefinition.name, Parameter.value)
+            .join(
+                Parameter, Parameter.parameter_definition_id == ParameterDefinition.id
+            )
+            .filter(Parameter.realization_id == realization_id)
+            .order_by(ParameterDefinition.id)
+            .all()
         )
 
+    def get_parameter_definition_id(self, parameter_def_id, ensemble_id):
+        """
+        Returns parameter_def_id if it is the id of a parameter definition in
+        the ensemble, otherwise None.
+        """
+        return (
+            self._session.query(ParameterDefinition.id)
+            .filter(ParameterDefinition.id == parameter_def_id)
+            .filter(ParameterDefinition.ensemble_id == ensemble_id)
+            .scalar()
+        )
+
+    def get_parameter_values(self, parameter_definition_id, realizations=None):
+        """
+        Returns the realization index and value of each parameter of a
+        parameter definition, ordered by realization index. Only the given
+        realization indices are read if realizations is not None.
+        """
+        rows = []
+        for indices in _realization_chunks(realizations):
+            query = (
+                self._session.query(Realization.index, Parameter.value)
+                .join(Parameter, Parameter.realization_id == Realization.id)
+                .filter(Parameter.parameter_definition_id == parameter_definition_id)
+            )
+            if indices is not None:
+                query = query.filter(Realization.index.in_(indices))
+            rows.extend(query.order_by(Realization.index))
+        return rows
+
     def get_parameter_by_realization_id(self, parameter_definition_id, realization_id):
         return (
             self._session.query(Parameter)
@@ -370,16 +635,228 @@ class RdbApi:
             .one()
         )
 
-    def get_response_bundle(self, response_name, ensemble_id):
+    def get_response_definition_id(self, response_name, ensemble_id):
+        """
+        Returns the id of the response definition with the given name in an
+        ensemble, or None if there is none or it has no responses.
+        """
+        return (
+            self._session.query(ResponseDefinition.id)
+            .filter(ResponseDefinition.responses.any())
+            .filter(ResponseDefinition.name == response_name)
+            .filter(ResponseDefinition.ensemble_id == ensemble_id)
+            .scalar()
+        )
+
+    def get_response_values(
+        self, response_definition_id, realizations=None, index=None
+    ):
+        """
+        Returns the realization index and values of each response of a
+        response definition, ordered by realization index. Only the given
+        realization indices are read if realizations is not None, and index,
+        a slice, selects the values of each response.
+        """
+        return self._get_response_values(
+            [Realization.index],
+            Response.response_definition_id == response_definition_id,
+            realizations,
+            index,
+        )
+
+    def _get_response_values(self, columns, criterion, realizations, index):
+        """
+        Returns the given columns and the values of each response matching
+        criterion, ordered by the columns, as get_response_values does. With
+        index, only the start of each value is read here, and the selected
+        values are read by _get_value_slices.
+        """
+        values = Response.values
+        if index is not None:
+            values = func.substr(
+                Response.values, 1, HEADER_PREFIX_SIZE, type_=LargeBinary
+            )
+        rows = []
+        for indices in _realization_chunks(realizations):
+            query = (
+                self._session.query(*columns, Response.id, values)
+                .select_from(Realization)
+                .join(Response, Response.realization_id == Realization.id)
+                .filter(criterion)
+            )
+            if indices is not None:
+                query = query.filter(Realization.index.in_(indices))
+            rows.extend(query)
+        rows.sort(key=lambda row: tuple(row[: len(columns)]))
+
+        if index is None:
+            return [tuple(row[:-2]) + (row[-1],) for row in rows]
+        slices = self._get_value_slices([row[-2:] for row in rows], index)
+        return [tuple(row[:-2]) + (slices[row[-2]],) for row in rows]
+
+    def _get_value_slices(self, headers, index):
+        """
+        Returns values[index] of each response by id, given the id and the
+        start of the values of each. Of the values stored as one dimensional
+        arrays of numbers, only the bytes from the first to the last selected
+        value are read, in one query for each such range. Other values are
+        read in full.
+        """
+        slices = {}
+        ranges = defaultdict(list)
+        full = []
+        for response_id, prefix in headers:
+            header = decode_header(prefix)
+            if header is None or len(header[1]) != 1 or header[0].hasobject:
+                full.append(response_id)
+                continue
+            dtype, (length,), offset = header
+            positions = range(*index.indices(length))
+            if len(positions) == 0:
+                slices[response_id] = np.empty(0, dtype=dtype)
+                continue
+            first = min(positions[0], positions[-1])
+            last = max(positions[0], positions[-1])
+            # substr counts from 1
+            start = offset + first * dtype.itemsize + 1
+            size = (last - first + 1) * dtype.itemsize
+            ranges[(dtype, start, size, positions.step)].append(response_id)
+
+        for (dtype, start, size, step), ids in ranges.items():
+            values = func.substr(Response.values, start, size, type_=LargeBinary)
+            for chunk in _chunks(ids):
+                query = self._session.query(Response.id, values).filter(
+                    Response.id.in_(chunk)
+                )
+                for response_id, data in query:
+                    # The first and last values read are both selected, so
+                    # a negative step starts at the last
+                    slices[response_id] = np.frombuffer(data, dtype=dtype)[::step]
+        for chunk in _chunks(full):
+            query = self._session.query(Response.id, Response.values).filter(
+                Response.id.in_(chunk)
+            )
+            for response_id, values in query:
+                slices[response_id] = values[index]
+        return slices
+
+    def get_response_definitions_with_observations(self, ensemble_id):
+        """
+        Returns the response definitions of an ensemble, without their
+        indices, with their observation links and observations loaded up
+        front, in the order of their ids.
+        """
+        return (
+            self._session.query(ResponseDefinition)
+            .options(
+                defer(ResponseDefinition.indices),
+                selectinload(ResponseDefinition.observation_links)
+                .joinedload(ObservationResponseDefinitionLink.observation)
+                .selectinload(Observation.observation_attributes)
+                .joinedload(ObservationAttribute.value),
+            )
+            .filter_by(ensemble_id=ensemble_id)
+            .order_by(ResponseDefinition.id)
+            .all()
+        )
+
+    def get_response_definitions_by_names(self, response_names, ensemble_id):
+        """
+        Returns the id, name and indices of each response definition with one
+        of the given names in an ensemble that has responses, in the order of
+        their ids.
+        """
+        rows = []
+        for names in _chunks(response_names):
+            rows.extend(
+                self._session.query(
+                    ResponseDefinition.id,
+                    ResponseDefinition.name,
+                    ResponseDefinition.indices,
+                )
+                .filter(ResponseDefinition.responses.any())
+                .filter(ResponseDefinition.name.in_(names))
+                .filter(ResponseDefinition.ensemble_id == ensemble_id)
+                .all()
+            )
+        return sorted(rows, key=lambda row: row.id)
+
+    def get_response_values_by_definition_ids(
+        self, response_definition_ids, realizations=None, index=None
+    ):
+        """
+        Returns the response definition id, realization index and values of
+        each response of the given response definitions, ordered by response
+        definition id and realization index. Only the given realization
+        indices are read if realizations is not None, and index, a slice,
+        selects the values of each response.
+        """
+        rows = []
+        for ids in _chunks(sorted(response_definition_ids)):
+            rows.extend(
+                self._get_response_values(
+                    [Response.response_definition_id, Realization.index],
+                    Response.response_definition_id.in_(ids),
+                    realizations,
+                    index,
+                )
+            )
+        return rows
+
+    def get_parameter_values_by_definition_ids(
+        self, parameter_definition_ids, realizations=None
+    ):
+        """
+        Returns the parameter definition id, realization index and value of
+        each parameter of the given parameter definitions, ordered by
+        parameter definition id and realization index. Only the given
+        realization indices are read if realizations is not None.
+        """
+        rows = []
+        for ids in _chunks(sorted(parameter_definition_ids)):
+            for indices in _realization_chunks(realizations):
+                query = (
+                    self._session.query(
+                        Parameter.parameter_definition_id,
+                        Realization.index,
+                        Parameter.value,
+                    )
+                    .join(Parameter, Parameter.realization_id == Realization.id)
+                    .filter(Parameter.parameter_definition_id.in_(ids))
+                )
+                if indices is not None:
+                    query = query.filter(Realization.index.in_(indices))
+                rows.extend(
+                    query.order_by(Parameter.parameter_definition_id, Realization.index)
+                )
+        if realizations is not None:
+            # Each chunk of realizations is ordered on its own
+            rows.sort(key=lambda row: (row[0], row[1]))
+        return rows
+
+    def get_response_bundle(self, response_name, ensemble_id, observations=False):
         # responsedefinition : observation, indices
         # realizations : index
         # response : values
+        # The responses are loaded up front, and with observations, the
+        # observation links and the misfits of each response
+        responses = selectinload(ResponseDefinition.responses)
+        options = [responses.joinedload(Response.realization)]
+        if observations:
+            options += [
+                selectinload(ResponseDefinition.observation_links)
+                .joinedload(ObservationResponseDefinitionLink.observation)
+                .selectinload(Observation.observation_attributes)
+                .joinedload(ObservationAttribute.value),
+                responses.selectinload(Response.misfits)
+                .joinedload(Misfit.observation_response_definition_link)
+                .joinedload(ObservationResponseDefinitionLink.observation),
+            ]
         try:
             return (
                 self._session.query(ResponseDefinition)
-                .join(
-                    Response, ResponseDefinition.id == Response.response_definition_id
-                )
+                .options(*options)
+                .filter(ResponseDefinition.responses.any())
                 .filter(ResponseDefinition.name == response_name)
                 .filter(ResponseDefinition.ensemble_id == ensemble_id)
                 .one()
@@ -407,10 +884,11 @@ class RdbApi:
         try:
             parameter_bundle = (
                 self._session.query(ParameterDefinition)
-                .join(
-                    ParameterPrior,
-                    ParameterDefinition.prior_id == ParameterPrior.id,
-                    isouter=True,
+                .options(
+                    joinedload(ParameterDefinition.prior),
+                    selectinload(ParameterDefinition.parameters).joinedload(
+                        Parameter.realization
+                    ),
                 )
                 .filter(ParameterDefinition.id == parameter_def_id)
                 .filter(ParameterDefinition.ensemble_id == ensemble_id)
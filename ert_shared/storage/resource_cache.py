@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+
+class ResourceCache:
+    """
+    Least recently used cache of the serialized resources of the storage
+    server, and of other values derived from the storage, bounded by their
+    total size in bytes. Each lookup gives the
+    current revision of the storage, see RdbApi.get_revision, and the whole
+    cache is dropped when it has changed, as anything in it may be outdated.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._revision = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, revision):
+        """Returns the value of key, or None if it is not cached."""
+        with self._lock:
+            self._revise(revision)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, revision, value, size=None):
+        """
+        Caches value as the value of key at revision. The size of value in
+        bytes is len(value), as for a bytes object, unless size is given.
+        """
+        if size is None:
+            size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._revise(revision)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _revise(self, revision):
+        if revision == self._revision:
+            return
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._size = 0
+        self._revision = revision
@@ -20,7 +20,9 @@ class ServerMonitor(threading.Thread):
     TIMEOUT = 20  # Wait 20s for the server to start before panicking
     _instance = None
 
-    def __init__(self, *, rdb_url=None, lockfile=True):
+    def __init__(self, *, rdb_url=None, lockfile=True, server_args=()):
+        """server_args are passed on to the server, see
+        ert_shared.storage.command for what it accepts."""
         super().__init__()
 
         self._assert_server_not_running()
@@ -36,6 +38,7 @@ class ServerMonitor(threading.Thread):
             args.append("--disable-lockfile")
         if rdb_url:
             args.extend(("--rdb-url", rdb_url))
+        args.extend(server_args)
 
         fd_read, fd_write = os.pipe()
         self._comm_pipe = os.fdopen(fd_read)
@@ -1,9 +1,23 @@
+from itertools import groupby
+
+import numpy as np
+
+from ert_shared.storage.array_type import to_list
 from ert_shared.storage.rdb_api import RdbApi
 
 
 class StorageApi:
-    def __init__(self, session):
+    def __init__(self, session, cache=None):
+        """
+        cache, a ResourceCache of the database of session, keeps values such
+        as the univariate misfits across sessions. Nothing is cached if it is
+        None.
+        """
         self._rdb_api = RdbApi(session)
+        self._cache = cache
+
+    def get_revision(self):
+        return self._rdb_api.get_revision()
 
     def _ensemble_minimal(self, ensemble):
         if ensemble is None:
@@ -43,90 +57,92 @@ class StorageApi:
         if realization is None:
             return None
 
-        response_definitions = self._rdb_api.get_response_definitions_by_ensemble_id(
-            ensemble_id=ensemble_id
+        responses = self._rdb_api.get_responses_by_realization_id(
+            realization_id=realization.id
         )
-        responses = [
-            {
-                "name": resp_def.name,
-                "response": self._rdb_api.get_response_by_realization_id(
-                    response_definition_id=resp_def.id,
-                    realization_id=realization.id,
-                ),
-            }
-            for resp_def in response_definitions
-        ]
-
-        parameter_definitions = self._rdb_api.get_parameter_definitions_by_ensemble_id(
-            ensemble_id=ensemble_id
+        parameters = self._rdb_api.get_parameters_by_realization_id(
+            realization_id=realization.id
         )
-        parameters = [
-            {
-                "name": param_def.name,
-                "parameter": self._rdb_api.get_parameter_by_realization_id(
-                    parameter_definition_id=param_def.id,
-                    realization_id=realization.id,
-                ),
-            }
-            for param_def in parameter_definitions
-        ]
 
         return_schema = {
             "name": realization.index,
             "responses": [
-                {"name": res["name"], "data": res["response"].values}
-                for res in responses
-            ],
-            "parameters": [
-                {"name": par["name"], "data": par["parameter"].value}
-                for par in parameters
+                {"name": name, "data": to_list(values)} for name, values in responses
             ],
+            "parameters": [{"name": name, "data": value} for name, value in parameters],
         }
 
         return return_schema
 
-    def _calculate_misfit(
-        self, obs_value, response_values, obs_stds, obs_data_indexes, obs_index
-    ):
-        observation_std = obs_stds[obs_index]
-        response_index = obs_data_indexes[obs_index]
-        response_value = response_values[response_index]
-        difference = response_value - obs_value
-        misfit = (difference / observation_std) ** 2
-        sign = difference > 0
-
-        return {"value": misfit, "sign": sign, "obs_index": obs_index}
+    @staticmethod
+    def _calculate_misfits(observed_values, observation):
+        """
+        Returns the misfits, ((response - observation) / std) ** 2, and the
+        signs, response > observation, of each realization (row) of
+        observed_values, the responses at the data indices of observation,
+        at each point of observation (column).
+        """
+        difference = observed_values - observation.values
+        misfits = (difference / observation.errors) ** 2
+        return misfits, difference > 0
+
+    def _get_univariate_misfits(self, ensemble_id, bundle):
+        """
+        Returns the misfit of each realization against each point of each
+        observation of the response in bundle, by realization index and
+        observation name. The misfits and signs are kept in the cache until
+        the storage changes, as long as it is given.
+        """
+        realizations = [resp.realization.index for resp in bundle.responses]
+        univariate_misfits = {index: {} for index in realizations}
+        if not bundle.observation_links:
+            return univariate_misfits
+
+        key = ("univariate_misfits", ensemble_id, bundle.id)
+        revision = None
+        matrices = None
+        if self._cache is not None:
+            revision = self.get_revision()
+            matrices = self._cache.get(key, revision)
+        if matrices is None:
+            matrices = []
+            for link in bundle.observation_links:
+                observation = link.observation
+                data_indices = np.asarray(observation.data_indices, dtype=np.int64)
+                # Responses may differ in length, only the observed points
+                # of each are put in the matrix
+                observed_values = np.array(
+                    [resp.values[data_indices] for resp in bundle.responses],
+                    dtype=np.float64,
+                ).reshape(len(realizations), len(data_indices))
+                misfits, signs = self._calculate_misfits(observed_values, observation)
+                matrices.append((observation.name, misfits, signs))
+            if self._cache is not None:
+                size = sum(
+                    misfits.nbytes + signs.nbytes for _, misfits, signs in matrices
+                )
+                self._cache.put(key, revision, matrices, size=size)
+
+        for name, misfits, signs in matrices:
+            for index, misfit_row, sign_row in zip(
+                realizations, misfits.tolist(), signs.tolist()
+            ):
+                univariate_misfits[index][name] = [
+                    {"value": value, "sign": sign, "obs_index": obs_index}
+                    for obs_index, (value, sign) in enumerate(zip(misfit_row, sign_row))
+                ]
+        return univariate_misfits
 
     def get_response(self, ensemble_id, response_name, filter):
         bundle = self._rdb_api.get_response_bundle(
-            response_name=response_name, ensemble_id=ensemble_id
+            response_name=response_name, ensemble_id=ensemble_id, observations=True
         )
         if bundle is None:
             return None
 
         observation_links = bundle.observation_links
         responses = bundle.responses
-        univariate_misfits = {}
-        for resp in responses:
-            resp_values = list(resp.values)
-            univariate_misfits[resp.realization.index] = {}
-            for link in observation_links:
-                observation = link.observation
-                obs_values = list(observation.values)
-                obs_stds = list(observation.errors)
-                obs_data_indexes = list(observation.data_indices)
-                misfits = []
-                for obs_index, obs_value in enumerate(obs_values):
-                    misfits.append(
-                        self._calculate_misfit(
-                            obs_value,
-                            resp_values,
-                            obs_stds,
-                            obs_data_indexes,
-                            obs_index,
-                        )
-                    )
-                univariate_misfits[resp.realization.index][observation.name] = misfits
+        univariate_misfits = self._get_univariate_misfits(ensemble_id, bundle)
 
         return_schema = {
             "name": response_name,
@@ -135,21 +151,16 @@ class StorageApi:
                 {
                     "name": resp.realization.index,
                     "realization_ref": resp.realization.index,
-                    "data": resp.values,
+                    "data": to_list(resp.values),
                     "summarized_misfits": {
                         misfit.observation_response_definition_link.observation.name: misfit.value
                         for misfit in resp.misfits
                     },
-                    "univariate_misfits": {
-                        obs_name: misfits
-                        for obs_name, misfits in univariate_misfits[
-                            resp.realization.index
-                        ].items()
-                    },
+                    "univariate_misfits": univariate_misfits[resp.realization.index],
                 }
                 for resp in responses
             ],
-            "axis": {"data": bundle.indices},
+            "axis": {"data": to_list(bundle.indices)},
         }
         if len(observation_links) > 0:
             return_schema["observations"] = [
@@ -159,16 +170,24 @@ class StorageApi:
 
         return return_schema
 
-    def get_response_data(self, ensemble_id, response_name):
-        bundle = self._rdb_api.get_response_bundle(
+    def get_response_data(
+        self, ensemble_id, response_name, realizations=None, index=None
+    ):
+        """
+        Returns the realization index and values of each response, ordered by
+        realization index. Only the responses of the given realization indices
+        are read if realizations is not None, and index, a slice, selects the
+        values of each response.
+        """
+        response_definition_id = self._rdb_api.get_response_definition_id(
             response_name=response_name, ensemble_id=ensemble_id
         )
-        if bundle is None:
+        if response_definition_id is None:
             return None
-        responses = bundle.responses
 
-        ids = [resp.values for resp in responses]
-        return ids
+        return self._rdb_api.get_response_values(
+            response_definition_id, realizations=realizations, index=index
+        )
 
     def get_observation(self, name):
         obs = self._rdb_api.get_observation(name)
@@ -224,18 +243,135 @@ class StorageApi:
         )
         return return_schema
 
+    def get_ensemble_keys(self, ensemble_id):
+        """
+        Returns the responses of an ensemble with their observations, and its
+        parameters, which is all there is to know about its keys, without
+        reading any of their data.
+        """
+        if self._rdb_api.get_ensemble_by_id(ensemble_id) is None:
+            return None
+
+        return {
+            "responses": [
+                {
+                    "name": resp.name,
+                    "response_ref": resp.name,
+                    "observations": [
+                        self._obs_to_json(link.observation, link.active)
+                        for link in resp.observation_links
+                    ],
+                }
+                for resp in self._rdb_api.get_response_definitions_with_observations(
+                    ensemble_id
+                )
+            ],
+            "parameters": [
+                self._parameter_minimal(
+                    name=par.name,
+                    group=par.group,
+                    prior=par.prior,
+                    parameter_def_id=par.id,
+                )
+                for par in self._rdb_api.get_parameter_definitions_by_ensemble_id(
+                    ensemble_id
+                )
+            ],
+        }
+
+    def get_response_batch(
+        self, ensemble_id, response_names, realizations=None, index=None
+    ):
+        """
+        Returns the axis, and the realization index and values of each
+        response, of each of the named responses of an ensemble, as
+        get_response_data does for one of them. Names without responses in
+        the ensemble are left out. The axis and values are NumPy arrays, as
+        read from the database.
+        """
+        definitions = self._rdb_api.get_response_definitions_by_names(
+            response_names, ensemble_id
+        )
+        values = groupby(
+            self._rdb_api.get_response_values_by_definition_ids(
+                [definition.id for definition in definitions],
+                realizations=realizations,
+                index=index,
+            ),
+            key=lambda row: row[0],
+        )
+        rows = {definition_id: list(group) for definition_id, group in values}
+
+        responses = []
+        for definition in definitions:
+            definition_rows = rows.get(definition.id, [])
+            axis = definition.indices
+            if index is not None and axis is not None:
+                axis = axis[index]
+            responses.append(
+                {
+                    "name": definition.name,
+                    "axis": {"data": axis},
+                    "realizations": [
+                        realization for _, realization, _ in definition_rows
+                    ],
+                    "data": [data for _, _, data in definition_rows],
+                }
+            )
+        return {"responses": responses}
+
+    def get_parameter_batch(self, ensemble_id, parameter_names, realizations=None):
+        """
+        Returns the realization index and value of each parameter of each of
+        the named parameters of an ensemble, named GROUP:KEY, as
+        get_parameter_data does for one of them. Names of parameters not in
+        the ensemble are left out.
+        """
+        names = set(parameter_names)
+        definitions = [
+            definition
+            for definition in self._rdb_api.get_parameter_definitions_by_ensemble_id(
+                ensemble_id
+            )
+            if "{}:{}".format(definition.group, definition.name) in names
+        ]
+        values = groupby(
+            self._rdb_api.get_parameter_values_by_definition_ids(
+                [definition.id for definition in definitions],
+                realizations=realizations,
+            ),
+            key=lambda row: row[0],
+        )
+        rows = {definition_id: list(group) for definition_id, group in values}
+
+        parameters = []
+        for definition in sorted(definitions, key=lambda definition: definition.id):
+            definition_rows = rows.get(definition.id, [])
+            parameters.append(
+                {
+                    "key": definition.name,
+                    "group": definition.group,
+                    "parameter_ref": definition.id,
+                    "realizations": [
+                        realization for _, realization, _ in definition_rows
+                    ],
+                    "data": [value for _, _, value in definition_rows],
+                }
+            )
+        return {"parameters": parameters}
+
     def _obs_to_json(self, obs, active=None):
         data = {
             "name": obs.name,
             "data": {
-                "values": {"data": obs.values},
-                "std": {"data": obs.errors},
-                "data_indexes": {"data": obs.data_indices},
-                "key_indexes": {"data": obs.key_indices},
+                "values": {"data": to_list(obs.values)},
+                "std": {"data": to_list(obs.errors)},
+                "data_indexes": {"data": to_list(obs.data_indices)},
+                "key_indexes": {"data": to_list(obs.key_indices)},
             },
         }
         if active is not None:
-            data["data"]["active_mask"] = {"data": active}
+            data["data"]["active_mask"] = {"data": to_list(active)}
 
         attrs = obs.get_attributes()
         if len(attrs) > 0:
@@ -251,7 +387,7 @@ class StorageApi:
             "prior": {
                 "function": prior.function,
                 "parameter_names": prior.parameter_names,
-                "parameter_values": prior.parameter_values,
+                "parameter_values": to_list(prior.parameter_values),
             }
             if prior is not None
             else {},
@@ -281,12 +417,18 @@ class StorageApi:
         ]
         return return_schema
 
-    def get_parameter_data(self, ensemble_id, parameter_def_id):
-        bundle = self._rdb_api.get_parameter_bundle(
+    def get_parameter_data(self, ensemble_id, parameter_def_id, realizations=None):
+        """
+        Returns the realization index and value of each parameter, ordered by
+        realization index. Only the parameters of the given realization
+        indices are read if realizations is not None.
+        """
+        parameter_def_id = self._rdb_api.get_parameter_definition_id(
             parameter_def_id=parameter_def_id, ensemble_id=ensemble_id
         )
-        if bundle is None:
+        if parameter_def_id is None:
             return None
 
-        ids = [param.value for param in bundle.parameters]
-        return ids
+        return self._rdb_api.get_parameter_values(
+            parameter_def_id, realizations=realizations
+        )
@@ -0,0 +1,111 @@
+import pandas as pd
+import pytest
+
+from ert_data import loader
+from ert_data.cache import MeasuredDataCache
+from ert_data.measured import MeasuredData
+
+from unittest.mock import Mock
+
+
+@pytest.fixture()
+def mocked_loader(monkeypatch):
+    data = pd.DataFrame(
+        data=[[1.0, 2.0], [0.1, 0.2], [1.1, 2.1]], index=["OBS", "STD", 0]
+    )
+    mocked_loader = Mock(side_effect=lambda *args: data.copy())
+    monkeypatch.setattr(loader, "data_loader_factory", Mock(return_value=mocked_loader))
+    return mocked_loader
+
+
+@pytest.mark.usefixtures("facade")
+def test_cache_hit(facade, mocked_loader):
+    facade.get_realization_states.return_value = [1, 1]
+    cache = MeasuredDataCache()
+
+    first = MeasuredData(facade, ["test_key"], cache=cache)
+    second = MeasuredData(facade, ["test_key"], cache=cache)
+
+    mocked_loader.assert_called_once()
+    assert first.data.equals(second.data)
+    assert len(cache) == 1
+
+
+@pytest.mark.usefixtures("facade")
+def test_cache_key_includes_index_list(facade, mocked_loader):
+    facade.get_realization_states.return_value = [1, 1]
+    cache = MeasuredDataCache()
+
+    MeasuredData(facade, ["test_key"], cache=cache)
+    md = MeasuredData(facade, ["test_key"], index_lists=[[1]], cache=cache)
+
+    assert mocked_loader.call_count == 2
+    assert md.data.shape == (3, 1)
+
+
+@pytest.mark.usefixtures("facade")
+def test_cache_invalidated_on_state_change(facade, mocked_loader):
+    facade.get_realization_states.return_value = [1, 1]
+    cache = MeasuredDataCache()
+
+    MeasuredData(facade, ["test_key"], cache=cache)
+    facade.get_realization_states.return_value = [1, 2]
+    MeasuredData(facade, ["test_key"], cache=cache)
+
+    assert mocked_loader.call_count == 2
+    assert len(cache) == 1
+
+
+@pytest.mark.usefixtures("facade")
+def test_cache_invalidated_on_rerun_with_same_states(facade, mocked_loader):
+    facade.get_realization_states.return_value = [1, 1]
+    facade.get_case_write_time.return_value = 1000
+    cache = MeasuredDataCache()
+
+    MeasuredData(facade, ["test_key"], cache=cache)
+    MeasuredData(facade, ["test_key"], cache=cache)
+    assert mocked_loader.call_count == 1
+
+    facade.get_case_write_time.return_value = 2000
+    MeasuredData(facade, ["test_key"], cache=cache)
+
+    assert mocked_loader.call_count == 2
+    facade.get_case_write_time.assert_called_with("test_case")
+
+
+@pytest.mark.usefixtures("facade")
+def test_cache_per_case(facade, mocked_loader):
+    facade.get_realization_states.return_value = [1, 1]
+    cache = MeasuredDataCache()
+
+    MeasuredData(facade, ["test_key"], cache=cache)
+    facade.get_current_case_name.return_value = "other_case"
+    MeasuredData(facade, ["test_key"], cache=cache)
+    facade.get_current_case_name.return_value = "test_case"
+    MeasuredData(facade, ["test_key"], cache=cache)
+
+    assert mocked_loader.call_count == 2
+    assert len(cache) == 2
+
+
+def test_cache_byte_budget():
+    block = pd.DataFrame(data=[[1.0, 2.0]])
+    nbytes = int(block.memory_usage(index=True).sum())
+    cache = MeasuredDataCache(max_bytes=2 * nbytes)
+
+    cache.put(("case", "a"), block)
+    cache.put(("case", "b"), block)
+    cache.get(("case", "a"))
+    cache.put(("case", "c"), block)
+
+    assert cache.get(("case", "b")) is None
+    assert cache.get(("case", "a")) is block
+    assert cache.get(("case", "c")) is block
+    assert cache.nbytes == 2 * nbytes
+
+
+def test_cache_skips_oversized_blocks():
+    cache = MeasuredDataCache(max_bytes=1)
+    cache.put(("case", "a"), pd.DataFrame(data=[[1.0, 2.0]]))
+    assert len(cache) == 0
+    assert cache.nbytes == 0
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ert_data.ensemble_statistics import (
+    EnsembleStatistics,
+    ensemble_mean_std,
+    failed_realizations,
+)
+
+
+@pytest.fixture()
+def ensemble():
+    rng = np.random.RandomState(42)
+    values = rng.normal(size=(25, 6))
+    values[3, :] = np.nan
+    values[5:9, 2] = np.nan
+    values[:, 4] = np.nan
+    values[:24, 5] = np.nan
+    data = pd.DataFrame(data=values, index=list(range(25)))
+    observations = pd.DataFrame(data=np.ones((2, 6)), index=["OBS", "STD"])
+    return pd.concat([observations, data])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 7, 100])
+def test_ensemble_mean_std(ensemble, chunk_size):
+    simulated = ensemble.drop(index=["OBS", "STD"])
+
+    mean, std = ensemble_mean_std(ensemble, chunk_size=chunk_size)
+
+    pd.testing.assert_series_equal(mean, simulated.mean())
+    pd.testing.assert_series_equal(std, simulated.std())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 100])
+def test_failed_realizations(ensemble, chunk_size):
+    assert failed_realizations(ensemble, chunk_size=chunk_size) == [3]
+
+
+def test_ensemble_statistics_single_chunk():
+    statistics = EnsembleStatistics(2)
+    statistics.update([[1.0, np.nan], [3.0, np.nan]])
+
+    assert statistics.mean[0] == 2.0
+    assert np.isnan(statistics.mean[1])
+    assert statistics.std[0] == pytest.approx(np.sqrt(2.0))
+    assert np.isnan(statistics.std[1])
@@ -1,6 +1,7 @@
 from ert_data import loader
 from tests.data.mocked_block_observation import MockedBlockObservation
 import sys
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -117,3 +118,104 @@ def test_load_summary_data(facade, monkeypatch):
         ANY, facade, observation_key, data_key, case_name
     )
     assert result.equals(create_expected_data())
+
+
+@pytest.mark.usefixtures("facade")
+def test_load_general_data_multiple_steps(facade):
+    mock_node = MagicMock()
+    mock_node.__len__.return_value = 3
+    mock_node.get_data_points.return_value = [10.0, 10.0, 10.0]
+    mock_node.get_std.return_value = [1.0, 1.0, 1.0]
+    mock_node.getIndex.side_effect = mocked_obs_node_get_index_nr
+
+    obs_vector = facade.get_observations()["some_key"]
+    obs_vector.getStepList.return_value.asList.return_value = [1, 2]
+    obs_vector.getNode.return_value = mock_node
+    facade.load_gen_data.return_value = pd.DataFrame(data=[10, 10, 10, 10])
+
+    result = loader.load_general_data(facade, "some_key", "test_case")
+
+    expected = pd.concat([create_expected_data(), create_expected_data()])
+    assert result.equals(expected)
+
+
+def test_get_block_measured():
+    block_data = {0: [1.0, 2.0, 3.0], 1: [4.0, 5.0, 6.0]}
+
+    result = loader._get_block_measured(2, block_data)
+
+    expected = pd.DataFrame(data=[[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], index=[0, 1])
+    assert result.equals(expected)
+
+
+def test_get_block_observations():
+    obs_block = MockedBlockObservation(
+        {"values": [10.0, 20.0, 30.0], "stds": [1.0, 2.0, 3.0]}
+    )
+
+    result = loader._get_block_observations(obs_block)
+
+    assert np.array_equal(result, [[10.0, 20.0, 30.0], [1.0, 2.0, 3.0]])
+
+
+def test_get_block_measured_uneven_lengths():
+    block_data = {0: [1.0, 2.0, 3.0], 1: [4.0]}
+
+    result = loader._get_block_measured(2, block_data)
+
+    expected = pd.DataFrame(data=[[1.0, 2.0, 3.0], [4.0, np.nan, np.nan]], index=[0, 1])
+    assert result.equals(expected)
+
+
+@pytest.fixture()
+def summary_facade(facade):
+    dates = pd.date_range("2010-01-01", periods=3, freq="D")
+    summary_data = pd.DataFrame(
+        data={
+            "FOPR": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+            "WOPR": [6.0, 5.0, 4.0, 3.0, 2.0, 1.0],
+        },
+        index=pd.MultiIndex.from_product(
+            [[0, 1], dates], names=["Realization", "Date"]
+        ),
+    )
+    observation_data = pd.DataFrame(
+        data={
+            "FOPR": [1.5, 2.5, 3.5],
+            "STD_FOPR": [0.1, 0.2, 0.3],
+            "WOPR": [5.5, 4.5, 3.5],
+            "STD_WOPR": [0.3, 0.2, 0.1],
+        },
+        index=dates,
+    )
+
+    step_lists = {"FOPR_OBS": [1, 2], "WOPR_OBS": [3]}
+    facade.get_step_list_for_obs_key.side_effect = step_lists.get
+    facade.get_data_key_for_obs_key.side_effect = lambda key: key.split("_")[0]
+    facade.load_all_summary_data.side_effect = lambda case, keys: summary_data[keys]
+    facade.load_observation_data.side_effect = lambda case, keys: observation_data[
+        [column for key in keys for column in (key, "STD_" + key)]
+    ]
+    return facade
+
+
+@pytest.mark.parametrize("include_data", [True, False])
+def test_load_summary_data_batch(summary_facade, include_data):
+    keys = ["FOPR_OBS", "WOPR_OBS"]
+
+    expected = {
+        key: loader.load_summary_data(summary_facade, key, "test_case", include_data)
+        for key in keys
+    }
+    summary_facade.load_all_summary_data.reset_mock()
+    summary_facade.load_observation_data.reset_mock()
+
+    result = loader.load_summary_data_batch(
+        summary_facade, keys, "test_case", include_data
+    )
+
+    assert summary_facade.load_observation_data.call_count == 1
+    assert summary_facade.load_all_summary_data.call_count == int(include_data)
+    assert list(result) == keys
+    for key in keys:
+        assert result[key].equals(expected[key])
@@ -1,11 +1,12 @@
 import sys
+import numpy as np
 import pandas as pd
 import pytest
 
 from ert_data import loader
 from ert_data.measured import MeasuredData
 
-from unittest.mock import Mock
+from unittest.mock import MagicMock, Mock
 
 
 @pytest.fixture()
@@ -28,6 +29,7 @@ def _set_multiindex(df):
     tuples = list(zip(*[df.columns.to_list(), df.columns.to_list()]))
     return pd.MultiIndex.from_tuples(tuples, names=["key_index", "data_index"])
 
+
 @pytest.mark.usefixtures("facade", "valid_dataframe", "measured_data_setup")
 @pytest.mark.parametrize("obs_type", [("GEN_OBS"), ("SUMMARY_OBS"), ("BLOCK_OBS")])
 def test_get_data(obs_type, monkeypatch, facade, valid_dataframe, measured_data_setup):
@@ -35,7 +37,7 @@ def test_get_data(obs_type, monkeypatch, facade, valid_dataframe, measured_data_
     facade.get_impl_type_name_for_obs_key.return_value = obs_type
 
     factory = measured_data_setup(valid_dataframe, monkeypatch)
-    md = MeasuredData(facade, ["test_key"], index_lists=[[1, 2]])
+    md = MeasuredData(facade, ["test_key"], index_lists=[[1, 2]], dense=True)
 
     factory.assert_called_once_with(obs_type)
     mocked_loader = factory()
@@ -279,3 +281,161 @@ def test_get_simulated_data(
 
     result = md.get_simulated_data()
     assert result.equals(pd.concat({"test_key": expected_result.astype(float)}, axis=1))
+
+
+@pytest.mark.usefixtures("facade", "valid_dataframe")
+def test_get_data_multiple_keys(monkeypatch, facade, valid_dataframe):
+    mocked_loader = Mock(side_effect=lambda *args: valid_dataframe.copy())
+    monkeypatch.setattr(loader, "data_loader_factory", Mock(return_value=mocked_loader))
+
+    md = MeasuredData(facade, ["key_1", "key_2"], index_lists=[[0], [1, 2]])
+
+    df_1 = pd.DataFrame(data=[[1.0], [4.0]], index=["OBS", "STD"], columns=[0])
+    df_1.columns = _set_multiindex(df_1)
+    df_2 = pd.DataFrame(
+        data=[[2.0, 3.0], [5.0, 6.0]], index=["OBS", "STD"], columns=[1, 2]
+    )
+    df_2.columns = _set_multiindex(df_2)
+    expected_result = pd.concat({"key_1": df_1, "key_2": df_2}, axis=1)
+
+    assert md.data.equals(expected_result)
+
+
+@pytest.mark.usefixtures("facade", "valid_dataframe", "measured_data_setup")
+def test_get_data_float32(monkeypatch, facade, valid_dataframe, measured_data_setup):
+    measured_data_setup(valid_dataframe, monkeypatch)
+    md = MeasuredData(facade, ["test_key"], dtype=np.float32)
+
+    assert (md.data.dtypes == np.float32).all()
+    assert md.get_simulated_data().empty
+
+
+@pytest.mark.usefixtures("facade", "valid_dataframe", "measured_data_setup")
+def test_get_data_invalid_dtype(
+    monkeypatch, facade, valid_dataframe, measured_data_setup
+):
+    measured_data_setup(valid_dataframe, monkeypatch)
+    with pytest.raises(TypeError):
+        MeasuredData(facade, ["test_key"], dtype=int)
+
+
+@pytest.mark.usefixtures("facade")
+def test_lazy_loads_only_requested_keys(monkeypatch, facade):
+    input_dataframe = pd.DataFrame(
+        data=[[1, 2], [0.1, 0.2], [1, 1.5], [1, 2.5]], index=["OBS", "STD", 1, 2]
+    )
+    mocked_loader = Mock(side_effect=lambda *args: input_dataframe.copy())
+    monkeypatch.setattr(loader, "data_loader_factory", Mock(return_value=mocked_loader))
+
+    md = MeasuredData(facade, ["key_1", "key_2", "key_3"], lazy=True)
+    mocked_loader.assert_not_called()
+
+    md.filter_ensemble_std(0, keys=["key_2"])
+    mocked_loader.assert_called_once_with(facade, "key_2", "test_case", True)
+    assert md.get_simulated_data(keys=["key_2"]).shape == (2, 1)
+
+    assert md.data.columns.get_level_values(0).to_list() == [
+        "key_2",
+        "key_1",
+        "key_1",
+        "key_3",
+        "key_3",
+    ]
+    assert mocked_loader.call_count == 3
+
+
+@pytest.mark.usefixtures("facade", "valid_dataframe", "measured_data_setup")
+def test_lazy_equals_eager(monkeypatch, facade, valid_dataframe, measured_data_setup):
+    measured_data_setup(valid_dataframe.copy(), monkeypatch)
+    eager = MeasuredData(facade, ["test_key"], index_lists=[[1, 2]])
+    measured_data_setup(valid_dataframe.copy(), monkeypatch)
+    lazy = MeasuredData(facade, ["test_key"], index_lists=[[1, 2]], lazy=True)
+
+    assert lazy.data.equals(eager.data)
+
+
+@pytest.mark.usefixtures("facade", "valid_dataframe")
+def test_get_data_summary_batch(monkeypatch, facade, valid_dataframe):
+    facade.get_impl_type_name_for_obs_key.return_value = "SUMMARY_OBS"
+    batch_loader = Mock(
+        side_effect=lambda facade, keys, *args: {
+            key: valid_dataframe.copy() for key in keys
+        }
+    )
+    factory = Mock()
+    monkeypatch.setattr(loader, "load_summary_data_batch", batch_loader)
+    monkeypatch.setattr(loader, "data_loader_factory", factory)
+
+    md = MeasuredData(facade, ["key_1", "key_2"])
+
+    batch_loader.assert_called_once_with(facade, ["key_1", "key_2"], "test_case", True)
+    factory.assert_not_called()
+    assert md.data.columns.get_level_values(0).to_list() == [
+        "key_1",
+        "key_1",
+        "key_1",
+        "key_2",
+        "key_2",
+        "key_2",
+    ]
+
+
+@pytest.fixture()
+def gen_obs_facade(facade):
+    facade.get_impl_type_name_for_obs_key.return_value = "GEN_OBS"
+
+    node = MagicMock()
+    node.__len__.return_value = 2
+    node.getIndex.side_effect = [1, 3].__getitem__
+    node.get_data_points.return_value = [10.0, 30.0]
+    node.get_std.return_value = [1.0, 3.0]
+    facade.get_observations()["some_key"].getNode.return_value = node
+
+    catalog = facade.get_observation_catalog.return_value
+    catalog.data_key.return_value = "test_data_key"
+    catalog.step_list.return_value = [1]
+    catalog.data_indices.return_value = np.array([1, 3])
+
+    facade.load_gen_data.return_value = pd.DataFrame(
+        np.arange(15, dtype=float).reshape(5, 3)
+    )
+    return facade
+
+
+def test_get_data_sparse(gen_obs_facade):
+    sparse = MeasuredData(gen_obs_facade, ["some_key"])
+    dense = MeasuredData(gen_obs_facade, ["some_key"], dense=True)
+
+    assert sparse.data.shape[1] == 2
+    assert dense.data.shape[1] == 5
+    dense.remove_inactive_observations()
+    assert sparse.data.equals(dense.data)
+
+
+def test_get_data_sparse_without_data(gen_obs_facade):
+    md = MeasuredData(gen_obs_facade, ["some_key"], load_data=False)
+
+    assert md.data.index.to_list() == ["OBS", "STD"]
+    assert md.data.columns.to_list() == [("some_key", 1, 1), ("some_key", 3, 3)]
+    gen_obs_facade.load_gen_data.assert_not_called()
+
+
+def test_get_data_sparse_index_list(gen_obs_facade):
+    md = MeasuredData(gen_obs_facade, ["some_key"], index_lists=[[3, 2]])
+
+    assert md.data.columns.to_list() == [("some_key", 3, 3)]
+    assert md.data.loc["OBS"].to_list() == [30.0]
+
+    with pytest.raises(IndexError):
+        MeasuredData(gen_obs_facade, ["some_key"], index_lists=[[5]])
+
+
+def test_filter_ensemble_std_sparse(gen_obs_facade):
+    md = MeasuredData(gen_obs_facade, ["some_key"])
+    md.filter_ensemble_std(1.0)
+
+    dense = MeasuredData(gen_obs_facade, ["some_key"], dense=True)
+    dense.remove_inactive_observations()
+    dense.filter_ensemble_std(1.0)
+
+    assert md.data.equals(dense.data)
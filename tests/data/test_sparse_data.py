@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ert_data.sparse_data import SparseData
+
+
+@pytest.fixture()
+def sparse_data():
+    return SparseData(
+        data_index=[2, 5, 7],
+        observations=[[1.0, 2.0, 3.0], [0.1, 0.2, 0.3]],
+        simulated=[[1.5, 2.5, 3.5], [0.5, 1.5, 2.5]],
+        realizations=[0, 1],
+        width=10,
+    )
+
+
+def test_to_frame(sparse_data):
+    expected = pd.DataFrame(
+        [[1.0, 2.0, 3.0], [0.1, 0.2, 0.3], [1.5, 2.5, 3.5], [0.5, 1.5, 2.5]],
+        index=["OBS", "STD", 0, 1],
+        columns=pd.MultiIndex.from_arrays(
+            [[2, 5, 7], [2, 5, 7]], names=["key_index", "data_index"]
+        ),
+    )
+
+    assert sparse_data.to_frame().equals(expected)
+
+
+def test_select(sparse_data):
+    selected = sparse_data.select([7, 3, 2])
+
+    assert len(selected) == 2
+    assert np.array_equal(selected.data_index, [7, 2])
+    assert np.array_equal(selected.observations, [[3.0, 1.0], [0.3, 0.1]])
+    assert np.array_equal(selected.simulated, [[3.5, 1.5], [2.5, 0.5]])
+
+
+def test_select_out_of_range(sparse_data):
+    with pytest.raises(IndexError):
+        sparse_data.select([10])
+
+
+def test_without_simulated_data():
+    sparse_data = SparseData([1], [[1.0], [0.1]], None, [], 2)
+
+    assert sparse_data.to_frame().index.to_list() == ["OBS", "STD"]
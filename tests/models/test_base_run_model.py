@@ -1,8 +1,12 @@
 import sys
+import threading
 import unittest
 
 from ert_gui.ertnotifier import configureErtNotifier
+from ert_shared.feature_toggling import FeatureToggling
 from ert_shared.models import BaseRunModel
+from ert_shared.models.base_run_model import ErtRunError
+from res.enkf.enums import RealizationStateEnum
 from res.job_queue import JobStatusType
 from res.test import ErtTestContext
 from tests import ErtTest
@@ -52,3 +56,86 @@ class InMemoryBaseRunModelTest(unittest.TestCase):
         jobs, status = brm.realization_progress[0][0]
         self.assertEqual(len(jobs), 1)
         self.assertIn("name", jobs[0])
+
+    def test_run_failure_is_not_replaced_by_storage_failure(self):
+        brm = BaseRunModel(None)
+        brm.runSimulations = Mock(side_effect=ErtRunError("Simulation failed"))
+        brm._storage_worker = Mock()
+        brm._storage_worker.join.side_effect = ValueError("could not write")
+
+        brm.startSimulations({"active_realizations": [True]})
+
+        brm._storage_worker.join.assert_called_once_with()
+        self.assertTrue(brm.hasRunFailed())
+        self.assertEqual(brm.getFailMessage(), "Simulation failed")
+
+    def test_storage_failure_fails_successful_run(self):
+        brm = BaseRunModel(None)
+        brm.runSimulations = Mock()
+        brm._storage_worker = Mock()
+        brm._storage_worker.join.side_effect = ValueError("could not write")
+
+        brm.startSimulations({"active_realizations": [True]})
+
+        self.assertTrue(brm.hasRunFailed())
+        self.assertEqual(
+            brm.getFailMessage(), "Storage extraction failed: could not write"
+        )
+
+    def _streaming_run_context(self):
+        run_context = Mock()
+        run_context.is_active.return_value = True
+        run_context.get_sim_fs.return_value.getCaseName.return_value = "case"
+        run_context.get_sim_fs.return_value.getStateMap.return_value = [
+            RealizationStateEnum.STATE_HAS_DATA
+        ] * 2
+        run_args = []
+        for iens in range(2):
+            run_arg = Mock()
+            run_arg.iens = iens
+            run_arg.getQueueIndex.return_value = iens
+            run_args.append(run_arg)
+        run_context.__iter__ = Mock(side_effect=lambda: iter(run_args))
+        return run_context
+
+    @patch.object(FeatureToggling._conf["new-storage-streaming"], "is_enabled", True)
+    def test_realizations_are_streamed_after_the_run(self):
+        # libres is not thread safe, so nothing may be read from it for
+        # storage while the realizations are running
+        brm = BaseRunModel(None)
+        brm._storage_worker = Mock()
+        submitted_on = []
+        brm._storage_worker.submit_realization.side_effect = (
+            lambda case, iens: submitted_on.append((threading.current_thread(), iens))
+        )
+        job_queue = Mock()
+        job_queue.getJobStatus.side_effect = lambda queue_index: (
+            JobStatusType.JOB_QUEUE_SUCCESS
+            if queue_index == 1
+            else JobStatusType.JOB_QUEUE_FAILED
+        )
+        run_context = self._streaming_run_context()
+        caller = threading.current_thread()
+
+        def run(job_queue, run_context):
+            self.assertIs(threading.current_thread(), caller)
+            self.assertEqual(submitted_on, [])
+            return 1
+
+        self.assertEqual(brm._runAndStream(run, job_queue, run_context), 1)
+
+        self.assertEqual(submitted_on, [(threading.current_thread(), 1)])
+
+    @patch.object(FeatureToggling._conf["new-storage-streaming"], "is_enabled", True)
+    def test_detailed_progress_does_not_submit_to_storage(self):
+        brm = BaseRunModel(None)
+        brm._storage_worker = Mock()
+        brm._run_context = self._streaming_run_context()
+        brm._run_context.get_iter.return_value = 0
+        brm._job_queue = Mock()
+        brm._job_queue.getJobStatus.return_value = JobStatusType.JOB_QUEUE_SUCCESS
+
+        with patch("ert_shared.models.base_run_model.ForwardModelStatus"):
+            brm.updateDetailedProgress()
+
+        brm._storage_worker.submit_realization.assert_not_called()
@@ -174,3 +174,15 @@ class LibresFacadeTest(TestCase):
         facade = self.facade()
         data = facade.history_data('nokey')
         self.assertIsInstance(data, PandasObject)
+
+    @tmpdir(os.path.join(SOURCE_DIR, 'test-data/local/snake_oil'))
+    def test_case_write_time(self):
+        facade = self.facade()
+        write_time = facade.get_case_write_time('default_0')
+        self.assertIsNotNone(write_time)
+        self.assertIsNone(facade.get_case_write_time('no_such_case'))
+
+        case_path = os.path.join('storage', 'snake_oil', 'ensemble', 'default_0')
+        path = next(os.path.join(root, files[0]) for root, _, files in os.walk(case_path) if files)
+        os.utime(path, ns=(write_time + 10 ** 9, write_time + 10 ** 9))
+        self.assertEqual(facade.get_case_write_time('default_0'), write_time + 10 ** 9)
@@ -0,0 +1,66 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from ert_shared.libres_facade import LibresFacade
+from ert_shared.observation_catalog import ObservationCatalog
+
+
+def _obs_vector(key, impl_type_name, data_key, steps, indices=None):
+    obs_vector = MagicMock()
+    obs_vector.getObservationKey.return_value = key
+    obs_vector.getImplementationType.return_value.name = impl_type_name
+    obs_vector.getDataKey.return_value = data_key
+    obs_vector.getStepList.return_value = steps
+
+    node = MagicMock()
+    node.__len__.return_value = len(indices or [])
+    node.getIndex.side_effect = lambda nr: indices[nr]
+    obs_vector.getNode.return_value = node
+    return obs_vector
+
+
+@pytest.fixture()
+def observations():
+    return [
+        _obs_vector("FOPR", "SUMMARY_OBS", "FOPR", [1, 2, 3]),
+        _obs_vector("WPR_DIFF_1", "GEN_OBS", "SNAKE_OIL_WPR_DIFF", [199], [4, 6, 8]),
+        _obs_vector("RFT_1", "BLOCK_OBS", "PRESSURE", [5]),
+    ]
+
+
+def test_observation_catalog(observations):
+    catalog = ObservationCatalog(observations)
+
+    assert len(catalog) == 3
+    assert catalog.keys == ["FOPR", "WPR_DIFF_1", "RFT_1"]
+    assert catalog.key_at(1) == "WPR_DIFF_1"
+    assert "RFT_1" in catalog
+    assert "NOT_A_KEY" not in catalog
+
+    assert catalog.impl_type_name("FOPR") == "SUMMARY_OBS"
+    assert catalog.data_key("WPR_DIFF_1") == "SNAKE_OIL_WPR_DIFF"
+    assert catalog.step_list("FOPR") == [1, 2, 3]
+    assert np.array_equal(catalog.data_indices("WPR_DIFF_1", 199), [4, 6, 8])
+    assert catalog["RFT_1"].data_indices == {}
+
+    with pytest.raises(KeyError):
+        catalog.data_key("NOT_A_KEY")
+
+
+def test_facade_observation_catalog(observations):
+    enkf_main = MagicMock()
+    enkf_main.getObservations.return_value = observations
+    facade = LibresFacade(enkf_main)
+
+    assert facade.get_observation_keys() == ["FOPR", "WPR_DIFF_1", "RFT_1"]
+    assert facade.get_impl_type_name_for_obs_key("RFT_1") == "BLOCK_OBS"
+    assert facade.get_data_key_for_obs_key("FOPR") == "FOPR"
+    assert facade.get_step_list_for_obs_key("WPR_DIFF_1") == [199]
+    assert facade.get_observation_key(0) == "FOPR"
+    assert enkf_main.getObservations.call_count == 1
+
+    facade.invalidate_observation_catalog()
+    facade.get_observation_key(0)
+    assert enkf_main.getObservations.call_count == 2
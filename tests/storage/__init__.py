@@ -1,9 +1,51 @@
+from contextlib import contextmanager
+from pathlib import Path
+
+import alembic
 import pytest
+import sqlalchemy as sa
+from alembic import config
+
+import ert_shared.storage
 from ert_shared.storage import ERT_STORAGE
 from ert_shared.storage.rdb_api import RdbApi
 from ert_shared.storage.storage_api import StorageApi
 
 
+def migrate(url, revision, downgrade=False):
+    """Migrates the database at url to revision, and returns its engine."""
+    cfg = config.Config(Path(ert_shared.storage.__file__).parent / "alembic.ini")
+    cfg.set_section_option("alembic", "sqlalchemy.url", url)
+    engine = sa.create_engine(url)
+    with engine.connect() as connection:
+        cfg.attributes["connection"] = connection
+        if downgrade:
+            alembic.command.downgrade(config=cfg, revision=revision)
+        else:
+            alembic.command.upgrade(config=cfg, revision=revision)
+    return engine
+
+
+@contextmanager
+def capture_queries(session):
+    """
+    Collects the (statement, parameters) of each SELECT issued through the
+    engine of session while in the context.
+    """
+    engine = session.get_bind()
+    queries = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            queries.append((statement, parameters))
+
+    sa.event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield queries
+    finally:
+        sa.event.remove(engine, "before_cursor_execute", capture)
+
+
 @pytest.fixture(scope="session")
 def initialize_databases(tmp_path_factory):
     tmp_path = tmp_path_factory.mktemp("database")
@@ -176,4 +218,10 @@ def db_api(populated_database):
 @pytest.fixture
 def storage_api(db_api):
     api, db_lookup = db_api
-    yield StorageApi(session=ERT_STORAGE.Session()), db_lookup
+    session = ERT_STORAGE.Session()
+
+    try:
+        yield StorageApi(session=session), db_lookup
+    finally:
+        session.rollback()
+        session.close()
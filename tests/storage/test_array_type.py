@@ -0,0 +1,126 @@
+import datetime
+import importlib.util
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import ert_shared.storage
+from ert_shared.storage.array_type import (
+    HEADER_PREFIX_SIZE,
+    decode_array,
+    decode_header,
+    encode_array,
+    to_list,
+)
+from tests.storage import migrate
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        [1.0, 2.5, 3.0],
+        [1, 2, 3],
+        [True, False],
+        np.arange(6, dtype=np.float32).reshape(2, 3),
+        [],
+        4,
+    ],
+)
+def test_roundtrip(value):
+    array = decode_array(encode_array(value))
+
+    assert np.array_equal(array, np.asarray(value))
+    assert array.dtype == np.asarray(value).dtype
+
+
+def test_decode_is_zero_copy():
+    encoded = encode_array(np.arange(100, dtype=float))
+
+    array = decode_array(encoded)
+
+    base = array
+    while isinstance(base, np.ndarray):
+        base = base.base
+    assert base is encoded
+    assert not array.flags.writeable
+
+
+def test_strings_and_dates():
+    strings = decode_array(encode_array(["2000-01-01 20:01:01", "b"]))
+    dates = decode_array(encode_array([datetime.datetime(2000, 1, 1)]))
+
+    assert to_list(strings) == ["2000-01-01 20:01:01", "b"]
+    assert dates.dtype == np.dtype("datetime64[ns]")
+    assert to_list(dates) == [datetime.datetime(2000, 1, 1)]
+
+
+def test_decode_pickled():
+    assert to_list(decode_array(pickle.dumps([0.5, 0.6]))) == [0.5, 0.6]
+
+
+def test_decode_header():
+    encoded = encode_array(np.arange(100, dtype=np.float32))
+
+    dtype, shape, size = decode_header(encoded[:HEADER_PREFIX_SIZE])
+
+    assert dtype == np.float32
+    assert shape == (100,)
+    assert np.array_equal(
+        np.frombuffer(encoded[size:], dtype=dtype), np.arange(100, dtype=np.float32)
+    )
+    assert decode_header(encoded[: size - 1]) is None
+    assert decode_header(pickle.dumps([0.5, 0.6])) is None
+
+
+def test_migration(tmp_path):
+    url = "sqlite:///{}/migration.db".format(tmp_path)
+    engine = migrate(url, "22d6bbf0a926")
+    engine.execute(
+        "INSERT INTO observation (id, name, key_indices, data_indices, "
+        "\"values\", errors) VALUES (1, 'OBS', ?, ?, ?, NULL)",
+        pickle.dumps([0, 1]),
+        pickle.dumps([10, 11]),
+        pickle.dumps([1.5, 2.5]),
+    )
+
+    migrate(url, "head")
+    row = engine.execute("SELECT * FROM observation").fetchone()
+    assert to_list(decode_array(row["values"])) == [1.5, 2.5]
+    assert bytes(row["values"]) == encode_array([1.5, 2.5])
+    assert row["errors"] is None
+
+    migrate(url, "22d6bbf0a926", downgrade=True)
+    row = engine.execute("SELECT * FROM observation").fetchone()
+    assert pickle.loads(row["data_indices"]) == [10, 11]
+
+
+def test_migration_in_batches(tmp_path):
+    spec = importlib.util.spec_from_file_location(
+        "binary_array_columns",
+        Path(ert_shared.storage.__file__).parent
+        / "migrations"
+        / "versions"
+        / "69727b07f264_binary_array_columns.py",
+    )
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    count = 2 * migration.BATCH_SIZE + 1
+
+    url = "sqlite:///{}/migration.db".format(tmp_path)
+    engine = migrate(url, "22d6bbf0a926")
+    engine.execute(
+        "INSERT INTO observation (id, name, key_indices, data_indices, "
+        '"values", errors) VALUES (?, ?, NULL, NULL, ?, NULL)',
+        [
+            (nr + 1, "OBS_{}".format(nr), pickle.dumps([float(nr)]))
+            for nr in range(count)
+        ],
+    )
+
+    migrate(url, "head")
+    rows = engine.execute('SELECT id, "values" FROM observation ORDER BY id').fetchall()
+    assert len(rows) == count
+    for row in rows:
+        assert bytes(row["values"]) == encode_array([float(row["id"] - 1)])
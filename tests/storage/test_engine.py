@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+from sqlalchemy.engine.url import make_url
+
+from ert_shared.storage.engine import create_storage_engine
+
+
+def _pragma(engine, name):
+    return engine.execute("PRAGMA {}".format(name)).scalar()
+
+
+def test_default_profile(tmp_path):
+    engine = create_storage_engine("sqlite:///{}/storage.db".format(tmp_path))
+
+    assert _pragma(engine, "journal_mode") == "delete"
+
+
+def test_wal_profile(tmp_path):
+    engine = create_storage_engine(
+        "sqlite:///{}/storage.db".format(tmp_path), profile="wal"
+    )
+
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "busy_timeout") == 30000
+    assert engine.pool.size() == 5
+
+
+def test_profile_from_url(tmp_path):
+    engine = create_storage_engine(
+        "sqlite:///{}/storage.db?profile=default".format(tmp_path), profile="wal"
+    )
+
+    assert _pragma(engine, "journal_mode") == "delete"
+    assert "profile" not in engine.url.query
+
+
+def test_profile_does_not_change_url(tmp_path):
+    url = make_url("sqlite:///{}/storage.db?profile=default".format(tmp_path))
+
+    engine = create_storage_engine(url)
+
+    assert url.query == {"profile": "default"}
+    assert "profile" not in engine.url.query
+    assert _pragma(engine, "journal_mode") == "delete"
+
+
+def test_wal_mode_stays_in_the_file(tmp_path):
+    url = "sqlite:///{}/storage.db".format(tmp_path)
+    create_storage_engine(url + "?profile=wal").execute("CREATE TABLE x (y INT)")
+
+    assert _pragma(create_storage_engine(url), "journal_mode") == "wal"
+
+
+def test_unknown_profile(tmp_path):
+    with pytest.raises(ValueError, match="Unknown storage engine profile"):
+        create_storage_engine("sqlite:///{}/storage.db".format(tmp_path), "fast")
+
+
+def test_in_memory_database_ignores_profile():
+    engine = create_storage_engine("sqlite://", profile="wal")
+
+    assert _pragma(engine, "journal_mode") == "memory"
+
+
+@pytest.mark.parametrize("profile, blocked", [("wal", False), ("default", True)])
+def test_read_during_write(tmp_path, profile, blocked):
+    path = tmp_path / "storage.db"
+    engine = create_storage_engine("sqlite:///{}".format(path), profile=profile)
+    engine.execute("CREATE TABLE response (value FLOAT)")
+    engine.execute("INSERT INTO response VALUES (1.0)")
+
+    writer = engine.raw_connection()
+    try:
+        # An exclusive lock is what a writer holds while it commits
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute("INSERT INTO response VALUES (2.0)")
+
+        reader = sqlite3.connect(str(path), timeout=0.1)
+        try:
+            count = reader.execute("SELECT COUNT(*) FROM response").fetchone()[0]
+        except sqlite3.OperationalError as error:
+            assert blocked, error
+        else:
+            assert not blocked
+            assert count == 1
+        finally:
+            reader.close()
+        writer.commit()
+    finally:
+        writer.close()
@@ -1,9 +1,19 @@
+import numpy as np
 import pandas as pd
+import pytest
+from unittest.mock import Mock
+from ert_shared.feature_toggling import FeatureToggling
+from ert_shared.storage import extraction_api
 from ert_shared.storage.extraction_api import (
+    ExtractedRealization,
+    ExtractionWorker,
+    _calculate_misfits,
     _dump_observations,
     _dump_parameters,
     _dump_priors,
+    _dump_realization,
     _dump_response,
+    _dump_streamed_ensemble,
 )
 from tests.storage import api, initialize_databases
 
@@ -25,17 +35,17 @@ def test_dump_observations(api):
 
     poly_obs = api.get_observation("POLY_OBS")
     assert poly_obs.id is not None
-    assert poly_obs.key_indices == [0, 2, 4, 6, 8]
-    assert poly_obs.data_indices == [10, 12, 14, 16, 18]
-    assert poly_obs.values == [2.0, 7.1, 21.1, 31.8, 53.2]
-    assert poly_obs.errors == [0.1, 1.1, 4.1, 9.1, 16.1]
+    assert list(poly_obs.key_indices) == [0, 2, 4, 6, 8]
+    assert list(poly_obs.data_indices) == [10, 12, 14, 16, 18]
+    assert list(poly_obs.values) == [2.0, 7.1, 21.1, 31.8, 53.2]
+    assert list(poly_obs.errors) == [0.1, 1.1, 4.1, 9.1, 16.1]
 
     test_obs = api.get_observation("TEST_OBS")
     assert test_obs.id is not None
-    assert test_obs.key_indices == [3, 6, 9]
-    assert test_obs.data_indices == [3, 6, 9]
-    assert test_obs.values == [6, 12, 18]
-    assert test_obs.errors == [0.1, 0.2, 0.3]
+    assert list(test_obs.key_indices) == [3, 6, 9]
+    assert list(test_obs.data_indices) == [3, 6, 9]
+    assert list(test_obs.values) == [6, 12, 18]
+    assert list(test_obs.errors) == [0.1, 0.2, 0.3]
 
 
 coeff_a = pd.DataFrame.from_dict(
@@ -53,6 +63,27 @@ coeff_a = pd.DataFrame.from_dict(
 parameters = {"COEFFS:COEFF_A": coeff_a}
 
 
+def test_extract_observations_keeps_stored_data_indices(monkeypatch):
+    block = pd.DataFrame([[1.0, 2.0], [0.1, 0.2]], index=["OBS", "STD"], columns=[3, 7])
+    monkeypatch.setattr(
+        "ert_data.loader.data_loader_factory",
+        lambda observation_type: lambda *args: block.copy(),
+    )
+    monkeypatch.setattr(
+        "ert_data.loader.load_general_data_sparse",
+        Mock(side_effect=AssertionError("GEN_OBS was loaded sparse")),
+    )
+    facade = Mock()
+    facade.get_observation_keys.return_value = ["GEN_OBS_KEY"]
+    facade.get_impl_type_name_for_obs_key.return_value = "GEN_OBS"
+
+    observations = extraction_api._extract_observations(facade)
+
+    columns = observations["GEN_OBS_KEY"].columns
+    assert columns.get_level_values(0).to_list() == [3, 7]
+    assert columns.get_level_values(1).to_list() == [0, 1]
+
+
 def test_dump_parameters(api):
     ensemble_name = "default"
 
@@ -168,7 +199,7 @@ def test_dump_responses(api):
     )
 
     response_0 = api.get_response("POLY_RES", 0, ensemble_name)
-    response_values = response_0.values
+    response_values = list(response_0.values)
     assert response_values == [
         2.5995,
         5.203511,
@@ -204,3 +235,333 @@ def test_dump_priors(api):
         ]
     }
     _dump_priors(priors, api)
+
+
+def test_calculate_misfits():
+    observations = []
+    for name, chi2 in [("OBS_A", 1.0), ("OBS_B", 2.0)]:
+        obs_vector = Mock()
+        obs_vector.getObservationKey.return_value = name
+        obs_vector.getTotalChi2.side_effect = (
+            lambda fs, realization, chi2=chi2: chi2 * realization
+        )
+        observations.append(obs_vector)
+
+    misfits = _calculate_misfits("fs", observations, [0, 2])
+
+    assert misfits == {"OBS_A": {0: 0.0, 2: 2.0}, "OBS_B": {0: 0.0, 2: 4.0}}
+    observations[0].getTotalChi2.assert_called_with("fs", 2)
+
+
+def _obs_vector(name, data_key, values, std, response):
+    """
+    Returns a mock observation vector whose getTotalChi2 sums
+    ((simulated - observed) / std) ** 2 over its data points one realization
+    at a time, as libres does.
+    """
+    obs_vector = Mock()
+    obs_vector.getObservationKey.return_value = name
+    obs_vector.getDataKey.return_value = data_key
+    obs_vector.getTotalChi2.side_effect = lambda fs, realization: sum(
+        ((response.loc[index, realization] - value) / error) ** 2
+        for index, value, error in zip(values.index, values, std)
+    )
+    return obs_vector
+
+
+def test_calculate_misfits_vectorized():
+    dates = pd.to_datetime(["2010-01-10", "2010-01-20", "2010-01-30"])
+    responses = {
+        "WPR": pd.DataFrame(
+            [[1.0, 2.0, 5.0], [3.0, 0.5, 8.0], [4.0, 4.0, 0.0]],
+            index=[0, 1, 2],
+            columns=[0, 1, 2],
+        ),
+        "FOPR": pd.DataFrame(
+            [[10.0, 11.0, 12.0], [20.0, 21.0, 20.5], [30.0, 28.0, 33.0]],
+            index=pd.Index(dates, name="Date"),
+            columns=[0, 1, 2],
+        ),
+    }
+    observations = pd.DataFrame(
+        [[2.0, 7.0, 21.0, 29.0], [0.5, 2.0, 1.0, 2.0]],
+        index=["OBS", "STD"],
+        columns=pd.MultiIndex.from_tuples(
+            [
+                ("WPR_OBS", 0, 0),
+                ("WPR_OBS", 2, 1),
+                ("FOPR_OBS", dates[1], 1),
+                ("FOPR_OBS", dates[2], 2),
+            ]
+        ),
+    )
+    obs_vectors = [
+        _obs_vector(
+            key,
+            data_key,
+            observations[key].loc["OBS"].droplevel(1),
+            observations[key].loc["STD"],
+            responses[data_key],
+        )
+        for key, data_key in [("WPR_OBS", "WPR"), ("FOPR_OBS", "FOPR")]
+    ]
+
+    misfits = _calculate_misfits("fs", obs_vectors, [0, 1, 2], observations, responses)
+
+    for obs_vector in obs_vectors:
+        obs_vector.getTotalChi2.assert_not_called()
+        expected = [obs_vector.getTotalChi2.side_effect("fs", r) for r in range(3)]
+        key = obs_vector.getObservationKey()
+        assert list(misfits[key]) == [0, 1, 2]
+        assert np.allclose(list(misfits[key].values()), expected)
+
+
+def test_calculate_misfits_falls_back_to_libres():
+    responses = {"WPR": pd.DataFrame([[1.0], [3.0]], index=[0, 1], columns=[0])}
+    observations = pd.DataFrame(
+        [[2.0, 7.0], [0.5, 2.0]],
+        index=["OBS", "STD"],
+        columns=pd.MultiIndex.from_tuples([("WPR_OBS", 0, 0), ("BLOCK_OBS", 0, 0)]),
+    )
+    obs_vectors = []
+    for key, data_key in [("WPR_OBS", "WPR"), ("BLOCK_OBS", "PRESSURE")]:
+        obs_vector = Mock()
+        obs_vector.getObservationKey.return_value = key
+        obs_vector.getDataKey.return_value = data_key
+        obs_vector.getTotalChi2.return_value = 42.0
+        obs_vectors.append(obs_vector)
+
+    misfits = _calculate_misfits("fs", obs_vectors, [0, 1], observations, responses)
+
+    # Realization 1 has no response, and BLOCK_OBS is not a response at all
+    assert misfits == {"WPR_OBS": {0: 4.0, 1: 42.0}, "BLOCK_OBS": {0: 42.0, 1: 42.0}}
+    obs_vectors[0].getTotalChi2.assert_called_once_with("fs", 1)
+
+
+def _extracted(name, reference=None, size=0, priors=None):
+    return extraction_api.ExtractedEnsemble(
+        name, reference, size, priors or {}, None, {}, {}, None
+    )
+
+
+def test_dump_streamed_ensemble(api, monkeypatch):
+    session = api._session
+    monkeypatch.setattr(session, "commit", session.flush)
+    monkeypatch.setattr(session, "close", lambda: None)
+
+    extraction_api._dump_ensemble(session, _extracted("streamed", size=5))
+    for index in [3, 0, 4, 1, 2]:
+        _dump_realization(
+            session,
+            ExtractedRealization(
+                ensemble_name="streamed",
+                index=index,
+                parameters={"COEFFS:COEFF_A": coeff_a.loc[[index]]},
+                responses={"POLY_RES": poly_res[[index]]},
+            ),
+        )
+    priors = {
+        "COEFFS": [
+            {
+                "key": "COEFF_A",
+                "function": "UNIFORM",
+                "parameters": {"MIN": 0.0, "MAX": 1.0},
+            }
+        ]
+    }
+    _dump_streamed_ensemble(session, _extracted("streamed", size=5, priors=priors))
+
+    ensemble = api.get_ensemble("streamed")
+    assert [prior.key for prior in ensemble.priors] == ["COEFF_A"]
+    assert len(ensemble.parameter_definitions) == 1
+    assert ensemble.parameter_definitions[0].prior.key == "COEFF_A"
+    assert len(ensemble.response_definitions) == 1
+    for index in range(5):
+        parameter = api.get_parameter("COEFF_A", "COEFFS", index, "streamed")
+        assert parameter.value == coeff_a["COEFFS:COEFF_A"][index]
+        response = api.get_response("POLY_RES", index, "streamed")
+        assert list(response.values) == poly_res[index].to_list()
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(FeatureToggling._conf["new-storage"], "is_enabled", True)
+    monkeypatch.setattr(extraction_api.ERT_STORAGE, "Session", Mock, raising=False)
+    worker = ExtractionWorker()
+    worker.dumped = []
+
+    def dump_ensemble(rdb_session, extracted):
+        if extracted.name == "broken":
+            raise ValueError("could not write broken")
+        worker.dumped.append(extracted.name)
+        return extracted.name
+
+    monkeypatch.setattr(extraction_api, "_dump_ensemble", dump_ensemble)
+    return worker
+
+
+def _submit_cases(monkeypatch, worker, names):
+    cases = iter(names)
+    monkeypatch.setattr(
+        extraction_api,
+        "_extract_ensemble",
+        lambda reference: _extracted(next(cases), reference),
+    )
+    previous = None
+    for _ in names:
+        previous = worker.submit(
+            reference=None if previous is None else (previous, "STD_ENKF")
+        )
+        yield previous
+
+
+def test_extraction_worker_keeps_order(worker, monkeypatch):
+    names = ["iter-{}".format(nr) for nr in range(10)]
+
+    assert list(_submit_cases(monkeypatch, worker, names)) == names
+    worker.join()
+
+    assert worker.dumped == names
+
+
+def test_extraction_worker_reports_first_error(worker, monkeypatch):
+    list(_submit_cases(monkeypatch, worker, ["prior", "broken", "posterior"]))
+
+    with pytest.raises(ValueError, match="could not write broken"):
+        worker.join()
+    assert worker.dumped == ["prior"]
+
+    # The error is only reported once, and the worker can be reused
+    worker.join()
+    list(_submit_cases(monkeypatch, worker, ["next"]))
+    worker.join()
+    assert worker.dumped == ["prior", "next"]
+
+
+def test_extraction_worker_logs_skipped_jobs(worker, monkeypatch, caplog):
+    list(_submit_cases(monkeypatch, worker, ["broken", "first", "second"]))
+
+    with pytest.raises(ValueError):
+        worker.join()
+
+    skipped = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("Skipping")
+    ]
+    assert skipped == [
+        "Skipping extraction of 'first' after an earlier failure",
+        "Skipping extraction of 'second' after an earlier failure",
+    ]
+
+
+def test_extraction_worker_disabled(worker, monkeypatch):
+    monkeypatch.setattr(FeatureToggling._conf["new-storage"], "is_enabled", False)
+
+    assert list(_submit_cases(monkeypatch, worker, ["prior"])) == [None]
+    worker.join()
+    assert worker.dumped == []
+
+
+def test_extraction_worker_streams_realizations(worker, monkeypatch):
+    monkeypatch.setattr(
+        FeatureToggling._conf["new-storage-streaming"], "is_enabled", True
+    )
+    has_data = int(extraction_api.RealizationStateEnum.STATE_HAS_DATA)
+    facade = Mock()
+    facade.get_current_case_name.return_value = "ensemble"
+    facade.get_realization_states.return_value = [has_data, has_data, has_data + 1]
+    monkeypatch.setattr(extraction_api.ERT, "_enkf_facade", facade)
+    monkeypatch.setattr(extraction_api, "_extract_observations", lambda facade: None)
+    monkeypatch.setattr(extraction_api, "_extract_update_data", lambda facade: None)
+    monkeypatch.setattr(
+        extraction_api,
+        "_extract_realization",
+        lambda ensemble_name, index: ExtractedRealization(ensemble_name, index, {}, {}),
+    )
+    monkeypatch.setattr(
+        extraction_api,
+        "_dump_realization",
+        lambda rdb_session, extracted: worker.dumped.append(extracted.index),
+    )
+    monkeypatch.setattr(
+        extraction_api,
+        "_dump_streamed_ensemble",
+        lambda rdb_session, extracted: worker.dumped.append(extracted.reference),
+    )
+
+    worker.submit_realization("ensemble", 1)
+    worker.submit_realization("ensemble", 1)
+    assert worker.submit(reference=("prior", "STD_ENKF")) == "ensemble"
+    worker.submit_realization("ensemble", 2)
+    worker.join()
+
+    assert worker.dumped == ["ensemble", 1, 0, ("prior", "STD_ENKF")]
+
+
+def test_extraction_worker_reads_failed_realizations_once(worker, monkeypatch):
+    monkeypatch.setattr(
+        FeatureToggling._conf["new-storage-streaming"], "is_enabled", True
+    )
+    has_data = int(extraction_api.RealizationStateEnum.STATE_HAS_DATA)
+    facade = Mock()
+    facade.get_current_case_name.return_value = "ensemble"
+    facade.get_realization_states.return_value = [has_data, has_data]
+    monkeypatch.setattr(extraction_api.ERT, "_enkf_facade", facade)
+    monkeypatch.setattr(extraction_api, "_extract_observations", lambda facade: None)
+    monkeypatch.setattr(extraction_api, "_extract_update_data", lambda facade: None)
+    reads = []
+
+    def extract_realization(ensemble_name, index):
+        reads.append(index)
+        if len(reads) == 1:
+            raise ValueError("could not read {}".format(index))
+        return ExtractedRealization(ensemble_name, index, {}, {})
+
+    monkeypatch.setattr(extraction_api, "_extract_realization", extract_realization)
+    monkeypatch.setattr(
+        extraction_api,
+        "_dump_realization",
+        lambda rdb_session, extracted: worker.dumped.append(extracted.index),
+    )
+    monkeypatch.setattr(
+        extraction_api,
+        "_dump_streamed_ensemble",
+        lambda rdb_session, extracted: worker.dumped.append(extracted.reference),
+    )
+
+    with pytest.raises(ValueError, match="could not read 1"):
+        worker.submit_realization("ensemble", 1)
+    worker.submit_realization("ensemble", 1)
+    assert reads == [1]
+
+    assert worker.submit() == "ensemble"
+    worker.join()
+
+    assert reads == [1, 0, 1]
+    assert worker.dumped == ["ensemble", 0, 1, None]
+
+
+def test_extraction_worker_starts_failed_ensembles_once(worker, monkeypatch):
+    monkeypatch.setattr(
+        FeatureToggling._conf["new-storage-streaming"], "is_enabled", True
+    )
+    facade = Mock()
+    facade.get_current_case_name.return_value = "ensemble"
+    monkeypatch.setattr(extraction_api.ERT, "_enkf_facade", facade)
+    extract_observations = Mock(side_effect=ValueError("could not read"))
+    monkeypatch.setattr(extraction_api, "_extract_observations", extract_observations)
+    extract_realization = Mock()
+    monkeypatch.setattr(extraction_api, "_extract_realization", extract_realization)
+
+    with pytest.raises(ValueError, match="could not read"):
+        worker.submit_realization("ensemble", 0)
+    worker.submit_realization("ensemble", 1)
+
+    extract_observations.assert_called_once()
+    extract_realization.assert_not_called()
+
+    # The whole ensemble is read when it is submitted
+    list(_submit_cases(monkeypatch, worker, ["ensemble"]))
+    worker.join()
+    assert worker.dumped == ["ensemble"]
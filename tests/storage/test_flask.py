@@ -1,8 +1,12 @@
+import gzip
+import io
 import json
+import zlib
 
+import numpy as np
 import pytest
 from ert_shared.storage import ERT_STORAGE
-from ert_shared.storage.http_server import FlaskWrapper
+from ert_shared.storage.http_server import Application, FlaskWrapper
 from tests.storage import api, db_api, populated_database, initialize_databases
 
 
@@ -129,6 +133,187 @@ def test_get_batched_response(test_client):
     assert expected == csv
 
 
+def test_get_sliced_response(test_client):
+    resp_schema = _fetch_response(
+        test_client, ensemble_name="ensemble_name", response_name="response_two"
+    )
+    data_url = resp_schema["alldata_url"]
+
+    data_resp = test_client.get(data_url + "?realizations=1&start=1&stop=5&step=2")
+
+    assert data_resp.data == b"12.2,11.2"
+    assert data_resp.headers["X-Realizations"] == "1"
+
+    data_resp = test_client.get(data_url + "?realizations=&start=-2")
+
+    assert data_resp.data == b""
+    assert data_resp.headers["X-Realizations"] == ""
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "realizations=one",
+        "realizations=-1",
+        "realizations=9223372036854775808",
+        "realizations=99999999999999999999",
+        "start=first",
+        "step=0",
+        "stop=1.5",
+    ],
+)
+def test_get_sliced_response_invalid(test_client, query):
+    data_url = "/ensembles/1/responses/response_two/data?" + query
+    data_resp = test_client.get(data_url)
+    assert data_resp.status_code == 400
+
+
+def test_get_npy_response(test_client):
+    resp_schema = _fetch_response(
+        test_client, ensemble_name="ensemble_name", response_name="response_two"
+    )
+    data_url = resp_schema["alldata_url"]
+
+    data_resp = test_client.get(
+        data_url + "?start=1", headers={"Accept": "application/x-npy"}
+    )
+
+    assert data_resp.mimetype == "application/x-npy"
+    assert data_resp.headers["X-Realizations"] == "0,1"
+    data = np.load(io.BytesIO(data_resp.data), allow_pickle=False)
+    np.testing.assert_array_equal(data, [[12.2, 11.1, 11.2, 9.9, 9.3]] * 2)
+
+
+@pytest.mark.parametrize(
+    "accept, mimetype",
+    [
+        (None, "text/csv"),
+        ("*/*", "text/csv"),
+        ("text/csv", "text/csv"),
+        ("application/x-npy, text/csv;q=0.5", "application/x-npy"),
+    ],
+)
+def test_data_content_negotiation(test_client, accept, mimetype):
+    headers = {} if accept is None else {"Accept": accept}
+    data_resp = test_client.get(
+        "/ensembles/1/responses/response_one/data", headers=headers
+    )
+    assert data_resp.mimetype == mimetype
+    assert "Accept" in data_resp.vary
+
+
+def test_etag(test_client):
+    url = "/ensembles/1/responses/response_one"
+    resp = test_client.get(url)
+    etag = resp.headers["ETag"]
+
+    assert test_client.get(url).headers["ETag"] == etag
+    assert test_client.get(url + "/data").headers["ETag"] != etag
+    assert test_client.get("/ensembles/1").headers["ETag"] != etag
+
+    resp = test_client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert {"Accept", "Accept-Encoding"} <= set(resp.vary)
+
+    resp = test_client.get(url, headers={"If-None-Match": '"stale"'})
+    assert resp.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["/ensembles/1/responses/response_one", "/ensembles/1/responses/response_one/data"],
+)
+def test_not_modified_varies_as_modified(test_client, url):
+    headers = {"Accept": "application/x-npy", "Accept-Encoding": "gzip"}
+    resp = test_client.get(url, headers=headers)
+
+    not_modified = test_client.get(
+        url, headers=dict(headers, **{"If-None-Match": resp.headers["ETag"]})
+    )
+
+    assert not_modified.status_code == 304
+    assert set(not_modified.vary) == set(resp.vary)
+
+
+def test_etag_changes_with_storage(test_client):
+    url = "/observation/observation_one"
+    etag = test_client.get(url).headers["ETag"]
+
+    test_client.post(
+        url + "/attributes",
+        data="""{"attributes": {"revised": "yes"}}""",
+        content_type="application/json",
+    )
+
+    resp = test_client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert json.loads(resp.data)["attributes"]["revised"] == "yes"
+
+
+@pytest.mark.parametrize(
+    "encoding, decompress",
+    [("gzip", gzip.decompress), ("deflate", zlib.decompress)],
+)
+@pytest.mark.parametrize(
+    "url",
+    ["/ensembles/1/responses/response_one", "/ensembles/1/responses/response_one/data"],
+)
+def test_compression(test_client, monkeypatch, url, encoding, decompress):
+    monkeypatch.setattr("ert_shared.storage.http_server.MIN_COMPRESSED_SIZE", 0)
+    plain = test_client.get(url)
+    assert "Content-Encoding" not in plain.headers
+
+    resp = test_client.get(url, headers={"Accept-Encoding": encoding})
+
+    assert resp.headers["Content-Encoding"] == encoding
+    assert "Accept-Encoding" in resp.vary
+    assert decompress(resp.data) == plain.data
+
+
+def test_small_responses_are_not_compressed(test_client):
+    resp = test_client.get(
+        "/observation/observation_one/attributes", headers={"Accept-Encoding": "gzip"}
+    )
+    assert "Content-Encoding" not in resp.headers
+
+
+def test_resource_cache(test_client):
+    url = "/ensembles/1/responses/response_one"
+    before = json.loads(test_client.get("/diagnostics/cache").data)
+
+    first = test_client.get(url)
+    second = test_client.get(url)
+
+    after = json.loads(test_client.get("/diagnostics/cache").data)
+    assert after["hits"] == before["hits"] + 1
+    assert after["entries"] >= 1
+    assert after["size_bytes"] <= after["max_bytes"]
+    assert second.data == first.data
+    assert second.mimetype == "application/json"
+
+
+def test_resource_cache_invalidation(test_client):
+    url = "/ensembles/1/responses/response_one"
+    test_client.get(url)
+    test_client.post(
+        "/observation/observation_one/attributes",
+        data="""{"attributes": {"cached": "no"}}""",
+        content_type="application/json",
+    )
+    before = json.loads(test_client.get("/diagnostics/cache").data)
+
+    response = json.loads(test_client.get(url).data)
+
+    after = json.loads(test_client.get("/diagnostics/cache").data)
+    assert after["invalidations"] == before["invalidations"] + 1
+    # Both the response and the univariate misfits it is built from
+    assert after["misses"] == before["misses"] + 2
+    attributes = response["observations"][0]["attributes"]
+    assert attributes["cached"] == "no"
+
+
 def test_get_batched_response_missing(test_client):
     data_url = "/ensembles/1/responses/none/data"
     data_resp = test_client.get(data_url)
@@ -151,12 +336,162 @@ def test_get_batched_parameter(test_client):
     assert expected == csv
 
 
+def test_get_sliced_parameter(test_client):
+    param_schema = _fetch_parameter(
+        test_client,
+        ensemble_name="ensemble_name",
+        parameter_name="A",
+        parameter_group="G",
+    )
+    data_url = param_schema["alldata_url"]
+
+    data_resp = test_client.get(data_url + "?realizations=0")
+
+    assert data_resp.data == b"1"
+    assert data_resp.headers["X-Realizations"] == "0"
+
+
+def test_get_npy_parameter(test_client):
+    param_schema = _fetch_parameter(
+        test_client,
+        ensemble_name="ensemble_name",
+        parameter_name="A",
+        parameter_group="G",
+    )
+    data_url = param_schema["alldata_url"]
+
+    data_resp = test_client.get(data_url, headers={"Accept": "application/x-npy"})
+
+    data = np.load(io.BytesIO(data_resp.data), allow_pickle=False)
+    np.testing.assert_array_equal(data, [[1], [1]])
+
+
 def test_get_batched_parameter_missing(test_client):
     data_url = "/ensembles/1/parameters/42/data"
     data_resp = test_client.get(data_url)
     assert data_resp.status_code == 404
 
 
+def test_ensemble_keys(test_client):
+    keys = json.loads(test_client.get("/ensembles/1/keys").data)
+
+    responses = {resp["name"]: resp for resp in keys["responses"]}
+    response = _fetch_response(
+        test_client, ensemble_name="ensemble_name", response_name="response_one"
+    )
+    assert responses["response_one"]["observations"] == response["observations"]
+    assert responses["response_one"]["ref_url"].endswith(
+        "/ensembles/1/responses/response_one"
+    )
+    assert {param["group"] + ":" + param["key"] for param in keys["parameters"]} == {
+        "G:A",
+        "G:B",
+        "group:key1",
+    }
+
+    assert test_client.get("/ensembles/42/keys").status_code == 404
+
+
+def test_response_batch(test_client):
+    resp = test_client.post(
+        "/ensembles/1/responses:batch",
+        json={"names": ["response_two", "none", "response_one"]},
+    )
+    batch = json.loads(resp.data)
+
+    assert [response["name"] for response in batch["responses"]] == [
+        "response_one",
+        "response_two",
+    ]
+    response_two = batch["responses"][1]
+    assert response_two["realizations"] == [0, 1]
+    assert response_two["data"] == [[12.1, 12.2, 11.1, 11.2, 9.9, 9.3]] * 2
+
+    resp = test_client.post(
+        "/ensembles/1/responses:batch?realizations=1&start=1&stop=5&step=2",
+        json={"names": ["response_two"]},
+    )
+    response_two = json.loads(resp.data)["responses"][0]
+    assert response_two["realizations"] == [1]
+    assert response_two["data"] == [[12.2, 11.2]]
+    assert len(response_two["axis"]["data"]) == 2
+
+
+def test_response_batch_npz(test_client):
+    resp = test_client.post(
+        "/ensembles/1/responses:batch?realizations=1&start=1&stop=5&step=2",
+        json={"names": ["response_one", "response_two"]},
+        headers={"Accept": "application/x-npz, application/json;q=0.5"},
+    )
+    batch = json.loads(
+        test_client.post(
+            "/ensembles/1/responses:batch?realizations=1&start=1&stop=5&step=2",
+            json={"names": ["response_one", "response_two"]},
+        ).data
+    )
+
+    assert resp.mimetype == "application/x-npz"
+    assert "Accept" in resp.vary
+    with np.load(io.BytesIO(resp.data), allow_pickle=False) as npz:
+        assert npz["names"].tolist() == ["response_one", "response_two"]
+        for position, response in enumerate(batch["responses"]):
+            assert npz["realizations_{}".format(position)].tolist() == [1]
+            np.testing.assert_array_equal(
+                npz["data_{}".format(position)], response["data"]
+            )
+            np.testing.assert_array_equal(
+                npz["axis_{}".format(position)], response["axis"]["data"]
+            )
+
+
+def test_parameter_batch_npz(test_client):
+    resp = test_client.post(
+        "/ensembles/1/parameters:batch",
+        json={"names": ["G:A", "G:B"]},
+        headers={"Accept": "application/x-npz"},
+    )
+
+    assert resp.mimetype == "application/x-npz"
+    with np.load(io.BytesIO(resp.data), allow_pickle=False) as npz:
+        assert npz["names"].tolist() == ["G:A", "G:B"]
+        assert npz["realizations_0"].tolist() == [0, 1]
+        assert "axis_0" not in npz
+
+
+def test_parameter_batch(test_client):
+    resp = test_client.post(
+        "/ensembles/1/parameters:batch?realizations=0",
+        json={"names": ["G:A", "G:none", "group:key1"]},
+    )
+    batch = json.loads(resp.data)
+
+    parameters = {
+        param["group"] + ":" + param["key"]: param for param in batch["parameters"]
+    }
+    assert set(parameters) == {"G:A", "group:key1"}
+    assert parameters["G:A"]["realizations"] == [0]
+    assert parameters["G:A"]["data"] == [1]
+    ensemble = _fetch_ensemble(test_client, "ensemble_name")
+    assert parameters["G:A"]["ref_url"] in {
+        param["ref_url"] for param in ensemble["parameters"] if param["key"] == "A"
+    }
+
+
+@pytest.mark.parametrize("body", [None, ["response_one"], {}, {"names": [1]}])
+@pytest.mark.parametrize("route", ["responses:batch", "parameters:batch"])
+def test_batch_invalid(test_client, route, body):
+    resp = test_client.post("/ensembles/1/" + route, json=body)
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize("route", ["responses:batch", "parameters:batch"])
+def test_batch_invalid_realizations(test_client, route):
+    resp = test_client.post(
+        "/ensembles/1/" + route + "?realizations=-1", json={"names": ["A"]}
+    )
+    assert resp.status_code == 400
+
+
 def _fetch_ensemble(test_client, ensemble_name):
     ensembles_resp = test_client.get("/ensembles")
     ensembles_schema = json.loads(ensembles_resp.data)
@@ -191,3 +526,14 @@ def _fetch_parameter(test_client, ensemble_name, parameter_name, parameter_group
     data = test_client.get(response_url).data
     response_schema = json.loads(data)
     return response_schema
+
+
+def test_worker_options(db_api):
+    wrapper = FlaskWrapper(secure=False, url=ERT_STORAGE.SQLALCHEMY_URL)
+    application = Application(
+        wrapper, None, workers=3, threads=2, worker_class="gthread"
+    )
+
+    assert application.cfg.workers == 3
+    assert application.cfg.threads == 2
+    assert application.cfg.worker_class_str == "gthread"
@@ -0,0 +1,165 @@
+import re
+
+import pytest
+
+from ert_shared.storage.models import Entity
+from tests.storage import (
+    capture_queries,
+    db_api,
+    initialize_databases,
+    migrate,
+    populated_database,
+)
+
+# The tables that grow with the number of ensembles
+LARGE_TABLES = {
+    "ensemble",
+    "realization",
+    "response_definition",
+    "response",
+    "parameter_definition",
+    "parameter",
+    "observation_response_definition_link",
+    "misfit",
+}
+
+
+def _query_plans(api, call):
+    """
+    Runs call and returns the query plan of each SELECT statement it issued,
+    as a list of the details reported by EXPLAIN QUERY PLAN.
+    """
+    with capture_queries(api._session) as statements:
+        call()
+
+    engine = api._session.get_bind()
+    connection = engine.raw_connection()
+    try:
+        return [
+            [
+                row[-1]
+                for row in connection.execute(
+                    "EXPLAIN QUERY PLAN " + statement, parameters
+                )
+            ]
+            for statement, parameters in statements
+        ]
+    finally:
+        connection.close()
+
+
+def _full_scans(plan):
+    """
+    Returns the details of plan that scan a whole large table. SQLite before
+    3.36 reports such a scan as SCAN TABLE x, later versions as SCAN x.
+    """
+    scans = []
+    for detail in plan:
+        match = re.match(r"SCAN (?:TABLE )?(\w+)", detail)
+        if match and match.group(1) in LARGE_TABLES and "INDEX" not in detail:
+            scans.append(detail)
+    return scans
+
+
+HOT_QUERIES = {
+    "get_ensemble": lambda api, lookup: api.get_ensemble("ensemble_name"),
+    "get_realizations_by_ensemble_id": lambda api, lookup: (
+        list(api.get_realizations_by_ensemble_id(lookup["ensemble"]))
+    ),
+    "get_response_definitions_by_ensemble_id": lambda api, lookup: (
+        list(api.get_response_definitions_by_ensemble_id(lookup["ensemble"]))
+    ),
+    "get_parameter_definitions_by_ensemble_id": lambda api, lookup: (
+        list(api.get_parameter_definitions_by_ensemble_id(lookup["ensemble"]))
+    ),
+    "get_response_bundle": lambda api, lookup: [
+        response.values
+        for response in api.get_response_bundle(
+            "response_one", lookup["ensemble"]
+        ).responses
+    ],
+    "get_parameter_bundle": lambda api, lookup: [
+        parameter.value
+        for parameter in api.get_parameter_bundle(
+            lookup["parameter_def_A_G"], lookup["ensemble"]
+        ).parameters
+    ],
+    "get_response_ids": lambda api, lookup: api._get_response_ids(lookup["ensemble"]),
+    "get_response_values_by_definition_ids": lambda api, lookup: (
+        api.get_response_values_by_definition_ids(
+            [
+                definition.id
+                for definition in api.get_response_definitions_by_names(
+                    ["response_one", "response_two"], lookup["ensemble"]
+                )
+            ]
+        )
+    ),
+    "get_parameter_values_by_definition_ids": lambda api, lookup: (
+        api.get_parameter_values_by_definition_ids([lookup["parameter_def_A_G"]])
+    ),
+}
+
+
+@pytest.mark.parametrize("query", sorted(HOT_QUERIES))
+def test_hot_queries_use_indexes(db_api, query):
+    api, db_lookup = db_api
+
+    plans = _query_plans(api, lambda: HOT_QUERIES[query](api, db_lookup))
+
+    assert plans
+    for plan in plans:
+        assert _full_scans(plan) == [], plan
+
+
+def test_full_scan_is_detected(db_api):
+    api, _ = db_api
+
+    plans = _query_plans(
+        api, lambda: api._session.execute("SELECT * FROM response").fetchall()
+    )
+
+    assert [len(_full_scans(plan)) for plan in plans] == [1]
+
+
+@pytest.mark.parametrize(
+    "detail, is_full_scan",
+    [
+        ("SCAN TABLE response", True),
+        ("SCAN response", True),
+        ("SCAN TABLE response USING INDEX ix_response_realization_id", False),
+        ("SCAN response USING COVERING INDEX ix_response_realization_id", False),
+        ("SEARCH TABLE response USING INDEX ix_response_realization_id (id=?)", False),
+        ("SCAN TABLE alembic_version", False),
+        ("SCAN CONSTANT ROW", False),
+    ],
+)
+def test_full_scans_parses_plan_details(detail, is_full_scan):
+    assert bool(_full_scans([detail])) == is_full_scan
+
+
+def test_migration_creates_model_indexes(tmp_path):
+    url = "sqlite:///{}/migration.db".format(tmp_path)
+    engine = migrate(url, "head")
+
+    model_indexes = {
+        index.name
+        for table in Entity.metadata.tables.values()
+        for index in table.indexes
+    }
+    database_indexes = {
+        name
+        for (name,) in engine.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'"
+        )
+    }
+    assert model_indexes == database_indexes
+
+    migrate(url, "69727b07f264", downgrade=True)
+    assert (
+        engine.execute(
+            "SELECT COUNT(*) FROM sqlite_master "
+            "WHERE type = 'index' AND name LIKE 'ix_%'"
+        ).scalar()
+        == 0
+    )
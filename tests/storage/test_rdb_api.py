@@ -1,7 +1,18 @@
+import pickle
+import subprocess
+import sys
 import time
+import numpy as np
 import pytest
 import sqlalchemy.exc
-from tests.storage import initialize_databases, api, populated_database, db_api
+from ert_shared.storage.models import Response
+from tests.storage import (
+    capture_queries,
+    initialize_databases,
+    api,
+    populated_database,
+    db_api,
+)
 
 
 def test_add_observation(api):
@@ -132,6 +143,32 @@ def test_add_reference_ensemble(api):
     assert result_ensemble.parent.ensemble_reference.name == reference_ensemble_name
 
 
+def test_add_update(api):
+    api.add_ensemble(name="test_ensemble")
+    result_ensemble = api.add_ensemble(name="result_ensemble")
+    assert result_ensemble.parent is None
+
+    api.add_update("result_ensemble", reference=("test_ensemble", "es_mda"))
+    assert result_ensemble.parent.ensemble_reference.name == "test_ensemble"
+    assert result_ensemble.parent.algorithm == "es_mda"
+
+
+def test_set_priors(api):
+    prior = api.add_prior("group", "key", "function", ["MIN", "MAX"], [0.0, 1.0])
+    ensemble = api.add_ensemble(name="test_ensemble")
+    api.add_parameter_definition("key", "group", "test_ensemble")
+    api.add_parameter_definition("other", "group", "test_ensemble")
+
+    api.set_priors("test_ensemble", priors=[prior])
+
+    assert ensemble.priors == [prior]
+    priors = {
+        definition.name: definition.prior
+        for definition in ensemble.parameter_definitions
+    }
+    assert priors == {"key": prior, "other": None}
+
+
 def test_add_realization(api):
     ensemble = api.add_ensemble(name="test_ensemble")
 
@@ -191,6 +228,52 @@ def test_add_parameter(api):
     assert parameter.value == value
 
 
+def test_bulk_add(api):
+    ensemble = api.add_ensemble(name="test")
+    api.add_realizations(range(3), ensemble.name)
+    api.add_parameter_definition(
+        name="test_param", group="test_group", ensemble_name=ensemble.name
+    )
+    api.add_response_definition(
+        name="test_response", indices=[0, 1], ensemble_name=ensemble.name
+    )
+
+    api.add_parameters(
+        name="test_param",
+        group="test_group",
+        values={0: 0.5, 1: 1.5, 2: 2.5},
+        ensemble_name=ensemble.name,
+    )
+    api.add_responses(
+        name="test_response",
+        values={0: [0.0, 1.0], 1: [1.0, 2.0], 2: [2.0, 3.0]},
+        ensemble_name=ensemble.name,
+    )
+
+    for index in range(3):
+        realization = api.get_realization(index=index, ensemble_name=ensemble.name)
+        assert realization.ensemble_id == ensemble.id
+
+        parameter = api.get_parameter(
+            name="test_param",
+            group="test_group",
+            realization_index=index,
+            ensemble_name=ensemble.name,
+        )
+        assert parameter.value == index + 0.5
+
+        response = api.get_response("test_response", index, ensemble.name)
+        assert list(response.values) == [index, index + 1.0]
+
+    with pytest.raises(KeyError):
+        api.add_parameters(
+            name="test_param",
+            group="test_group",
+            values={3: 3.5},
+            ensemble_name=ensemble.name,
+        )
+
+
 def test_add_observation_response_definition_link(api):
     observation = api.add_observation(
         name="test",
@@ -257,6 +340,38 @@ def test_add_misfits(api):
     assert misfit.observation_response_definition_link.observation_id == observation.id
 
 
+def test_bulk_add_misfits(api):
+    observation = api.add_observation(
+        name="test", key_indices=None, data_indices=None, values=None, errors=None
+    )
+    ensemble = api.add_ensemble(name="test")
+    api.add_realizations(range(2), ensemble.name)
+    response_definition = api.add_response_definition(
+        name="test", indices=None, ensemble_name=ensemble.name
+    )
+    api.add_responses(
+        name="test", values={0: [0.0], 1: [1.0]}, ensemble_name=ensemble.name
+    )
+    link = api._add_observation_response_definition_link(
+        observation_id=observation.id,
+        response_definition_id=response_definition.id,
+        active=None,
+        update_id=None,
+    )
+
+    response_ids = api._get_response_ids(ensemble_id=ensemble.id)
+    assert set(response_ids) == {("test", 0), ("test", 1)}
+
+    api._add_misfits(
+        [(0.5 + index, link.id, response_ids[("test", index)]) for index in range(2)]
+    )
+
+    for index in range(2):
+        response = api.get_response("test", index, ensemble.name)
+        assert response.id == response_ids[("test", index)]
+        assert [misfit.value for misfit in response.misfits] == [0.5 + index]
+
+
 def test_get_parameter_bundle(db_api):
     api, db_lookup = db_api
     bundle = api.get_parameter_bundle(
@@ -279,7 +394,7 @@ def test_get_response_data(db_api):
     responses = api.get_response_data(
         name="response_one", ensemble_name="ensemble_name"
     )
-    vals = [resp.values for resp in responses]
+    vals = [list(resp.values) for resp in responses]
     assert vals is not None
     assert vals == [[11.1, 11.2, 9.9, 9.3], [11.1, 11.2, 9.9, 9.3]]
 
@@ -293,6 +408,144 @@ def test_get_response_bundle(db_api):
     assert len(bundle.responses) == 2
 
 
+def test_backrefs_exist_before_the_first_query():
+    # The loader options of get_response_bundle use backrefs, which must be
+    # there in a process that has not queried anything yet
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from ert_shared.storage.models import Observation; "
+            "Observation.observation_attributes",
+        ],
+        check=True,
+    )
+
+
+def test_get_response_values(api):
+    ensemble = api.add_ensemble(name="sliced")
+    api.add_realizations(range(3), ensemble.name)
+    definition = api.add_response_definition("response", [0, 1], ensemble.name)
+    api.add_responses(
+        "response", {index: [index, index + 0.5] for index in range(3)}, ensemble.name
+    )
+
+    assert api.get_response_definition_id("response", ensemble.id) == definition.id
+    assert api.get_response_definition_id("missing", ensemble.id) is None
+
+    rows = api.get_response_values(definition.id)
+    assert [(index, list(values)) for index, values in rows] == [
+        (0, [0, 0.5]),
+        (1, [1, 1.5]),
+        (2, [2, 2.5]),
+    ]
+
+    rows = api.get_response_values(definition.id, realizations=[2, 0, 7])
+    assert [index for index, _ in rows] == [0, 2]
+
+
+@pytest.mark.parametrize(
+    "index",
+    [
+        slice(1, 4),
+        slice(None, None, 2),
+        slice(-3, None),
+        slice(None, None, -2),
+        slice(4, 0, -3),
+        slice(3, 3),
+        slice(10, None),
+    ],
+)
+def test_get_response_values_sliced(api, index):
+    ensemble = api.add_ensemble(name="sliced")
+    api.add_realizations(range(3), ensemble.name)
+    definition = api.add_response_definition("response", range(5), ensemble.name)
+    # Of different lengths, and one pickled as by PickleType before
+    values = {0: np.arange(5.0), 1: np.arange(3.0) * 2, 2: np.arange(5.0) * 3}
+    api.add_responses("response", values, ensemble.name)
+    response_id = (
+        api._session.query(Response.id)
+        .filter(Response.realization.has(index=2))
+        .filter(Response.response_definition_id == definition.id)
+        .scalar()
+    )
+    api._session.execute(
+        'UPDATE response SET "values" = :values WHERE id = :id',
+        {"values": pickle.dumps(values[2].tolist()), "id": response_id},
+    )
+
+    with capture_queries(api._session) as statements:
+        rows = api.get_response_values(definition.id, index=index)
+
+    assert [(realization, list(data)) for realization, data in rows] == [
+        (realization, list(values[realization][index])) for realization in range(3)
+    ]
+    selected_values = [
+        statement for statement, _ in statements if 'response."values" AS' in statement
+    ]
+    # Only the pickled response is read in full
+    assert len(selected_values) == 1
+
+
+def test_get_values_in_chunks(api, monkeypatch):
+    ensemble = api.add_ensemble(name="chunked")
+    api.add_realizations(range(3), ensemble.name)
+    response_definition = api.add_response_definition("response", [0, 1], ensemble.name)
+    api.add_responses(
+        "response", {index: [index, index + 0.5] for index in range(3)}, ensemble.name
+    )
+    parameter_definition = api.add_parameter_definition("A", "G", ensemble.name)
+    api.add_parameters("A", "G", {index: index for index in range(3)}, ensemble.name)
+    monkeypatch.setattr("ert_shared.storage.rdb_api._MAX_IN_VALUES", 1)
+
+    rows = api.get_response_values(
+        response_definition.id, realizations=[2, 0, 1], index=slice(1, None)
+    )
+    assert [(index, list(values)) for index, values in rows] == [
+        (0, [0.5]),
+        (1, [1.5]),
+        (2, [2.5]),
+    ]
+    assert api.get_parameter_values(
+        parameter_definition.id, realizations=[2, 0, 1]
+    ) == [(0, 0), (1, 1), (2, 2)]
+    assert api.get_parameter_values_by_definition_ids(
+        [parameter_definition.id], realizations=[2, 1]
+    ) == [(parameter_definition.id, 1, 1), (parameter_definition.id, 2, 2)]
+
+
+def test_get_parameter_values(api):
+    ensemble = api.add_ensemble(name="sliced")
+    api.add_realizations(range(3), ensemble.name)
+    definition = api.add_parameter_definition("A", "G", ensemble.name)
+    api.add_parameters(
+        "A", "G", {index: index * 2 for index in range(3)}, ensemble.name
+    )
+
+    assert api.get_parameter_definition_id(definition.id, ensemble.id) == definition.id
+    assert api.get_parameter_definition_id(definition.id, ensemble.id + 1) is None
+    assert api.get_parameter_values(definition.id) == [(0, 0), (1, 2), (2, 4)]
+    assert api.get_parameter_values(definition.id, realizations=[1]) == [(1, 2)]
+
+
+def test_get_revision(api):
+    api.add_observation("revised", [0], [0], [1.0], [0.1])
+    api.add_observation_attribute("revised", "region", "1")
+    revision = api.get_revision()
+    assert api.get_revision() == revision
+
+    api.add_observation_attribute("revised", "region", "2")
+    assert api.get_revision() != revision
+    revision = api.get_revision()
+
+    ensemble = api.add_ensemble(name="revised")
+    assert api.get_revision() != revision
+    revision = api.get_revision()
+
+    api.set_priors(ensemble.name, [api.add_prior("G", "A", "function", [], [])])
+    assert api.get_revision() != revision
+
+
 def test_get_parameter_by_realization_id(db_api):
     api, db_lookup = db_api
     param = api.get_parameter_by_realization_id(
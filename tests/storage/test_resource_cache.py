@@ -0,0 +1,77 @@
+from ert_shared.storage.resource_cache import ResourceCache
+
+
+def test_get_and_put():
+    cache = ResourceCache(max_bytes=100)
+
+    assert cache.get("a", revision=1) is None
+    cache.put("a", 1, b"value")
+    assert cache.get("a", revision=1) == b"value"
+
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "invalidations": 0,
+        "entries": 1,
+        "size_bytes": 5,
+        "max_bytes": 100,
+    }
+
+
+def test_evicts_least_recently_used():
+    cache = ResourceCache(max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbb")
+    cache.get("a", 1)
+
+    cache.put("c", 1, b"cccc")
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"aaaa"
+    assert cache.get("c", 1) == b"cccc"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] == 8
+
+
+def test_replaces_value():
+    cache = ResourceCache(max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+    cache.put("a", 1, b"aaaaaa")
+
+    assert cache.get("a", 1) == b"aaaaaa"
+    assert cache.stats()["size_bytes"] == 6
+
+
+def test_does_not_cache_values_larger_than_the_cache():
+    cache = ResourceCache(max_bytes=4)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbbb")
+
+    assert cache.get("a", 1) == b"aaaa"
+    assert cache.get("b", 1) is None
+
+
+def test_new_revision_invalidates():
+    cache = ResourceCache(max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+
+    assert cache.get("a", 2) is None
+    cache.put("a", 2, b"bbbb")
+    assert cache.get("a", 2) == b"bbbb"
+
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["entries"] == 1
+    assert stats["size_bytes"] == 4
+
+
+def test_put_with_size():
+    cache = ResourceCache(max_bytes=10)
+    value = ["not", "bytes"]
+    cache.put("a", 1, value, size=8)
+    cache.put("b", 1, value, size=11)
+
+    assert cache.get("a", 1) is value
+    assert cache.get("b", 1) is None
+    assert cache.stats()["size_bytes"] == 8
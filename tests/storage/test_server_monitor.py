@@ -33,6 +33,8 @@ def server(request, monkeypatch, tmp_path: Path):
     path.chmod(0o755)
     monkeypatch.setattr(ServerMonitor, "EXEC_ARGS", [str(path)])
     monkeypatch.setattr(ServerMonitor, "TIMEOUT", 5)
+    # The server writes its log to the working directory
+    monkeypatch.chdir(tmp_path)
 
     proc = ServerMonitor()
     proc.start()
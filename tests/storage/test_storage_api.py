@@ -1,5 +1,11 @@
+import numpy as np
+import pytest
+
+from ert_shared.storage.resource_cache import ResourceCache
+from ert_shared.storage.storage_api import StorageApi
 from tests.storage import (
     api,
+    capture_queries,
     db_api,
     populated_database,
     initialize_databases,
@@ -152,3 +158,252 @@ def test_single_observation_misfit_calculation(storage_api):
     )
 
     assert univariate_misfit["realizations"][0]["univariate_misfits"] == misfit_expected
+
+
+def test_calculate_misfits():
+    class Observation:
+        values = np.array([10.1, 10.2, 9.0])
+        errors = np.array([1.0, 3.0, 0.5])
+        data_indices = [2, 3, 2]
+
+    response_values = np.random.RandomState(0).normal(10, 1, size=(5, 4))
+    observed_values = response_values[:, Observation.data_indices]
+
+    misfits, signs = StorageApi._calculate_misfits(observed_values, Observation)
+
+    assert misfits.shape == signs.shape == (5, 3)
+    for realization, values in enumerate(response_values):
+        for obs_index, (obs_value, obs_std, index) in enumerate(
+            zip(Observation.values, Observation.errors, Observation.data_indices)
+        ):
+            difference = values[index] - obs_value
+            assert misfits[realization, obs_index] == pytest.approx(
+                (difference / obs_std) ** 2
+            )
+            assert signs[realization, obs_index] == (difference > 0)
+
+
+def test_univariate_misfits_are_cached(db_api, monkeypatch):
+    rdb_api, _ = db_api
+    cache = ResourceCache(max_bytes=1024 ** 2)
+    api = StorageApi(rdb_api._session, cache=cache)
+    first = api.get_response(ensemble_id=1, response_name="response_one", filter=None)
+
+    def fail(observed_values, observation):
+        raise AssertionError("Misfits were recalculated")
+
+    monkeypatch.setattr(StorageApi, "_calculate_misfits", staticmethod(fail))
+    second = StorageApi(rdb_api._session, cache=cache).get_response(
+        ensemble_id=1, response_name="response_one", filter=None
+    )
+
+    assert second == first
+    assert cache.stats()["hits"] == 1
+
+
+def test_univariate_misfits_are_not_cached_without_cache(storage_api, monkeypatch):
+    api, _ = storage_api
+    api.get_response(ensemble_id=1, response_name="response_one", filter=None)
+
+    def fail(observed_values, observation):
+        raise AssertionError("Misfits were recalculated")
+
+    monkeypatch.setattr(StorageApi, "_calculate_misfits", staticmethod(fail))
+    with pytest.raises(AssertionError, match="recalculated"):
+        api.get_response(ensemble_id=1, response_name="response_one", filter=None)
+
+
+def _add_ragged_response(api, observed):
+    ensemble = api.add_ensemble(name="ragged")
+    api.add_realizations(range(2), ensemble.name)
+    response_definition = api.add_response_definition(
+        "ragged_response", [0, 1, 2], ensemble.name
+    )
+    if observed:
+        observation = api.add_observation(
+            name="ragged_obs",
+            key_indices=[0],
+            data_indices=[1],
+            values=[1.0],
+            errors=[0.5],
+        )
+        api._add_observation_response_definition_link(
+            observation_id=observation.id,
+            response_definition_id=response_definition.id,
+            active=[True],
+            update_id=None,
+        )
+    api.add_responses(
+        "ragged_response", {0: [0.0, 2.0], 1: [0.0, 0.0, 5.0]}, ensemble.name
+    )
+    return ensemble.id
+
+
+def test_univariate_misfits_of_ragged_responses(api):
+    ensemble_id = _add_ragged_response(api, observed=True)
+
+    schema = StorageApi(api._session).get_response(ensemble_id, "ragged_response", None)
+
+    assert [
+        realization["univariate_misfits"] for realization in schema["realizations"]
+    ] == [
+        {"ragged_obs": [{"value": 4.0, "sign": True, "obs_index": 0}]},
+        {"ragged_obs": [{"value": 4.0, "sign": False, "obs_index": 0}]},
+    ]
+
+
+def test_unobserved_ragged_responses(api):
+    ensemble_id = _add_ragged_response(api, observed=False)
+
+    schema = StorageApi(api._session).get_response(ensemble_id, "ragged_response", None)
+
+    assert [realization["data"] for realization in schema["realizations"]] == [
+        [0.0, 2.0],
+        [0.0, 0.0, 5.0],
+    ]
+    assert [
+        realization["univariate_misfits"] for realization in schema["realizations"]
+    ] == [{}, {}]
+    assert "observations" not in schema
+
+
+def test_batches_are_read_in_chunks(storage_api, monkeypatch):
+    api, db_lookup = storage_api
+    names = ["response_one", "response_two"]
+    expected = api.get_response_batch(db_lookup["ensemble"], names)
+
+    monkeypatch.setattr("ert_shared.storage.rdb_api._MAX_IN_VALUES", 1)
+    batch = api.get_response_batch(db_lookup["ensemble"], names)
+
+    assert [response["name"] for response in expected["responses"]] == names
+    assert len(batch["responses"]) == len(expected["responses"])
+    for response, expected_response in zip(batch["responses"], expected["responses"]):
+        assert response["realizations"] == expected_response["realizations"]
+        np.testing.assert_array_equal(response["data"], expected_response["data"])
+        np.testing.assert_array_equal(
+            response["axis"]["data"], expected_response["axis"]["data"]
+        )
+
+
+def _add_ensemble(api, name, realizations):
+    prior = api.add_prior("G", "A", "function", ["MIN", "MAX"], [0.0, 1.0])
+    parent = api.add_ensemble(name=name + "_parent")
+    ensemble = api.add_ensemble(
+        name=name, reference=(parent.name, "es"), priors=[prior]
+    )
+    api.add_realizations(range(realizations), ensemble.name)
+    observation = api.add_observation(
+        name=name + "_obs",
+        key_indices=[0],
+        data_indices=[1],
+        values=[1.0],
+        errors=[0.1],
+    )
+    observation.add_attribute("region", "1")
+    for response_name in ["response_one", "response_two"]:
+        response_definition = api.add_response_definition(
+            response_name, [0, 1], ensemble.name
+        )
+        link = api._add_observation_response_definition_link(
+            observation_id=observation.id,
+            response_definition_id=response_definition.id,
+            active=[True],
+            update_id=None,
+        )
+        api.add_responses(
+            response_name,
+            {index: [1.0, 2.0] for index in range(realizations)},
+            ensemble.name,
+        )
+        response_ids = api._get_response_ids(ensemble.id)
+        api._add_misfits(
+            [
+                (1.0, link.id, response_ids[(response_name, index)])
+                for index in range(realizations)
+            ]
+        )
+    for parameter_name in ["A", "B"]:
+        parameter_definition = api.add_parameter_definition(
+            parameter_name,
+            "G",
+            ensemble.name,
+            prior=prior if parameter_name == "A" else None,
+        )
+        api.add_parameters(
+            parameter_name,
+            "G",
+            {index: 0.5 for index in range(realizations)},
+            ensemble.name,
+        )
+    return ensemble.id, parameter_definition.id
+
+
+ENDPOINTS = {
+    "get_ensembles": (
+        3,
+        lambda storage, ensemble_id, parameter_def_id: (storage.get_ensembles()),
+    ),
+    "get_ensemble": (
+        6,
+        lambda storage, ensemble_id, parameter_def_id: (
+            storage.get_ensemble(ensemble_id)
+        ),
+    ),
+    "get_realization": (
+        3,
+        lambda storage, ensemble_id, parameter_def_id: (
+            storage.get_realization(ensemble_id, 1, None)
+        ),
+    ),
+    "get_response": (
+        5,
+        lambda storage, ensemble_id, parameter_def_id: (
+            storage.get_response(ensemble_id, "response_one", None)
+        ),
+    ),
+    "get_response_data": (
+        2,
+        lambda storage, ensemble_id, parameter_def_id: (
+            storage.get_response_data(ensemble_id, "response_one")
+        ),
+    ),
+    "get_ensemble_keys": (
+        7,
+        lambda storage, ensemble_id, parameter_def_id: (
+            storage.get_ensemble_keys(ensemble_id)
+        ),
+    ),
+    "get_response_batch": (
+        2,
+        lambda storage, ensemble_id, parameter_def_id: (
+            storage.get_response_batch(ensemble_id, ["response_one", "response_two"])
+        ),
+    ),
+    "get_parameter_batch": (
+        2,
+        lambda storage, ensemble_id, parameter_def_id: (
+            storage.get_parameter_batch(ensemble_id, ["G:A", "G:B"])
+        ),
+    ),
+    "get_parameter": (
+        2,
+        lambda storage, ensemble_id, parameter_def_id: (
+            storage.get_parameter(ensemble_id, parameter_def_id)
+        ),
+    ),
+}
+
+
+@pytest.mark.parametrize("endpoint", sorted(ENDPOINTS))
+def test_query_count(api, endpoint):
+    expected_count, call = ENDPOINTS[endpoint]
+    storage = StorageApi(session=api._session)
+
+    for realizations in [2, 20]:
+        ids = _add_ensemble(api, "{}_{}".format(endpoint, realizations), realizations)
+        api._session.expire_all()
+
+        with capture_queries(api._session) as queries:
+            assert call(storage, *ids) is not None
+
+        assert len(queries) == expected_count, realizations
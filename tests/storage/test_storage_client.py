@@ -1,7 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import pandas as pd
 import pytest
+import requests
 from ert_shared.storage import ERT_STORAGE
 from ert_shared.storage.client import StorageClient
 from ert_shared.storage.server_monitor import ServerMonitor
@@ -9,7 +11,9 @@ from tests.storage import api, db_api, populated_database, initialize_databases
 
 
 @pytest.fixture
-def server(db_api, request):
+def server(db_api, request, monkeypatch, tmp_path):
+    # The server writes its log to the working directory
+    monkeypatch.chdir(tmp_path)
     proc = ServerMonitor(rdb_url=ERT_STORAGE.SQLALCHEMY_URL, lockfile=False)
     proc.start()
     request.addfinalizer(lambda: proc.shutdown())
@@ -110,3 +114,156 @@ def test_response_values(storage_client):
     ).T
 
     pd.testing.assert_frame_equal(result, expected)
+
+
+def test_sliced_response_values(storage_client):
+    result = storage_client.data_for_key(
+        case="ensemble_name", key="response_one", realizations=[1], start=1, stop=3
+    )
+
+    expected = pd.DataFrame([[11.2], [9.9]], index=[5, 8], columns=[1]).T
+    pd.testing.assert_frame_equal(result, expected)
+
+    format = "%Y-%m-%d %H:%M:%S"
+    result = storage_client.data_for_key(
+        case="ensemble_name",
+        key="response_two",
+        start=datetime.strptime("2000-01-02 00:00:00", format),
+        step=2,
+    )
+
+    date = datetime.strptime("2000-01-02 20:01:01", format)
+    expected = pd.DataFrame(
+        [[12.2, 12.2], [11.2, 11.2], [9.3, 9.3]], index=[date, date, date]
+    ).T
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_sliced_parameter_values(storage_client):
+    result = storage_client.data_for_key(
+        case="ensemble_name", key="G:A", realizations=[1]
+    )
+
+    pd.testing.assert_frame_equal(result, pd.DataFrame([[1]], index=[1]))
+
+
+def test_data_for_keys(storage_client):
+    keys = ["response_one", "response_two", "G:A", "group:key1", "none"]
+    result = storage_client.data_for_keys(case="ensemble_name", keys=keys)
+
+    assert list(result) == keys
+    for key in keys:
+        pd.testing.assert_frame_equal(
+            result[key], storage_client.data_for_key(case="ensemble_name", key=key)
+        )
+
+    result = storage_client.data_for_keys(
+        case="ensemble_name", keys=["response_one", "G:A"], realizations=[1]
+    )
+    pd.testing.assert_frame_equal(
+        result["response_one"],
+        storage_client.data_for_key(
+            case="ensemble_name", key="response_one", realizations=[1]
+        ),
+    )
+    pd.testing.assert_frame_equal(result["G:A"], pd.DataFrame([[1]], index=[1]))
+
+
+def test_data_for_keys_from_json(storage_client, monkeypatch):
+    keys = ["response_one", "response_two", "G:A", "none"]
+    mimetypes = []
+    real_post = requests.post
+
+    def post(*args, **kwargs):
+        resp = real_post(*args, **kwargs)
+        mimetypes.append(resp.headers["Content-Type"])
+        return resp
+
+    monkeypatch.setattr("ert_shared.storage.client.requests.post", post)
+    expected = storage_client.data_for_keys(case="ensemble_name", keys=keys)
+    assert mimetypes == ["application/x-npz"] * 2
+
+    def json_post(url, *args, headers=None, **kwargs):
+        # As from a server without .npz
+        return post(url, *args, headers={"Accept": "application/json"}, **kwargs)
+
+    monkeypatch.setattr("ert_shared.storage.client.requests.post", json_post)
+    result = storage_client.data_for_keys(case="ensemble_name", keys=keys)
+    assert mimetypes[2:] == ["application/json"] * 2
+
+    for key in keys:
+        pd.testing.assert_frame_equal(result[key], expected[key])
+
+
+def test_batch_request_error(storage_client):
+    url = storage_client._BASE_URI + "/ensembles/1/responses:batch"
+
+    with pytest.raises(requests.HTTPError):
+        storage_client._batch_request(url, ["response_one"], {"realizations": "-1"})
+
+
+def test_batched_round_trips(storage_client, monkeypatch):
+    urls = []
+    real_get, real_post = requests.get, requests.post
+
+    def get(url, *args, **kwargs):
+        urls.append(url)
+        return real_get(url, *args, **kwargs)
+
+    def post(url, *args, **kwargs):
+        urls.append(url)
+        return real_post(url, *args, **kwargs)
+
+    monkeypatch.setattr("ert_shared.storage.client.requests.get", get)
+    monkeypatch.setattr("ert_shared.storage.client.requests.post", post)
+
+    keys = storage_client.all_data_type_keys()
+    assert len(urls) == 2
+    urls.clear()
+
+    storage_client.data_for_keys(
+        case="ensemble_name", keys=[key["key"] for key in keys]
+    )
+    assert len(urls) == 3
+
+
+def test_revalidation(storage_client, monkeypatch):
+    statuses = []
+    real_get = requests.get
+
+    def get(*args, **kwargs):
+        resp = real_get(*args, **kwargs)
+        statuses.append(resp.status_code)
+        return resp
+
+    monkeypatch.setattr("ert_shared.storage.client.requests.get", get)
+
+    first = storage_client.data_for_key(case="ensemble_name", key="response_one")
+    assert 304 not in statuses
+    statuses.clear()
+
+    second = storage_client.data_for_key(case="ensemble_name", key="response_one")
+    assert statuses and set(statuses) == {304}
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_multiple_workers(db_api, request, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    server = ServerMonitor(
+        rdb_url=ERT_STORAGE.SQLALCHEMY_URL,
+        lockfile=False,
+        server_args=("--workers", "2"),
+    )
+    server.start()
+    request.addfinalizer(server.shutdown)
+    url, auth = server.fetch_url(), server.fetch_auth()
+
+    def fetch(_):
+        client = StorageClient(url, auth)
+        return client.data_for_key(case="ensemble_name", key="response_one")
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(fetch, range(8)))
+
+    for result in results:
+        pd.testing.assert_frame_equal(result, results[0])